@@ -4,14 +4,25 @@ Admin configuration for Analytics.
 
 from django.contrib import admin
 
-from .models import InventoryTransfer, SalesAnalytics
+from .models import DashboardSnapshot, InventoryTransfer, RollupWatermark, SalesAnalytics, SalesFact
 
 
 @admin.register(InventoryTransfer)
 class InventoryTransferAdmin(admin.ModelAdmin):
-    list_display = ["product", "admin_user", "transfer_type", "quantity", "created_at"]
-    list_filter = ["transfer_type", "created_at"]
+    list_display = ["product", "variant", "origin", "reason", "delta", "balance_after", "order", "admin_user", "created_at"]
+    list_filter = ["reason", "origin", "transfer_type", "created_at"]
     search_fields = ["product__name", "notes"]
+    list_select_related = ["product", "variant", "order", "admin_user"]
+
+    # Append-only: stock changes go through the ledger, not this form
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(SalesAnalytics)
@@ -19,3 +30,20 @@ class SalesAnalyticsAdmin(admin.ModelAdmin):
     list_display = ["date", "total_orders", "total_revenue", "products_sold", "new_customers"]
     list_filter = ["date"]
     ordering = ["-date"]
+
+
+@admin.register(SalesFact)
+class SalesFactAdmin(admin.ModelAdmin):
+    list_display = ["date", "product", "quantity_ml", "selected_origin", "category", "units", "gross_revenue"]
+    list_filter = ["selected_origin", "quantity_ml", "category"]
+    date_hierarchy = "date"
+
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ["job", "high_water", "updated_at"]
+
+
+@admin.register(DashboardSnapshot)
+class DashboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ["revenue_30d", "orders_30d", "pending_orders", "low_stock_products", "rebuilt_at", "updated_at"]
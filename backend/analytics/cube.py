@@ -0,0 +1,70 @@
+"""
+Group-by / filter queries over the SalesFact cube.
+
+Every answer is one aggregate query over pre-aggregated cells (at most one
+per day x SKU x origin), never over orders, so it stays fast however many
+orders a period holds.
+"""
+
+from decimal import Decimal
+
+from django.db.models import F, Sum
+
+from .models import SalesFact
+
+# dimension → SalesFact columns it groups on (the first one is its key)
+DIMENSIONS = {
+    "day": ["date"],
+    "product": ["product_id", "product__name"],
+    "quantity_ml": ["quantity_ml"],
+    "origin": ["selected_origin"],
+    "category": ["category_id", "category__name"],
+}
+MEASURES = ["units", "gross_revenue", "discount_share", "net_revenue"]
+
+# response key for each grouped column
+_LABELS = {
+    "date": "day",
+    "product__name": "product_name",
+    "selected_origin": "origin",
+    "category__name": "category_name",
+}
+
+
+def _measures():
+    # Prefixed: annotations may not shadow SalesFact's own columns
+    return {
+        "sum_units": Sum("units"),
+        "sum_gross_revenue": Sum("gross_revenue"),
+        "sum_discount_share": Sum("discount_share"),
+        "sum_net_revenue": Sum(F("gross_revenue") - F("discount_share")),
+    }
+
+
+def _label(column):
+    return _LABELS.get(column, column.removeprefix("sum_"))
+
+
+def query_cube(group_by, filters, order_by="-gross_revenue", limit=100):
+    """
+    Aggregate the cube. `group_by` is a list of DIMENSIONS keys, `filters`
+    holds already-validated lookups on SalesFact columns and `order_by` a
+    MEASURES name, optionally prefixed with "-". Returns (rows, totals),
+    where totals cover every matching cell.
+    """
+    cells = SalesFact.objects.filter(**filters)
+    totals = {_label(key): value for key, value in cells.aggregate(**_measures()).items()}
+    totals = {key: value if value is not None else (0 if key == "units" else Decimal("0.00"))
+              for key, value in totals.items()}
+
+    columns = [column for dimension in group_by for column in DIMENSIONS[dimension]]
+    if not columns:
+        return [], totals
+    keys = [DIMENSIONS[dimension][0] for dimension in group_by]
+    descending, measure = order_by.startswith("-"), order_by.lstrip("-")
+    rows = (
+        cells.values(*columns)
+        .annotate(**_measures())
+        .order_by(f"{'-' if descending else ''}sum_{measure}", *keys)[:limit]
+    )
+    return [{_label(column): value for column, value in row.items()} for row in rows], totals
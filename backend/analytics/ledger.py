@@ -0,0 +1,183 @@
+"""
+Append-only stock ledger.
+
+Every change to a variant's on-hand stock is an InventoryTransfer row with
+the variant, origin, signed delta, reason and the balance left behind:
+
+    checkout  deducted for an order (COD at checkout, online once paid)
+    cancel    returned to stock when that order is cancelled
+    manual    admin transfers and edits of the stock fields
+    import    catalog import (manage.py import_catalog)
+    opening   stock a variant started with (creation, ledger rollout)
+
+Writers that lock and update variants themselves (checkout) post their rows
+with post(); everything else goes through apply(). Saves of ProductVariant
+are recorded by analytics/signals.py. On-hand stock should always equal the
+sum of a variant's deltas; `manage.py reconcile_stock` checks that.
+"""
+
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from products.models import ProductVariant
+from products.signals import sync_variant_writes
+
+from . import snapshot
+from .models import InventoryTransfer
+
+ORIGINS = InventoryTransfer.Origin.values
+
+
+class LedgerLine(NamedTuple):
+    variant_id: int
+    origin: str
+    delta: int
+    notes: str = ""
+
+
+class NegativeStock(Exception):
+    def __init__(self, errors):
+        super().__init__("; ".join(errors.values()))
+        self.errors = errors  # {line index: message}
+
+
+def stock_field(origin):
+    return f"{origin}_stock"
+
+
+def stock(variant):
+    """(india_stock, switzerland_stock), the order of ORIGINS."""
+    return tuple(getattr(variant, stock_field(origin)) for origin in ORIGINS)
+
+
+def entry(variant, origin, delta, balance, reason, user=None, order=None, notes=""):
+    """An unsaved ledger row; `variant` needs pk and product_id."""
+    return InventoryTransfer(
+        product_id=variant.product_id,
+        variant_id=variant.pk,
+        origin=origin,
+        delta=delta,
+        balance_after=balance,
+        reason=reason,
+        transfer_type=InventoryTransfer.TransferType.IN if delta > 0 else InventoryTransfer.TransferType.OUT,
+        quantity=abs(delta),
+        admin_user=user,
+        order_id=getattr(order, "pk", order),
+        notes=notes,
+    )
+
+
+def post(entries):
+    """Write ledger rows, skipping zero deltas."""
+    rows = [row for row in entries if row.delta]
+    if len(rows) == 1:
+        # Saved on its own so its pk is known (MySQL returns none from bulk_create)
+        rows[0].save()
+        return rows
+    return InventoryTransfer.objects.bulk_create(rows, batch_size=1000)
+
+
+def apply(lines, reason, user=None, order=None):
+    """
+    Apply LedgerLines to on-hand stock in order, all or nothing: one query
+    locks the variants, one UPDATE moves their stock and one insert writes
+    a ledger row per line. Raises NegativeStock({line index: message}) if a
+    variant is missing or a line would take a balance below zero. Returns
+    the ledger rows, one per line.
+    """
+    lines = [line for line in lines if line.delta]
+    if not lines:
+        return []
+    with transaction.atomic():
+        variants = {
+            variant.pk: variant
+            for variant in ProductVariant.objects.select_for_update()
+            .filter(pk__in={line.variant_id for line in lines})
+            .order_by("pk")
+            .only("pk", "product_id", "quantity_ml", "india_stock", "switzerland_stock")
+        }
+        balance = {}  # (variant_id, field) → running balance
+        entries, errors = [], {}
+        for index, line in enumerate(lines):
+            variant = variants.get(line.variant_id)
+            if variant is None:
+                errors[index] = f"Variant {line.variant_id} not found."
+                continue
+            bucket = (variant.pk, stock_field(line.origin))
+            current = balance.setdefault(bucket, getattr(variant, bucket[1]))
+            if current + line.delta < 0:
+                errors[index] = f"Insufficient stock. Current: {current} ({variant.quantity_ml}ml - {line.origin})."
+                continue
+            balance[bucket] = current + line.delta
+            entries.append(entry(variant, line.origin, line.delta, balance[bucket], reason, user, order, line.notes))
+        if errors:
+            raise NegativeStock(errors)
+
+        whens = defaultdict(list)
+        for (pk, field), value in balance.items():
+            whens[field].append(When(pk=pk, then=Value(value - getattr(variants[pk], field))))
+        ProductVariant.objects.filter(pk__in=variants).update(**{
+            field: F(field) + Case(*field_whens, default=Value(0))
+            for field, field_whens in whens.items()
+        })
+        entries = post(entries)
+        sync_variant_writes(variant.product_id for variant in variants.values())
+        snapshot.apply_stock_changes(
+            (variant.product_id, stock(variant), tuple(
+                balance.get((variant.pk, stock_field(origin)), old)
+                for origin, old in zip(ORIGINS, stock(variant))
+            ))
+            for variant in variants.values()
+        )
+    return entries
+
+
+def balances(variant_ids):
+    """{(variant_id, origin): on-hand stock according to the ledger}."""
+    rows = (
+        InventoryTransfer.objects.filter(variant_id__in=variant_ids)
+        .values("variant_id", "origin")
+        .annotate(total=Sum("delta"))
+        .order_by()
+    )
+    return {(row["variant_id"], row["origin"]): row["total"] for row in rows}
+
+
+def reconcile(batch_size=1000, fix=False):
+    """
+    Compare every variant's on-hand stock with its ledger balance, a batch
+    of variants per query pair. Returns [(variant_id, origin, on_hand,
+    ledger)] for each mismatch; with `fix`, on-hand stock is set to the
+    ledger balance.
+    """
+    drift = []
+    last_pk = 0
+    while True:
+        batch = list(
+            ProductVariant.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "product_id", "india_stock", "switzerland_stock")[:batch_size]
+        )
+        if not batch:
+            return drift
+        last_pk = batch[-1][0]
+        ledger = balances([pk for pk, *_ in batch])
+        fixes = defaultdict(list)
+        product_ids = set()
+        for pk, product_id, *stock in batch:
+            for origin, on_hand in zip(ORIGINS, stock):
+                expected = ledger.get((pk, origin), 0)
+                if on_hand != expected:
+                    drift.append((pk, origin, on_hand, expected))
+                    fixes[stock_field(origin)].append(When(pk=pk, then=Value(max(0, expected))))
+                    product_ids.add(product_id)
+        if fix and fixes:
+            with transaction.atomic():
+                ProductVariant.objects.filter(pk__in=[pk for pk, *_ in batch]).update(**{
+                    field: Case(*field_whens, default=F(field), output_field=IntegerField())
+                    for field, field_whens in fixes.items()
+                })
+                sync_variant_writes(product_ids)
@@ -0,0 +1,33 @@
+"""
+Check on-hand variant stock against the stock ledger, a batch of variants
+at a time, and report every variant/origin that has drifted. With --fix,
+on-hand stock is set to the ledger balance.
+
+Usage: python manage.py reconcile_stock [--fix] [--batch-size 1000]
+"""
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Recompute variant stock from the inventory ledger and report drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Set on-hand stock to the ledger balance")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Variants per query (default: 1000)")
+
+    def handle(self, *args, **options):
+        from analytics.ledger import reconcile
+
+        drift = reconcile(batch_size=options["batch_size"], fix=options["fix"])
+        for variant_id, origin, on_hand, expected in drift:
+            self.stdout.write(
+                f"  variant {variant_id} ({origin}): on hand {on_hand}, ledger {expected} "
+                f"({on_hand - expected:+d})"
+            )
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("[OK] Stock matches the ledger"))
+        elif options["fix"]:
+            self.stdout.write(self.style.SUCCESS(f"[OK] Reset {len(drift)} stock levels to the ledger"))
+        else:
+            self.stdout.write(self.style.WARNING(f"[!] {len(drift)} stock levels drift from the ledger (run with --fix)"))
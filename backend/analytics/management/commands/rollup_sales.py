@@ -0,0 +1,44 @@
+"""
+Roll orders and sign-ups up into daily SalesAnalytics rows (Asia/Kolkata
+days). Each run only recomputes days touched since the previous one; run
+from cron, or as a long-lived worker with --interval. The SalesFact cube
+follows order status changes by itself; --repair-cube rebuilds its days
+touched since the last repair (nightly), --full rebuilds everything.
+
+Usage: python manage.py rollup_sales [--full] [--repair-cube] [--interval 300]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Aggregate orders and new customers into SalesAnalytics and the sales cube"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Recompute every day, ignoring the watermark")
+        parser.add_argument(
+            "--repair-cube", action="store_true",
+            help="Also rebuild the sales cube days touched since the last repair",
+        )
+        parser.add_argument(
+            "--interval", type=int, default=0,
+            help="Keep running, rolling up every N seconds (default: run once and exit)",
+        )
+
+    def handle(self, *args, **options):
+        from analytics.rollup import rollup_cube, rollup_sales
+        from analytics.snapshot import refresh_metrics
+
+        full = options["full"]
+        while True:
+            days = rollup_sales(full=full)
+            cube_days = rollup_cube(full=full) if full or options["repair_cube"] else 0
+            if days:
+                refresh_metrics("revenue_trend")
+            self.stdout.write(self.style.SUCCESS(f"[OK] Rolled up {days} days ({cube_days} cube days rebuilt)"))
+            if not options["interval"]:
+                return
+            full = False
+            time.sleep(options["interval"])
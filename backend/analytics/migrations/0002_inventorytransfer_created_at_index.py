@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-18 01:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('products', '0016_product_content_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorytransfer',
+            index=models.Index(fields=['-created_at'], name='analytics_i_created_7d1ac2_idx'),
+        ),
+    ]
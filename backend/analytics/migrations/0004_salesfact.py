@@ -0,0 +1,33 @@
+# Generated by Django 5.1.15 on 2026-10-18 02:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_rollupwatermark'),
+        ('products', '0018_testerbox_products_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity_ml', models.PositiveIntegerField()),
+                ('selected_origin', models.CharField(max_length=20)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('gross_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('discount_share', models.DecimalField(decimal_places=2, default=0, help_text='Order-level discounts apportioned to these lines by value', max_digits=12)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales_facts', to='products.category')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_facts', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['selected_origin', 'quantity_ml', 'date'], name='analytics_s_selecte_854ab4_idx'), models.Index(fields=['category', 'date'], name='analytics_s_categor_144801_idx')],
+                'unique_together': {('date', 'product', 'quantity_ml', 'selected_origin')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-18 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_salesfact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revenue_30d', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('orders_30d', models.IntegerField(default=0)),
+                ('total_customers', models.IntegerField(default=0)),
+                ('total_products', models.IntegerField(default=0)),
+                ('pending_orders', models.IntegerField(default=0)),
+                ('low_stock_products', models.IntegerField(default=0)),
+                ('revenue_trend', models.JSONField(blank=True, default=list)),
+                ('rebuilt_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.1.15 on 2026-10-18 02:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def start_ledger(apps, schema_editor):
+    """
+    Move the origin out of legacy notes ("[INDIA] ...") and open the ledger
+    with every variant's current stock.
+    """
+    InventoryTransfer = apps.get_model("analytics", "InventoryTransfer")
+    ProductVariant = apps.get_model("products", "ProductVariant")
+
+    legacy = []
+    for transfer in InventoryTransfer.objects.filter(variant__isnull=True).iterator():
+        for origin in ("india", "switzerland"):
+            prefix = f"[{origin.upper()}]"
+            if transfer.notes.startswith(prefix):
+                transfer.origin = origin
+                transfer.notes = transfer.notes[len(prefix):].strip()
+        transfer.delta = transfer.quantity if transfer.transfer_type == "in" else -transfer.quantity
+        legacy.append(transfer)
+    InventoryTransfer.objects.bulk_update(legacy, ["origin", "notes", "delta"], batch_size=1000)
+
+    opening = []
+    for variant in ProductVariant.objects.order_by("pk").iterator():
+        for origin in ("india", "switzerland"):
+            stock = getattr(variant, f"{origin}_stock")
+            if stock:
+                opening.append(InventoryTransfer(
+                    product_id=variant.product_id, variant_id=variant.pk, origin=origin,
+                    reason="opening", transfer_type="in", quantity=stock,
+                    delta=stock, balance_after=stock,
+                ))
+    InventoryTransfer.objects.bulk_create(opening, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_dashboardsnapshot'),
+        ('orders', '0013_order_updated_at_index'),
+        ('products', '0018_testerbox_products_snapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='inventorytransfer',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddField(
+            model_name='inventorytransfer',
+            name='balance_after',
+            field=models.IntegerField(blank=True, help_text='On-hand stock after this change', null=True),
+        ),
+        migrations.AddField(
+            model_name='inventorytransfer',
+            name='delta',
+            field=models.IntegerField(default=0, help_text='Signed change to on-hand stock'),
+        ),
+        migrations.AddField(
+            model_name='inventorytransfer',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_transfers', to='orders.order'),
+        ),
+        migrations.AddField(
+            model_name='inventorytransfer',
+            name='origin',
+            field=models.CharField(choices=[('india', 'India'), ('switzerland', 'Switzerland')], default='india', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='inventorytransfer',
+            name='reason',
+            field=models.CharField(choices=[('checkout', 'Checkout'), ('cancel', 'Order cancelled'), ('manual', 'Manual'), ('import', 'Catalog import'), ('opening', 'Opening balance')], default='manual', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='inventorytransfer',
+            name='variant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='inventory_transfers', to='products.productvariant'),
+        ),
+        migrations.AlterField(
+            model_name='inventorytransfer',
+            name='admin_user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='inventory_transfers', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransfer',
+            index=models.Index(fields=['variant', 'origin', '-created_at'], name='analytics_i_variant_c6f72f_idx'),
+        ),
+        migrations.RunPython(start_ledger, migrations.RunPython.noop),
+    ]
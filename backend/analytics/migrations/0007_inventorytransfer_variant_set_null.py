@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_inventory_ledger'),
+        ('products', '0018_testerbox_products_snapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inventorytransfer',
+            name='variant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_transfers', to='products.productvariant'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_inventorytransfer_variant_set_null'),
+        ('products', '0018_testerbox_products_snapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inventorytransfer',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_transfers', to='products.product'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 """
-Analytics models: InventoryTransfer and SalesAnalytics.
+Analytics models: InventoryTransfer, SalesAnalytics, SalesFact, RollupWatermark
+and DashboardSnapshot.
 """
 
 from django.conf import settings
@@ -7,33 +8,75 @@ from django.db import models
 
 
 class InventoryTransfer(models.Model):
-    """Track stock in/out movements with admin attribution."""
+    """
+    Stock ledger row: one append-only change to a variant's on-hand stock
+    in one origin, with the balance it left behind (see analytics/ledger.py).
+    Rows from before the ledger carry no variant or balance; rows of a
+    deleted product or variant keep their history with the link cleared.
+    """
 
     class TransferType(models.TextChoices):
         IN = "in", "Stock In"
         OUT = "out", "Stock Out"
 
+    class Origin(models.TextChoices):
+        INDIA = "india", "India"
+        SWITZERLAND = "switzerland", "Switzerland"
+
+    class Reason(models.TextChoices):
+        CHECKOUT = "checkout", "Checkout"
+        CANCEL = "cancel", "Order cancelled"
+        MANUAL = "manual", "Manual"
+        IMPORT = "import", "Catalog import"
+        OPENING = "opening", "Opening balance"
+
     product = models.ForeignKey(
         "products.Product",
-        on_delete=models.CASCADE,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="inventory_transfers",
+    )
+    variant = models.ForeignKey(
+        "products.ProductVariant",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
         related_name="inventory_transfers",
     )
+    origin = models.CharField(max_length=20, choices=Origin.choices, default=Origin.INDIA)
     admin_user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="inventory_transfers",
+    )
+    order = models.ForeignKey(
+        "orders.Order",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
         related_name="inventory_transfers",
     )
+    reason = models.CharField(max_length=10, choices=Reason.choices, default=Reason.MANUAL)
     transfer_type = models.CharField(max_length=3, choices=TransferType.choices)
     quantity = models.PositiveIntegerField()
+    delta = models.IntegerField(default=0, help_text="Signed change to on-hand stock")
+    balance_after = models.IntegerField(null=True, blank=True, help_text="On-hand stock after this change")
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["-created_at"]),
+            models.Index(fields=["variant", "origin", "-created_at"]),
+        ]
 
     def __str__(self):
-        direction = "+" if self.transfer_type == "in" else "-"
-        return f"{direction}{self.quantity} {self.product.name}"
+        product = self.product.name if self.product_id else "deleted product"
+        return f"{self.delta:+d} {product} ({self.origin}, {self.reason})"
 
 
 class SalesAnalytics(models.Model):
@@ -51,3 +94,79 @@ class SalesAnalytics(models.Model):
 
     def __str__(self):
         return f"Analytics {self.date} — ₹{self.total_revenue} ({self.total_orders} orders)"
+
+
+class SalesFact(models.Model):
+    """
+    Sales cube cell: one row per day x product x size x origin, with the
+    product's category carried along. Moved by deltas as orders enter or
+    leave a revenue status (analytics/rollup.py post_fact_deltas), repaired
+    per day by `rollup_sales --repair-cube`; queried by
+    /api/admin/analytics/cube/.
+    """
+
+    date = models.DateField()
+    product = models.ForeignKey(
+        "products.Product",
+        on_delete=models.CASCADE,
+        related_name="sales_facts",
+    )
+    quantity_ml = models.PositiveIntegerField()
+    selected_origin = models.CharField(max_length=20)
+    category = models.ForeignKey(
+        "products.Category",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="sales_facts",
+    )
+    units = models.PositiveIntegerField(default=0)
+    gross_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    discount_share = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0,
+        help_text="Order-level discounts apportioned to these lines by value",
+    )
+
+    class Meta:
+        unique_together = ("date", "product", "quantity_ml", "selected_origin")
+        indexes = [
+            models.Index(fields=["selected_origin", "quantity_ml", "date"]),
+            models.Index(fields=["category", "date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.product_id} {self.quantity_ml}ml {self.selected_origin}: {self.units}"
+
+
+class RollupWatermark(models.Model):
+    """
+    How far an incremental rollup job has read its sources. The next run
+    only revisits rows changed after `high_water` (see analytics/rollup.py).
+    """
+
+    job = models.CharField(max_length=50, unique=True)
+    high_water = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.job} @ {self.high_water:%Y-%m-%d %H:%M:%S}"
+
+
+class DashboardSnapshot(models.Model):
+    """
+    The admin dashboard's headline numbers in one row (pk=1), kept current
+    by signal deltas and rebuilt nightly (see analytics/snapshot.py).
+    """
+
+    revenue_30d = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders_30d = models.IntegerField(default=0)
+    total_customers = models.IntegerField(default=0)
+    total_products = models.IntegerField(default=0)
+    pending_orders = models.IntegerField(default=0)
+    low_stock_products = models.IntegerField(default=0)
+    revenue_trend = models.JSONField(default=list, blank=True)
+    rebuilt_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Dashboard snapshot @ {self.updated_at:%Y-%m-%d %H:%M:%S}"
@@ -0,0 +1,255 @@
+"""
+Incremental rollups of real orders into the analytics tables.
+
+Days are calendar days in Asia/Kolkata. Two jobs share one mechanism:
+
+    sales_daily  SalesAnalytics, one row per day:
+                 total_orders / total_revenue / products_sold for orders
+                 that are (still) confirmed or later, and new_customers
+                 for customer accounts created that day
+    sales_cube   SalesFact, one row per day x product x size x origin
+                 (category carried along): units, gross revenue and the
+                 share of order discounts falling on those lines
+
+Each job keeps a watermark and only recomputes the days of orders changed
+(Order.updated_at) or customers created since its last run. A status
+transition such as a cancellation or refund bumps updated_at, so the day
+the order was placed is recomputed and corrected. Touched days are always
+rebuilt in full, so re-running is harmless.
+
+The cube is also kept current as orders move in and out of
+REVENUE_STATUSES: analytics/signals.py posts each order's cells as deltas
+after commit (post_fact_deltas), so its day rebuild is only a repair pass
+(`rollup_sales --repair-cube`, e.g. nightly).
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+
+from .models import RollupWatermark, SalesAnalytics, SalesFact
+
+ROLLUP_TZ = ZoneInfo("Asia/Kolkata")
+REVENUE_STATUSES = [
+    Order.Status.CONFIRMED,
+    Order.Status.PROCESSING,
+    Order.Status.SHIPPED,
+    Order.Status.DELIVERED,
+]
+DAILY_JOB = "sales_daily"
+CUBE_JOB = "sales_cube"
+# Rows are stamped before their transaction commits; re-read a little behind
+# the watermark so a slow commit is not missed.
+OVERLAP = timedelta(minutes=5)
+DAYS_PER_QUERY = 31
+METRICS = ["total_orders", "total_revenue", "products_sold", "new_customers"]
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+CENT = Decimal("0.01")
+
+
+def _local_day(field):
+    return TruncDate(field, tzinfo=ROLLUP_TZ)
+
+
+def _within_days(field, days):
+    """Q matching `field` inside any of the given local days (index-friendly ranges)."""
+    window = Q()
+    for day in days:
+        start = datetime.combine(day, time.min, tzinfo=ROLLUP_TZ)
+        window |= Q(**{f"{field}__gte": start, f"{field}__lt": start + timedelta(days=1)})
+    return window
+
+
+def touched_days(since=None, customers=True):
+    """
+    Local dates whose figures may have changed since `since` (None: every
+    day): days orders were placed on, plus days customers signed up on.
+    """
+    orders = Order.objects.order_by()
+    signups = get_user_model().objects.filter(role="customer").order_by()
+    if since is not None:
+        orders = orders.filter(updated_at__gte=since)
+        signups = signups.filter(created_at__gte=since)
+    days = set(orders.values_list(_local_day("created_at"), flat=True).distinct())
+    if customers:
+        days |= set(signups.values_list(_local_day("created_at"), flat=True).distinct())
+    return sorted(days)
+
+
+def compute_days(days):
+    """{date: {metric: value}} for the given local dates, zeros included."""
+    rows = {
+        day: {"total_orders": 0, "total_revenue": Decimal("0.00"), "products_sold": 0, "new_customers": 0}
+        for day in days
+    }
+    orders = (
+        Order.objects.filter(_within_days("created_at", days), status__in=REVENUE_STATUSES)
+        .annotate(day=_local_day("created_at"))
+        .values("day")
+        .annotate(orders=Count("pk"), revenue=Sum("total_amount"))
+        .order_by()
+    )
+    for row in orders:
+        rows[row["day"]].update(total_orders=row["orders"], total_revenue=row["revenue"])
+
+    items = (
+        OrderItem.objects.filter(_within_days("order__created_at", days), order__status__in=REVENUE_STATUSES)
+        .annotate(day=_local_day("order__created_at"))
+        .values("day")
+        .annotate(units=Sum("quantity"))
+        .order_by()
+    )
+    for row in items:
+        rows[row["day"]]["products_sold"] = row["units"]
+
+    customers = (
+        get_user_model().objects.filter(_within_days("created_at", days), role="customer")
+        .annotate(day=_local_day("created_at"))
+        .values("day")
+        .annotate(joined=Count("pk"))
+        .order_by()
+    )
+    for row in customers:
+        rows[row["day"]]["new_customers"] = row["joined"]
+    return rows
+
+
+def upsert_days(rows):
+    """Insert or overwrite SalesAnalytics rows in one statement."""
+    # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target
+    target = ["date"] if connection.features.supports_update_conflicts_with_target else None
+    SalesAnalytics.objects.bulk_create(
+        [SalesAnalytics(date=day, **values) for day, values in rows.items()],
+        update_conflicts=True,
+        unique_fields=target,
+        update_fields=METRICS,
+    )
+
+
+def _facts(items):
+    """SalesFact rows (unsaved) summing an OrderItem queryset by cube cell."""
+    line_value = F("price_at_purchase") * F("quantity")
+    discount_share = Case(
+        When(order__subtotal__gt=0, then=line_value * F("order__discount_amount") / F("order__subtotal")),
+        default=Value(Decimal("0.00")),
+        output_field=MONEY,
+    )
+    cells = (
+        items.annotate(day=_local_day("order__created_at"))
+        .values("day", "product_id", "quantity_ml", "selected_origin", "product__category_id")
+        .annotate(
+            units=Sum("quantity"),
+            gross=Sum(line_value, output_field=MONEY),
+            discount=Sum(discount_share),
+        )
+        .order_by()
+    )
+    return [
+        SalesFact(
+            date=cell["day"],
+            product_id=cell["product_id"],
+            quantity_ml=cell["quantity_ml"],
+            selected_origin=cell["selected_origin"],
+            category_id=cell["product__category_id"],
+            units=cell["units"],
+            gross_revenue=Decimal(cell["gross"]).quantize(CENT),
+            discount_share=Decimal(cell["discount"]).quantize(CENT),
+        )
+        for cell in cells
+    ]
+
+
+def compute_facts(days):
+    """SalesFact rows (unsaved) for the given local dates."""
+    return _facts(OrderItem.objects.filter(
+        _within_days("order__created_at", days), order__status__in=REVENUE_STATUSES,
+    ))
+
+
+def _add_fact(fact, sign):
+    cell = SalesFact.objects.filter(
+        date=fact.date, product_id=fact.product_id,
+        quantity_ml=fact.quantity_ml, selected_origin=fact.selected_origin,
+    )
+    change = {
+        field: F(field) + sign * getattr(fact, field)
+        for field in ("units", "gross_revenue", "discount_share")
+    }
+    if sign < 0:
+        # A cell that is already short (repair pending) is left alone
+        cell.filter(units__gte=fact.units).update(**change)
+        cell.filter(units=0).delete()
+        return
+    if cell.update(**change):
+        return
+    try:
+        with transaction.atomic():
+            fact.save()
+    except IntegrityError:  # created concurrently
+        cell.update(**change)
+
+
+def post_fact_deltas(signs):
+    """
+    Add (+1) or take back (-1) the cube cells of whole orders, {order_id:
+    sign}, e.g. as an order is confirmed or cancelled. One items query per
+    sign, then one UPDATE (or INSERT) per cell.
+    """
+    for sign in (1, -1):
+        order_ids = [pk for pk, order_sign in signs.items() if order_sign == sign]
+        if order_ids:
+            for fact in _facts(OrderItem.objects.filter(order_id__in=order_ids)):
+                _add_fact(fact, sign)
+
+
+def revenue_sign(before, after):
+    """+1 if an order moved into REVENUE_STATUSES, -1 if it left them, else 0."""
+    return int(after in REVENUE_STATUSES) - int(before in REVENUE_STATUSES)
+
+
+def rebuild_facts(days):
+    """Replace the cube cells of the given days (cells can disappear, so no upsert)."""
+    facts = compute_facts(days)
+    SalesFact.objects.filter(date__in=days).delete()
+    SalesFact.objects.bulk_create(facts, batch_size=1000)
+
+
+def _run(job, rebuild, full, now, customers=True):
+    """
+    Rebuild every day touched since `job`'s watermark (every day when `full`
+    or on the first run) and advance it. Concurrent runs of a job queue on
+    its watermark row. Returns the number of days rebuilt.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        mark, created = RollupWatermark.objects.select_for_update().get_or_create(
+            job=job, defaults={"high_water": now},
+        )
+        since = None if full or created else mark.high_water - OVERLAP
+        days = touched_days(since, customers=customers)
+        for start in range(0, len(days), DAYS_PER_QUERY):
+            rebuild(days[start:start + DAYS_PER_QUERY])
+        mark.high_water = now
+        mark.save(update_fields=["high_water", "updated_at"])
+    return len(days)
+
+
+def rollup_sales(full=False, now=None):
+    """Bring SalesAnalytics up to date. Returns the number of days written."""
+    return _run(DAILY_JOB, lambda days: upsert_days(compute_days(days)), full, now)
+
+
+def rollup_cube(full=False, now=None):
+    """
+    Rebuild the SalesFact days touched since the last run (repair for
+    missed deltas). Returns the number of days rebuilt.
+    """
+    return _run(CUBE_JOB, rebuild_facts, full, now, customers=False)
@@ -4,29 +4,61 @@ Analytics serializers.
 
 from rest_framework import serializers
 
+from .cube import DIMENSIONS, MEASURES
 from .models import InventoryTransfer, SalesAnalytics
+from .transfers import MAX_LINES
 
 
 class InventoryTransferSerializer(serializers.ModelSerializer):
-    admin_email = serializers.EmailField(source="admin_user.email", read_only=True)
-    product_name = serializers.CharField(source="product.name", read_only=True)
+    admin_email = serializers.EmailField(source="admin_user.email", read_only=True, default=None)
+    product_name = serializers.CharField(source="product.name", read_only=True, default=None)
+    quantity_ml = serializers.IntegerField(source="variant.quantity_ml", read_only=True, default=None)
 
     class Meta:
         model = InventoryTransfer
         fields = [
-            "id", "product", "product_name", "admin_user", "admin_email",
-            "transfer_type", "quantity", "notes", "created_at",
+            "id", "product", "product_name", "variant", "quantity_ml", "origin",
+            "admin_user", "admin_email", "order", "reason", "transfer_type",
+            "quantity", "delta", "balance_after", "notes", "created_at",
         ]
-        read_only_fields = ["id", "admin_user", "created_at"]
+        read_only_fields = fields
 
 
 class InventoryTransferWriteSerializer(serializers.Serializer):
     product_id = serializers.IntegerField()
+    variant_id = serializers.IntegerField()
+    origin = serializers.ChoiceField(
+        choices=InventoryTransfer.Origin.choices, default=InventoryTransfer.Origin.INDIA,
+    )
     transfer_type = serializers.ChoiceField(choices=InventoryTransfer.TransferType.choices)
     quantity = serializers.IntegerField(min_value=1)
     notes = serializers.CharField(required=False, allow_blank=True, default="")
 
 
+class InventoryTransferLineSerializer(serializers.Serializer):
+    """One line of a batch transfer: the variant by id, or by product slug and size."""
+
+    variant_id = serializers.IntegerField(required=False)
+    product_slug = serializers.SlugField(required=False)
+    quantity_ml = serializers.IntegerField(required=False)
+    origin = serializers.ChoiceField(
+        choices=InventoryTransfer.Origin.choices, default=InventoryTransfer.Origin.INDIA,
+    )
+    transfer_type = serializers.ChoiceField(choices=InventoryTransfer.TransferType.choices)
+    quantity = serializers.IntegerField(min_value=1)
+    notes = serializers.CharField(required=False, allow_blank=True, default="")
+
+    def validate(self, attrs):
+        if not attrs.get("variant_id") and not (attrs.get("product_slug") and attrs.get("quantity_ml")):
+            raise serializers.ValidationError("Give variant_id, or product_slug and quantity_ml.")
+        return attrs
+
+
+class InventoryTransferBatchSerializer(serializers.Serializer):
+    lines = InventoryTransferLineSerializer(many=True, allow_empty=False, max_length=MAX_LINES)
+    notes = serializers.CharField(required=False, allow_blank=True, default="")
+
+
 class SalesAnalyticsSerializer(serializers.ModelSerializer):
     class Meta:
         model = SalesAnalytics
@@ -47,3 +79,61 @@ class DashboardSerializer(serializers.Serializer):
     low_stock_products = serializers.IntegerField()
     recent_orders = serializers.ListField()
     revenue_trend = serializers.ListField()
+
+
+class SalesCubeQuerySerializer(serializers.Serializer):
+    """Query parameters of the sales cube endpoint; lists are comma-separated."""
+
+    group_by = serializers.CharField(required=False, default="product")
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    product = serializers.CharField(required=False)
+    category = serializers.CharField(required=False)
+    quantity_ml = serializers.CharField(required=False)
+    origin = serializers.ChoiceField(choices=["india", "switzerland"], required=False)
+    order_by = serializers.ChoiceField(
+        choices=MEASURES + [f"-{measure}" for measure in MEASURES],
+        default="-gross_revenue",
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+
+    @staticmethod
+    def _split(value):
+        return [part.strip() for part in value.split(",") if part.strip()]
+
+    def _ids(self, value):
+        try:
+            return [int(part) for part in self._split(value)]
+        except ValueError:
+            raise serializers.ValidationError("Expected a comma-separated list of numbers.")
+
+    def validate_group_by(self, value):
+        dimensions = self._split(value)
+        unknown = [dimension for dimension in dimensions if dimension not in DIMENSIONS]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown dimension(s): {', '.join(unknown)}. Choose from: {', '.join(DIMENSIONS)}."
+            )
+        return list(dict.fromkeys(dimensions))
+
+    def validate_product(self, value):
+        return self._ids(value)
+
+    def validate_category(self, value):
+        return self._ids(value)
+
+    def validate_quantity_ml(self, value):
+        return self._ids(value)
+
+    def cube_filters(self):
+        """SalesFact lookups for the validated parameters."""
+        data = self.validated_data
+        lookups = {
+            "start_date": "date__gte",
+            "end_date": "date__lte",
+            "product": "product_id__in",
+            "category": "category_id__in",
+            "quantity_ml": "quantity_ml__in",
+            "origin": "selected_origin",
+        }
+        return {lookup: data[param] for param, lookup in lookups.items() if param in data}
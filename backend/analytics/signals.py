@@ -0,0 +1,135 @@
+"""
+Signal handlers keeping the DashboardSnapshot row current (see
+analytics/snapshot.py): per-row deltas for orders, customers and products,
+recounts after bulk order writes and catalog imports, all applied after
+commit. Orders moving in or out of the revenue statuses post their sales
+cube cells (analytics/rollup.py) after commit too. ProductVariant saves that change stock are
+written to the stock ledger (analytics/ledger.py).
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from orders.models import Order
+from orders.signals import orders_bulk_updated
+from products.models import Product, ProductVariant
+from products.signals import variants_written
+
+from . import ledger, rollup, snapshot
+from .models import InventoryTransfer
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_state(sender, instance, **kwargs):
+    instance._stored_state = None
+    if instance.pk and not instance._state.adding:
+        instance._stored_state = (
+            Order.objects.filter(pk=instance.pk)
+            .values_list("status", "total_amount", "created_at")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Order)
+def count_order(sender, instance, created, **kwargs):
+    after = snapshot.order_contribution(instance.status, instance.total_amount, instance.created_at)
+    stored = getattr(instance, "_stored_state", None)
+    before = snapshot.order_contribution(*stored) if stored else dict.fromkeys(after, 0)
+    snapshot.apply_delta(**{field: after[field] - before[field] for field in after})
+    snapshot.invalidate_recent_orders()
+
+    # A new order has no items yet; they count from its first transition
+    sign = rollup.revenue_sign(stored[0], instance.status) if stored else 0
+    if sign:
+        transaction.on_commit(lambda: rollup.post_fact_deltas({instance.pk: sign}))
+
+
+@receiver(post_delete, sender=Order)
+def uncount_order(sender, instance, **kwargs):
+    contribution = snapshot.order_contribution(instance.status, instance.total_amount, instance.created_at)
+    snapshot.apply_delta(**{field: -value for field, value in contribution.items()})
+    snapshot.invalidate_recent_orders()
+
+
+@receiver(orders_bulk_updated)
+def recount_orders(sender, order_ids, status, previous, **kwargs):
+    snapshot.refresh_after_commit("pending_orders", "revenue_30d")
+    snapshot.invalidate_recent_orders()
+    signs = {pk: rollup.revenue_sign(before, status) for pk, before in previous.items()}
+    signs = {pk: sign for pk, sign in signs.items() if sign}
+    if signs:
+        transaction.on_commit(lambda: rollup.post_fact_deltas(signs))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def count_customer(sender, instance, created, **kwargs):
+    if created and instance.role == "customer":
+        snapshot.apply_delta(total_customers=1)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def uncount_customer(sender, instance, **kwargs):
+    if instance.role == "customer":
+        snapshot.apply_delta(total_customers=-1)
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_active(sender, instance, **kwargs):
+    instance._dashboard_was_active = False
+    if instance.pk and not instance._state.adding:
+        instance._dashboard_was_active = bool(
+            Product.objects.filter(pk=instance.pk).values_list("is_active", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Product)
+def count_product(sender, instance, created, **kwargs):
+    was_active = getattr(instance, "_dashboard_was_active", False)
+    if was_active != instance.is_active:
+        sign = 1 if instance.is_active else -1
+        low_stock = instance.variants.filter(snapshot.LOW_STOCK).count() if not created else 0
+        snapshot.apply_delta(total_products=sign, low_stock_products=sign * low_stock)
+
+
+@receiver(post_delete, sender=Product)
+def uncount_product(sender, instance, **kwargs):
+    if instance.is_active:
+        snapshot.apply_delta(total_products=-1)
+
+
+@receiver(pre_save, sender=ProductVariant)
+def remember_variant_stock(sender, instance, update_fields=None, **kwargs):
+    instance._ledger_stock = None
+    if instance.pk and not instance._state.adding and (
+        update_fields is None or {"india_stock", "switzerland_stock"} & set(update_fields)
+    ):
+        instance._ledger_stock = (
+            ProductVariant.objects.filter(pk=instance.pk).values_list("india_stock", "switzerland_stock").first()
+        )
+
+
+@receiver(post_save, sender=ProductVariant)
+def record_variant_stock(sender, instance, created, **kwargs):
+    """Ledger rows for stock set through save(): admin edits, variant forms, seeding."""
+    before = getattr(instance, "_ledger_stock", None)
+    if not created and before is None:
+        return
+    reason = InventoryTransfer.Reason.OPENING if created else InventoryTransfer.Reason.MANUAL
+    entries = []
+    for origin, old in zip(ledger.ORIGINS, before or (0, 0)):
+        balance = getattr(instance, ledger.stock_field(origin))
+        entries.append(ledger.entry(instance, origin, balance - old, balance, reason))
+    ledger.post(entries)
+    snapshot.apply_stock_changes([(instance.product_id, before, ledger.stock(instance))])
+
+
+@receiver(post_delete, sender=ProductVariant)
+def uncount_variant(sender, instance, **kwargs):
+    snapshot.apply_stock_changes([(instance.product_id, ledger.stock(instance), None)])
+
+
+@receiver(variants_written)
+def recount_stock(sender, product_ids, **kwargs):
+    snapshot.refresh_after_commit("low_stock_products", "total_products")
@@ -0,0 +1,180 @@
+"""
+Materialized admin dashboard.
+
+The dashboard's numbers live in one DashboardSnapshot row. Signal
+handlers (analytics/signals.py) apply deltas to it as orders, customers
+and products change, so reading the dashboard is one primary-key lookup
+plus the recent-orders fragment, which is cached separately.
+
+Deltas are exact for single-row saves and are folded in after the
+writer's transaction commits, so checkout never holds a lock on the
+snapshot row. Bulk order writes that send no model signals (hold expiry,
+admin bulk actions) send orders.signals.orders_bulk_updated instead, and
+the affected metrics are recounted after commit. Low stock moves only when
+a stock write takes a variant across LOW_STOCK_LEVEL (apply_stock_changes,
+called by the ledger, checkout and variant saves, which already know the
+old and new balances); it is recounted from scratch by `manage.py
+rebuild_dashboard_snapshot` (nightly, which also moves the 30-day window),
+by `?fresh=1` and after a catalog import.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from orders.models import Order
+from orders.serializers import OrderListSerializer, order_list_queryset
+from products.models import Product, ProductVariant
+
+from .models import DashboardSnapshot, SalesAnalytics
+from .rollup import CENT, REVENUE_STATUSES
+
+SNAPSHOT_PK = 1
+WINDOW = timedelta(days=30)
+LOW_STOCK_LEVEL = 10
+RECENT_ORDERS_KEY = "dashboard:recent-orders"
+RECENT_ORDERS_TIMEOUT = 60
+LOW_STOCK = Q(india_stock__lte=LOW_STOCK_LEVEL) | Q(switzerland_stock__lte=LOW_STOCK_LEVEL)
+
+
+def _window_start():
+    return timezone.now() - WINDOW
+
+
+def _revenue_window():
+    stats = Order.objects.filter(
+        created_at__gte=_window_start(), status__in=REVENUE_STATUSES,
+    ).aggregate(revenue=Sum("total_amount"), orders=Count("id"))
+    revenue = Decimal(stats["revenue"] or 0).quantize(CENT)
+    return {"revenue_30d": revenue, "orders_30d": stats["orders"]}
+
+
+def _revenue_trend():
+    return [
+        {"date": entry.date.isoformat(), "revenue": str(entry.total_revenue), "orders": entry.total_orders}
+        for entry in SalesAnalytics.objects.filter(
+            date__gte=timezone.localdate() - WINDOW,
+        ).order_by("date")
+    ]
+
+
+# metric (or group of metrics computed together) → function returning {field: value}
+METRICS = {
+    "revenue_30d": _revenue_window,
+    "orders_30d": _revenue_window,
+    "total_customers": lambda: {
+        "total_customers": get_user_model().objects.filter(role="customer").count(),
+    },
+    "total_products": lambda: {
+        "total_products": Product.objects.filter(is_active=True).count(),
+    },
+    "pending_orders": lambda: {
+        "pending_orders": Order.objects.filter(status=Order.Status.PENDING).count(),
+    },
+    "low_stock_products": lambda: {
+        "low_stock_products": ProductVariant.objects.filter(LOW_STOCK, product__is_active=True).count(),
+    },
+    "revenue_trend": lambda: {"revenue_trend": _revenue_trend()},
+}
+
+
+def _compute(names):
+    values = {}
+    for compute in dict.fromkeys(METRICS[name] for name in names):
+        values.update(compute())
+    return values
+
+
+def rebuild_snapshot():
+    """Recompute every metric from scratch and drop the recent-orders fragment."""
+    snapshot, _ = DashboardSnapshot.objects.update_or_create(
+        pk=SNAPSHOT_PK, defaults={**_compute(METRICS), "rebuilt_at": timezone.now()},
+    )
+    cache.delete(RECENT_ORDERS_KEY)
+    return snapshot
+
+
+def get_snapshot():
+    """The snapshot row, built on first use."""
+    return DashboardSnapshot.objects.filter(pk=SNAPSHOT_PK).first() or rebuild_snapshot()
+
+
+def refresh_metrics(*names):
+    """Recount some metrics in place (after writes that sent no per-row signals)."""
+    DashboardSnapshot.objects.filter(pk=SNAPSHOT_PK).update(
+        **_compute(names), updated_at=timezone.now(),
+    )
+
+
+def _add(deltas):
+    DashboardSnapshot.objects.filter(pk=SNAPSHOT_PK).update(
+        **{field: F(field) + delta for field, delta in deltas.items()},
+        updated_at=timezone.now(),
+    )
+
+
+def apply_delta(**deltas):
+    """
+    Add signed deltas to counters once the current transaction commits,
+    e.g. apply_delta(pending_orders=-1). Dropped if it rolls back.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if deltas:
+        transaction.on_commit(lambda: _add(deltas))
+
+
+def is_low_stock(stock):
+    """Whether a variant with `stock` = (india_stock, switzerland_stock) counts as low."""
+    return stock is not None and min(stock) <= LOW_STOCK_LEVEL
+
+
+def apply_stock_changes(changes):
+    """
+    Move low_stock_products after commit for the variants in `changes`,
+    [(product_id, old stock, new stock)] with stock as (india_stock,
+    switzerland_stock), or None before a variant exists / after it is gone.
+    Only variants crossing LOW_STOCK_LEVEL cost anything: one query then
+    leaves out those of inactive products.
+    """
+    crossings = defaultdict(int)
+    for product_id, old, new in changes:
+        crossings[product_id] += is_low_stock(new) - is_low_stock(old)
+    crossings = {product_id: delta for product_id, delta in crossings.items() if delta}
+    if not crossings:
+        return
+    active = Product.objects.filter(pk__in=crossings, is_active=True).values_list("pk", flat=True)
+    apply_delta(low_stock_products=sum(crossings[product_id] for product_id in active))
+
+
+def refresh_after_commit(*names):
+    transaction.on_commit(lambda: refresh_metrics(*names))
+
+
+def order_contribution(status, total_amount, created_at):
+    """What one order adds to the order counters."""
+    counted = status in REVENUE_STATUSES and created_at is not None and created_at >= _window_start()
+    return {
+        "pending_orders": int(status == Order.Status.PENDING),
+        "orders_30d": int(counted),
+        "revenue_30d": total_amount if counted else 0,
+    }
+
+
+def recent_orders(fresh=False):
+    """Serialized ten newest orders, cached for RECENT_ORDERS_TIMEOUT seconds."""
+    data = None if fresh else cache.get(RECENT_ORDERS_KEY)
+    if data is None:
+        orders = order_list_queryset(Order.objects.order_by("-created_at"))[:10]
+        data = OrderListSerializer(orders, many=True).data
+        cache.set(RECENT_ORDERS_KEY, data, RECENT_ORDERS_TIMEOUT)
+    return data
+
+
+def invalidate_recent_orders():
+    transaction.on_commit(lambda: cache.delete(RECENT_ORDERS_KEY))
@@ -1,3 +1,450 @@
+import io
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.admin import AdminSite
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from orders.admin import OrderAdmin
+from orders.models import Order, OrderItem
+from orders.stock import StockLine, deduct_stock
+from products.models import Category, Product, ProductVariant
+
+from .ledger import LedgerLine, apply, reconcile
+from .models import DashboardSnapshot, InventoryTransfer, SalesAnalytics, SalesFact
+from .rollup import ROLLUP_TZ, rollup_cube, rollup_sales
+from .snapshot import rebuild_snapshot
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Men")
+        self.product = Product.objects.create(name="Oud", description="-", category=category)
+        self.customer = User.objects.create_user(email="buyer@example.com", password="pass12345", first_name="B")
+
+    def order(self, placed_at, total, quantity, status=Order.Status.DELIVERED):
+        order = Order.objects.create(
+            user=self.customer, status=status, subtotal=total, total_amount=total,
+            shipping_name="B", shipping_address="-", shipping_city="Mumbai",
+            shipping_pincode="400001", shipping_phone="9999999999",
+        )
+        OrderItem.objects.create(
+            order=order, product=self.product, product_name="Oud",
+            quantity=quantity, price_at_purchase=total / quantity,
+        )
+        # As if placed (and last touched) long before the rollup runs
+        Order.objects.filter(pk=order.pk).update(created_at=placed_at, updated_at=placed_at)
+        order.refresh_from_db()
+        return order
+
+    def day(self, date):
+        row = SalesAnalytics.objects.get(date=date)
+        return row.total_orders, row.total_revenue, row.products_sold
+
+    def test_orders_roll_up_per_kolkata_day_and_late_changes_correct_them(self):
+        # 23:30 and 00:30 IST fall on different days although both are 1 March in UTC
+        late = datetime(2026, 3, 1, 23, 30, tzinfo=ROLLUP_TZ)
+        early = datetime(2026, 3, 2, 0, 30, tzinfo=ROLLUP_TZ)
+        first = self.order(late, Decimal("100.00"), 1)
+        self.order(late, Decimal("250.00"), 2)
+        self.order(early, Decimal("400.00"), 4)
+        self.order(early, Decimal("999.00"), 1, status=Order.Status.PENDING)
+
+        self.assertEqual(rollup_sales(), 3)  # first run: both order days and today's sign-up
+        self.assertEqual(self.day(late.date()), (2, Decimal("350.00"), 3))
+        self.assertEqual(self.day(early.date()), (1, Decimal("400.00"), 4))
+        self.assertEqual(SalesAnalytics.objects.get(date=timezone.localdate()).new_customers, 1)
+        User.objects.filter(pk=self.customer.pk).update(created_at=early)
+
+        first.status = Order.Status.REFUNDED
+        first.save()
+        self.assertEqual(rollup_sales(), 1)  # only the refunded order's day
+        self.assertEqual(self.day(late.date()), (1, Decimal("250.00"), 2))
+        self.assertEqual(self.day(early.date()), (1, Decimal("400.00"), 4))
+
+        # Once the watermark has moved past the overlap window, quiet runs touch nothing
+        later = timezone.now() + timedelta(hours=1)
+        rollup_sales(now=later)
+        self.assertEqual(rollup_sales(now=later + timedelta(hours=1)), 0)
+
+
+class SalesCubeTests(TestCase):
+    def setUp(self):
+        self.men = Category.objects.create(name="Men")
+        women = Category.objects.create(name="Women")
+        self.oud = Product.objects.create(name="Oud", description="-", category=self.men)
+        self.rose = Product.objects.create(name="Rose", description="-", category=women)
+        self.customer = User.objects.create_user(email="buyer@example.com", password="pass12345", first_name="B")
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_superuser(email="admin@example.com", password="pass12345", first_name="A")
+        )
+        self.placed = datetime(2026, 9, 10, 12, 0, tzinfo=ROLLUP_TZ)
+
+    def order(self, lines, discount=Decimal("0.00"), status=Order.Status.DELIVERED):
+        subtotal = sum(price * quantity for _, _, _, quantity, price in lines)
+        order = Order.objects.create(
+            user=self.customer, status=status, subtotal=subtotal, discount_amount=discount,
+            total_amount=subtotal - discount, shipping_name="B", shipping_address="-",
+            shipping_city="Mumbai", shipping_pincode="400001", shipping_phone="9999999999",
+        )
+        for product, ml, origin, quantity, price in lines:
+            OrderItem.objects.create(
+                order=order, product=product, product_name=product.name, quantity_ml=ml,
+                selected_origin=origin, quantity=quantity, price_at_purchase=price,
+            )
+        Order.objects.filter(pk=order.pk).update(created_at=self.placed, updated_at=self.placed)
+        order.refresh_from_db()
+        return order
+
+    def cube(self, query):
+        with self.assertNumQueries(2):  # totals + grouped rows
+            response = self.client.get(f"/api/admin/analytics/cube/{query}")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cube_groups_filters_and_follows_refunds(self):
+        # 300 of a 600 order carries half of its 60 discount
+        first = self.order(
+            [(self.oud, 50, "switzerland", 2, Decimal("150.00")), (self.rose, 100, "india", 1, Decimal("300.00"))],
+            discount=Decimal("60.00"),
+        )
+        self.order([(self.oud, 50, "switzerland", 1, Decimal("150.00"))])
+        self.order([(self.oud, 100, "india", 1, Decimal("500.00"))])
+        self.order([(self.rose, 50, "switzerland", 9, Decimal("99.00"))], status=Order.Status.CANCELLED)
+
+        self.assertEqual(rollup_cube(), 1)
+        self.assertEqual(SalesFact.objects.count(), 3)
+
+        swiss = self.cube("?group_by=product,quantity_ml&origin=switzerland&quantity_ml=50"
+                          "&start_date=2026-09-01&end_date=2026-09-30&order_by=-units")
+        self.assertEqual(swiss["results"], [{
+            "product_id": self.oud.pk, "product_name": "Oud", "quantity_ml": 50,
+            "units": 3, "gross_revenue": 450.0, "discount_share": 30.0, "net_revenue": 420.0,
+        }])
+
+        by_category = self.cube("?group_by=category")["results"]
+        self.assertEqual(
+            [(row["category_name"], row["units"], row["gross_revenue"]) for row in by_category],
+            [("Men", 4, 950.0), ("Women", 1, 300.0)],
+        )
+
+        first.status = Order.Status.REFUNDED
+        first.save()
+        rollup_cube()
+        totals = self.cube("?group_by=day")["totals"]
+        self.assertEqual((totals["units"], totals["gross_revenue"]), (2, 650.0))
+        self.assertFalse(SalesFact.objects.filter(product=self.rose).exists())
+
+    def test_status_transitions_post_deltas_the_repair_agrees_with(self):
+        def cells():
+            return sorted(SalesFact.objects.values_list(
+                "date", "product_id", "quantity_ml", "selected_origin", "units", "gross_revenue", "discount_share",
+            ))
+
+        pending = Order.Status.PENDING
+        first = self.order([(self.oud, 50, "india", 2, Decimal("150.00"))], discount=Decimal("30.00"), status=pending)
+        second = self.order(
+            [(self.oud, 50, "india", 1, Decimal("150.00")), (self.rose, 100, "india", 1, Decimal("300.00"))],
+            status=pending,
+        )
+        self.assertEqual(cells(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for state in (Order.Status.CONFIRMED, Order.Status.SHIPPED):  # the second move adds nothing
+                first.status = state
+                first.save()
+            OrderAdmin(Order, AdminSite())._set_status(Order.objects.filter(pk=second.pk), Order.Status.CONFIRMED)
+        self.assertEqual(
+            [(units, gross, discount) for *_, units, gross, discount in cells()],
+            [(3, Decimal("450.00"), Decimal("30.00")), (1, Decimal("300.00"), Decimal("0.00"))],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.refresh_from_db()
+            second.status = Order.Status.CANCELLED
+            second.save()
+        posted = cells()
+        self.assertEqual([(product, units) for _, product, _, _, units, *_ in posted], [(self.oud.pk, 2)])
+
+        rollup_cube(full=True)
+        self.assertEqual(cells(), posted)
+
+    def test_invalid_query_is_rejected(self):
+        response = self.client.get("/api/admin/analytics/cube/?group_by=colour&order_by=price")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {"group_by", "order_by"})
+
+
+class DashboardSnapshotTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Men")
+        self.product = Product.objects.create(name="Oud", description="-", category=category)
+        self.customer = User.objects.create_user(email="buyer@example.com", password="pass12345", first_name="B")
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_superuser(email="admin@example.com", password="pass12345", first_name="A")
+        )
+
+    def order(self, total, status=Order.Status.PENDING):
+        return Order.objects.create(
+            user=self.customer, status=status, subtotal=total, total_amount=total,
+            shipping_name="B", shipping_address="-", shipping_city="Mumbai",
+            shipping_pincode="400001", shipping_phone="9999999999",
+        )
+
+    def dashboard(self, query=""):
+        response = self.client.get(f"/api/admin/analytics/dashboard/{query}")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data["pending_orders"], data["total_orders"], data["total_revenue"]
+
+    def test_order_writes_move_the_counters(self):
+        rebuild_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.order(Decimal("100.00"))
+            self.order(Decimal("50.00"), status=Order.Status.DELIVERED)
+        self.assertEqual(self.dashboard(), (1, 1, "50.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = Order.Status.CONFIRMED
+            order.save()
+        self.assertEqual(self.dashboard(), (0, 2, "150.00"))
+
+        # Deltas wait for the commit; a rolled-back write leaves no trace
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            order.status = Order.Status.CANCELLED
+            order.save()
+        self.assertEqual(self.dashboard(), (0, 2, "150.00"))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.dashboard(), (0, 1, "50.00"))
+
+        # A bulk write sends no model signals; the sender recounts instead
+        Order.objects.filter(pk=order.pk).update(status=Order.Status.PENDING)
+        self.assertEqual(self.dashboard(), (0, 1, "50.00"))
+        self.assertEqual(self.dashboard("?fresh=1"), (1, 1, "50.00"))
+
+        snapshot = DashboardSnapshot.objects.get()
+        self.assertEqual((snapshot.total_customers, snapshot.total_products), (1, 1))
+
+    def test_stock_writes_move_low_stock_on_crossings(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            variant = ProductVariant.objects.create(
+                product=self.product, quantity_ml=50, india_price=Decimal("999.00"),
+                switzerland_price=Decimal("50.00"), india_stock=20, switzerland_stock=20,
+            )
+        before = rebuild_snapshot()
+        # The 5ml tester created alongside the 50ml variant starts at zero
+        self.assertEqual(before.low_stock_products, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            apply([LedgerLine(variant.pk, "india", -5)], InventoryTransfer.Reason.MANUAL)
+        snapshot = DashboardSnapshot.objects.get()
+        self.assertEqual((snapshot.updated_at, snapshot.low_stock_products), (before.updated_at, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deduct_stock([StockLine(variant.pk, "india", 6, "Oud")])
+        self.assertEqual(DashboardSnapshot.objects.get().low_stock_products, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            apply([LedgerLine(variant.pk, "india", 10)], InventoryTransfer.Reason.MANUAL)
+        self.assertEqual(DashboardSnapshot.objects.get().low_stock_products, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            variant.switzerland_stock = 3
+            variant.save()
+        self.assertEqual(DashboardSnapshot.objects.get().low_stock_products, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.is_active = False
+            self.product.save()
+        self.assertEqual(DashboardSnapshot.objects.get().low_stock_products, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            apply([LedgerLine(variant.pk, "switzerland", 20)], InventoryTransfer.Reason.MANUAL)
+        self.assertEqual(DashboardSnapshot.objects.get().low_stock_products, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.is_active = True
+            self.product.save()
+        self.assertEqual(DashboardSnapshot.objects.get().low_stock_products, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.variants.filter(quantity_ml=5).get().delete()
+        self.assertEqual(DashboardSnapshot.objects.get().low_stock_products, 0)
+        self.assertEqual(rebuild_snapshot().low_stock_products, 0)
+
+    def test_cached_read_is_one_query(self):
+        self.order(Decimal("100.00"))
+        self.dashboard()
+        with self.assertNumQueries(1):  # the snapshot row; recent orders come from cache
+            self.dashboard()
+
+
+class InventoryLedgerTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Men")
+        self.product = Product.objects.create(name="Oud", description="-", category=category)
+        self.variant = ProductVariant.objects.create(
+            product=self.product, quantity_ml=50, india_price=Decimal("999.00"),
+            switzerland_price=Decimal("50.00"), india_stock=10, switzerland_stock=4,
+        )
+        self.customer = User.objects.create_user(email="buyer@example.com", password="pass12345", first_name="B")
+        self.admin = User.objects.create_superuser(email="admin@example.com", password="pass12345", first_name="A")
+        self.client = APIClient()
+
+    def rows(self, **filters):
+        return list(
+            InventoryTransfer.objects.filter(variant=self.variant, **filters)
+            .order_by("id").values_list("reason", "origin", "delta", "balance_after")
+        )
+
+    def transfer(self, **data):
+        self.client.force_authenticate(self.admin)
+        return self.client.post("/api/admin/inventory/transfer/", {
+            "product_id": self.product.pk, "variant_id": self.variant.pk, **data,
+        }, format="json")
+
+    def test_checkout_and_cancel_are_recorded_once(self):
+        self.assertEqual(self.rows(), [("opening", "india", 10, 10), ("opening", "switzerland", 4, 4)])
+
+        self.client.force_authenticate(self.customer)
+        response = self.client.post("/api/orders/buy-now/", {
+            "variant_id": self.variant.pk, "quantity": 3, "selected_origin": "india",
+            "shipping_name": "B", "shipping_address": "-", "shipping_city": "Mumbai",
+            "shipping_pincode": "400001", "shipping_phone": "9999999999", "payment_method": "cod",
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual(self.rows(order=order), [("checkout", "india", -3, 7)])
+
+        self.client.force_authenticate(self.admin)
+        for _ in range(2):  # a second cancel returns nothing more
+            self.client.put(f"/api/admin/orders/{order.pk}/status/", {"status": "cancelled"}, format="json")
+        self.assertEqual(self.rows(order=order), [("checkout", "india", -3, 7), ("cancel", "india", 3, 10)])
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.india_stock, 10)
+
+    def test_cancel_after_shipping_does_not_restock(self):
+        self.client.force_authenticate(self.customer)
+        self.client.post("/api/orders/buy-now/", {
+            "variant_id": self.variant.pk, "quantity": 3, "selected_origin": "india",
+            "shipping_name": "B", "shipping_address": "-", "shipping_city": "Mumbai",
+            "shipping_pincode": "400001", "shipping_phone": "9999999999", "payment_method": "cod",
+        }, format="json")
+        order = Order.objects.get()
+
+        self.client.force_authenticate(self.admin)
+        for state in ("shipped", "cancelled"):
+            self.client.put(f"/api/admin/orders/{order.pk}/status/", {"status": state}, format="json")
+        self.assertEqual(self.rows(order=order), [("checkout", "india", -3, 7)])
+
+    def test_history_outlives_the_variant(self):
+        self.variant.delete()
+        self.assertEqual(
+            list(InventoryTransfer.objects.filter(product=self.product, variant__isnull=True).values_list("delta", flat=True)),
+            [4, 10],
+        )
+
+    def test_history_outlives_the_product(self):
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.delete(f"/api/admin/products/{self.product.pk}/").status_code, 204)
+
+        rows = self.client.get("/api/admin/inventory/transfers/").json()["results"]
+        self.assertEqual(
+            [(row["product"], row["product_name"], row["variant"], row["delta"]) for row in rows],
+            [(None, None, None, 4), (None, None, None, 10)],
+        )
+
+    def test_manual_transfer_names_variant_and_origin(self):
+        response = self.transfer(origin="switzerland", transfer_type="out", quantity=3, notes="damaged")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            (response.json()["origin"], response.json()["delta"], response.json()["balance_after"]),
+            ("switzerland", -3, 1),
+        )
+        self.assertEqual(self.transfer(origin="switzerland", transfer_type="out", quantity=2).status_code, 400)
+        self.assertEqual(self.transfer(origin="mars", transfer_type="in", quantity=1).status_code, 400)
+
+        history = self.client.get(f"/api/admin/inventory/transfers/?variant_id={self.variant.pk}&origin=switzerland")
+        self.assertEqual(
+            [(row["reason"], row["delta"], row["notes"]) for row in history.json()["results"]],
+            [("manual", -3, "damaged"), ("opening", 4, "")],
+        )
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        self.variant.india_stock = 12
+        self.variant.save()  # recorded as a manual edit
+        self.assertEqual(reconcile(), [])
+
+        ProductVariant.objects.filter(pk=self.variant.pk).update(switzerland_stock=9)  # bypasses the ledger
+        out = io.StringIO()
+        call_command("reconcile_stock", "--fix", batch_size=1, stdout=out)
+        self.assertIn("on hand 9, ledger 4 (+5)", out.getvalue())
+        self.variant.refresh_from_db()
+        self.assertEqual((self.variant.india_stock, self.variant.switzerland_stock), (12, 4))
+        self.assertEqual(reconcile(), [])
+
+    def test_batch_applies_lines_in_a_fixed_number_of_queries(self):
+        other = ProductVariant.objects.create(
+            product=self.product, quantity_ml=100, india_price=Decimal("1500.00"),
+            switzerland_price=Decimal("80.00"),
+        )
+        self.client.force_authenticate(self.admin)
+        lines = [
+            {"variant_id": self.variant.pk, "transfer_type": "in", "quantity": 5},
+            {"product_slug": self.product.slug, "quantity_ml": 100, "origin": "switzerland",
+             "transfer_type": "in", "quantity": 7},
+            {"variant_id": self.variant.pk, "transfer_type": "out", "quantity": 15},
+        ]
+        with CaptureQueriesContext(connection) as baseline:
+            response = self.client.post(
+                "/api/admin/inventory/transfer/batch/", {"lines": lines, "notes": "Shipment 42"}, format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [(row["variant_id"], row["origin"], row["delta"], row["balance_after"]) for row in response.json()["results"]],
+            [(self.variant.pk, "india", 5, 15), (other.pk, "switzerland", 7, 7), (self.variant.pk, "india", -15, 0)],
+        )
+        self.assertEqual(InventoryTransfer.objects.filter(notes="Shipment 42").count(), 3)
+
+        with self.assertNumQueries(len(baseline)):
+            response = self.client.post(
+                "/api/admin/inventory/transfer/batch/", {"lines": lines[:2] * 10}, format="json",
+            )
+        self.assertEqual(response.json()["applied"], 20)
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.india_stock, 50)
+
+    def test_batch_is_all_or_nothing_with_per_line_results(self):
+        self.client.force_authenticate(self.admin)
+        upload = SimpleUploadedFile("stock.csv", (
+            "variant_id,product_slug,quantity_ml,origin,transfer_type,quantity\n"
+            f"{self.variant.pk},,,india,in,5\n"
+            ",no-such-perfume,50,india,in,1\n"
+            f"{self.variant.pk},,,switzerland,out,0\n"
+        ).encode(), content_type="text/csv")
+        response = self.client.post("/api/admin/inventory/transfer/batch/", {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([row["status"] for row in response.json()["results"]], ["skipped", "skipped", "invalid"])
 
-# Create your tests here.
+        upload = SimpleUploadedFile("stock.csv", (
+            "variant_id,product_slug,quantity_ml,origin,transfer_type,quantity\n"
+            f"{self.variant.pk},,,india,in,5\n"
+            f",{self.product.slug},50,switzerland,out,9\n"
+        ).encode(), content_type="text/csv")
+        response = self.client.post("/api/admin/inventory/transfer/batch/", {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()["results"],
+            [{"line": 1, "status": "skipped"}, {"line": 2, "status": "invalid",
+             "errors": {"quantity": ["Insufficient stock. Current: 4 (50ml - switzerland)."]}}],
+        )
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.india_stock, 10)
@@ -0,0 +1,120 @@
+"""
+Batch stock transfers (POST /api/admin/inventory/transfer/batch/).
+
+A batch is a list of lines, each naming a variant (by id, or by product
+slug and size), an origin, a direction and a quantity. It arrives as JSON
+or as a CSV upload with the same columns:
+
+    variant_id,product_slug,quantity_ml,origin,transfer_type,quantity,notes
+    12,,,india,in,40,
+    ,oud-royale,100,switzerland,in,25,Shipment 42
+
+The whole batch is validated before anything is written: one query
+resolves product slugs to variants, and ledger.apply() locks the variants
+(the second query), checks every running balance and applies the lot in
+one transaction, or nothing.
+"""
+
+import csv
+import io
+from itertools import islice
+
+from django.db.models import Q
+
+from products.models import ProductVariant
+
+from .ledger import LedgerLine
+
+MAX_LINES = 2000
+
+
+class BatchError(Exception):
+    pass
+
+
+def read_csv(upload):
+    """
+    Line dicts from an uploaded CSV, read as a stream. Blank cells are left
+    out so optional columns fall back to their defaults.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline=""))
+    try:
+        rows = list(islice(reader, MAX_LINES + 1))
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise BatchError(f"Unreadable CSV file: {exc}")
+    if len(rows) > MAX_LINES:
+        raise BatchError(f"A batch holds at most {MAX_LINES} lines.")
+    return [
+        {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        for row in rows
+    ]
+
+
+def resolve_variants(lines):
+    """
+    Fill in variant_id for lines given by product slug and size, in one
+    query. Returns {line index: error} for lines naming no such variant.
+    """
+    wanted = {
+        (line["product_slug"], line["quantity_ml"])
+        for line in lines if not line.get("variant_id")
+    }
+    if not wanted:
+        return {}
+    condition = Q()
+    for slug, quantity_ml in wanted:
+        condition |= Q(product__slug=slug, quantity_ml=quantity_ml)
+    found = {
+        (slug, quantity_ml): pk
+        for slug, quantity_ml, pk in ProductVariant.objects.filter(condition)
+        .values_list("product__slug", "quantity_ml", "pk")
+    }
+    errors = {}
+    for index, line in enumerate(lines):
+        if not line.get("variant_id"):
+            key = (line["product_slug"], line["quantity_ml"])
+            if key in found:
+                line["variant_id"] = found[key]
+            else:
+                errors[index] = f"No {key[1]}ml variant of product '{key[0]}'."
+    return errors
+
+
+def ledger_lines(lines, notes=""):
+    """LedgerLines for validated, resolved lines; `notes` fills in blank line notes."""
+    return [
+        LedgerLine(
+            line["variant_id"],
+            line["origin"],
+            line["quantity"] if line["transfer_type"] == "in" else -line["quantity"],
+            line["notes"] or notes,
+        )
+        for line in lines
+    ]
+
+
+def failed(count, errors):
+    """
+    Per-line results of a rejected batch: {line index: field errors} for the
+    invalid lines, "skipped" for the rest.
+    """
+    return [
+        {"line": index + 1, "status": "invalid", "errors": errors[index]}
+        if index in errors else {"line": index + 1, "status": "skipped"}
+        for index in range(count)
+    ]
+
+
+def applied(entries):
+    """Per-line results of an applied batch."""
+    return [
+        {
+            "line": index + 1,
+            "status": "applied",
+            "variant_id": row.variant_id,
+            "origin": row.origin,
+            "delta": row.delta,
+            "balance_after": row.balance_after,
+        }
+        for index, row in enumerate(entries)
+    ]
@@ -7,8 +7,10 @@ from . import views
 urlpatterns = [
     path("admin/analytics/dashboard/", views.DashboardView.as_view(), name="admin-dashboard"),
     path("admin/analytics/sales/", views.SalesAnalyticsView.as_view(), name="admin-sales"),
+    path("admin/analytics/cube/", views.SalesCubeView.as_view(), name="admin-sales-cube"),
     path("admin/customers/", AdminCustomerListView.as_view(), name="admin-customers"),
     path("admin/inventory/transfer/", views.InventoryTransferCreateView.as_view(), name="inventory-transfer"),
+    path("admin/inventory/transfer/batch/", views.InventoryTransferBatchView.as_view(), name="inventory-transfer-batch"),
     path("admin/inventory/transfers/", views.InventoryTransferListView.as_view(), name="inventory-transfers"),
 ]
 
@@ -2,84 +2,54 @@
 Analytics views: dashboard stats, sales data, inventory transfers.
 """
 
-from datetime import timedelta
-
-from django.db.models import Count, Sum
-from django.utils import timezone
 from rest_framework import generics, status
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from orders.models import Order
-from orders.serializers import OrderListSerializer
+from parfum.pagination import CreatedAtCursorPagination
 from parfum.permissions import IsAdmin
-from products.models import Product, ProductVariant
+from products.models import ProductVariant
 
+from . import ledger, transfers
+from .cube import query_cube
 from .models import InventoryTransfer, SalesAnalytics
 from .serializers import (
+    InventoryTransferBatchSerializer,
     InventoryTransferSerializer,
     InventoryTransferWriteSerializer,
     SalesAnalyticsSerializer,
+    SalesCubeQuerySerializer,
 )
+from .snapshot import get_snapshot, rebuild_snapshot, recent_orders
 
 
 class DashboardView(APIView):
-    """GET /api/admin/analytics/dashboard/ — Aggregated dashboard stats."""
+    """
+    GET /api/admin/analytics/dashboard/ — Aggregated dashboard stats.
+
+    Served from the materialized DashboardSnapshot (see analytics/snapshot.py);
+    ?fresh=1 recomputes it first.
+    """
 
     permission_classes = [IsAuthenticated, IsAdmin]
 
     def get(self, request):
-        now = timezone.now()
-        thirty_days_ago = now - timedelta(days=30)
-
-        # Revenue & order stats
-        order_stats = Order.objects.filter(
-            created_at__gte=thirty_days_ago,
-            status__in=["confirmed", "shipped", "delivered"],
-        ).aggregate(
-            total_revenue=Sum("total_amount"),
-            total_orders=Count("id"),
-        )
-
-        # Counts
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-
-        total_customers = User.objects.filter(role="customer").count()
-        total_products = Product.objects.filter(is_active=True).count()
-        pending_orders = Order.objects.filter(status="pending").count()
-        from django.db.models import Q
-        low_stock_variants = ProductVariant.objects.filter(
-            Q(india_stock__lte=10) | Q(switzerland_stock__lte=10),
-            product__is_active=True
-        ).count()
-
-        # Recent orders
-        recent_orders = Order.objects.order_by("-created_at")[:10]
-        recent_orders_data = OrderListSerializer(recent_orders, many=True).data
-
-        # Revenue trend (last 30 days)
-        revenue_trend = []
-        analytics = SalesAnalytics.objects.filter(
-            date__gte=thirty_days_ago.date()
-        ).order_by("date")
-        for entry in analytics:
-            revenue_trend.append({
-                "date": entry.date.isoformat(),
-                "revenue": str(entry.total_revenue),
-                "orders": entry.total_orders,
-            })
+        fresh = request.query_params.get("fresh") in ("1", "true")
+        snapshot = rebuild_snapshot() if fresh else get_snapshot()
 
         return Response({
-            "total_revenue": str(order_stats["total_revenue"] or 0),
-            "total_orders": order_stats["total_orders"],
-            "total_customers": total_customers,
-            "total_products": total_products,
-            "pending_orders": pending_orders,
-            "low_stock_products": low_stock_variants,
-            "recent_orders": recent_orders_data,
-            "revenue_trend": revenue_trend,
+            "total_revenue": str(snapshot.revenue_30d),
+            "total_orders": snapshot.orders_30d,
+            "total_customers": snapshot.total_customers,
+            "total_products": snapshot.total_products,
+            "pending_orders": snapshot.pending_orders,
+            "low_stock_products": snapshot.low_stock_products,
+            "recent_orders": recent_orders(fresh=fresh),
+            "revenue_trend": snapshot.revenue_trend,
+            "snapshot_updated_at": snapshot.updated_at,
+            "snapshot_rebuilt_at": snapshot.rebuilt_at,
         })
 
 
@@ -100,8 +70,46 @@ class SalesAnalyticsView(generics.ListAPIView):
         return queryset
 
 
+class SalesCubeView(APIView):
+    """
+    GET /api/admin/analytics/cube/ — Sales by any mix of dimensions.
+
+    Query params:
+        group_by     comma-separated: day, product, quantity_ml, origin, category
+        start_date   YYYY-MM-DD (inclusive)      end_date  YYYY-MM-DD (inclusive)
+        product      product ids                 category  category ids
+        quantity_ml  sizes, e.g. 50,100          origin    india | switzerland
+        order_by     units | gross_revenue | discount_share | net_revenue, "-" for descending
+        limit        rows to return (default 100, max 1000)
+
+    e.g. best-selling 50ml Swiss SKUs last month:
+        ?group_by=product&quantity_ml=50&origin=switzerland&start_date=2026-09-01&end_date=2026-09-30&order_by=-units
+
+    Answered from the SalesFact cube, kept current by deltas posted on
+    order status transitions (`manage.py rollup_sales --repair-cube`
+    rebuilds the touched days as a repair pass).
+    """
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        query = SalesCubeQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        rows, totals = query_cube(
+            query.validated_data["group_by"],
+            query.cube_filters(),
+            order_by=query.validated_data["order_by"],
+            limit=query.validated_data["limit"],
+        )
+        return Response({
+            "group_by": query.validated_data["group_by"],
+            "results": rows,
+            "totals": totals,
+        })
+
+
 class InventoryTransferCreateView(APIView):
-    """POST /api/admin/inventory/transfer/ — Record stock in/out."""
+    """POST /api/admin/inventory/transfer/ — Record stock in/out for one variant and origin."""
 
     permission_classes = [IsAuthenticated, IsAdmin]
 
@@ -111,76 +119,109 @@ class InventoryTransferCreateView(APIView):
         data = serializer.validated_data
 
         try:
-            product = Product.objects.get(pk=data["product_id"])
-        except Product.DoesNotExist:
+            variant = ProductVariant.objects.get(pk=data["variant_id"], product_id=data["product_id"])
+        except ProductVariant.DoesNotExist:
             return Response(
-                {"error": "Product not found."},
+                {"error": "Variant not found for this product."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Get variant (optional, defaults to first variant)
-        variant_id = request.data.get("variant_id")
-        if variant_id:
+        delta = data["quantity"] if data["transfer_type"] == "in" else -data["quantity"]
+        try:
+            [transfer] = ledger.apply(
+                [ledger.LedgerLine(variant.pk, data["origin"], delta, data["notes"])],
+                InventoryTransfer.Reason.MANUAL,
+                user=request.user,
+            )
+        except ledger.NegativeStock as exc:
+            return Response(
+                {"error": str(exc)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(
+            InventoryTransferSerializer(transfer).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class InventoryTransferBatchView(APIView):
+    """
+    POST /api/admin/inventory/transfer/batch/ — Record many stock in/out lines at once.
+
+    JSON `{"lines": [...], "notes": "..."}` or a multipart CSV upload
+    (`file`, optional `notes`); see analytics/transfers.py. Either every
+    line is applied or none is; the response has one result per line.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+    parser_classes = [JSONParser, MultiPartParser]
+
+    def post(self, request):
+        payload = request.data
+        upload = request.FILES.get("file")
+        if upload:
             try:
-                variant = ProductVariant.objects.get(pk=variant_id, product=product)
-            except ProductVariant.DoesNotExist:
+                payload = {"lines": transfers.read_csv(upload), "notes": request.data.get("notes", "")}
+            except transfers.BatchError as exc:
                 return Response(
-                    {"error": "Variant not found for this product."},
-                    status=status.HTTP_404_NOT_FOUND,
-                )
-        else:
-            variant = product.variants.first()
-            if not variant:
-                return Response(
-                    {"error": "Product has no variants."},
+                    {"error": str(exc)},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-        origin = request.data.get("origin", "india")
-        stock = variant.switzerland_stock if origin == "switzerland" else variant.india_stock
-
-        # Validate stock out
-        if data["transfer_type"] == "out" and stock < data["quantity"]:
-            return Response(
-                {"error": f"Insufficient stock. Current: {stock} ({variant.quantity_ml}ml - {origin})."},
-                status=status.HTTP_400_BAD_REQUEST,
+        serializer = InventoryTransferBatchSerializer(data=payload)
+        if not serializer.is_valid():
+            line_errors = serializer.errors.get("lines")
+            if not isinstance(line_errors, list):
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            errors = {index: error for index, error in enumerate(line_errors) if error}
+            return self.rejected(len(line_errors), errors)
+
+        lines = serializer.validated_data["lines"]
+        errors = transfers.resolve_variants(lines)
+        if errors:
+            return self.rejected(len(lines), {index: {"product_slug": [error]} for index, error in errors.items()})
+        try:
+            entries = ledger.apply(
+                transfers.ledger_lines(lines, serializer.validated_data["notes"]),
+                InventoryTransfer.Reason.MANUAL,
+                user=request.user,
             )
+        except ledger.NegativeStock as exc:
+            return self.rejected(len(lines), {index: {"quantity": [error]} for index, error in exc.errors.items()})
 
-        # Create transfer record
-        transfer = InventoryTransfer.objects.create(
-            product=product,
-            admin_user=request.user,
-            transfer_type=data["transfer_type"],
-            quantity=data["quantity"],
-            notes=f"[{origin.upper()}] {data.get('notes', '')}",
+        return Response(
+            {"applied": len(entries), "results": transfers.applied(entries)},
+            status=status.HTTP_201_CREATED,
         )
 
-        # Update variant stock
-        field_to_update = "switzerland_stock" if origin == "switzerland" else "india_stock"
-        current_val = getattr(variant, field_to_update)
-        
-        if data["transfer_type"] == "in":
-            setattr(variant, field_to_update, current_val + data["quantity"])
-        else:
-            setattr(variant, field_to_update, current_val - data["quantity"])
-            
-        variant.save(update_fields=[field_to_update])
-
+    @staticmethod
+    def rejected(count, errors):
         return Response(
-            InventoryTransferSerializer(transfer).data,
-            status=status.HTTP_201_CREATED,
+            {
+                "error": "No lines were applied; fix the invalid lines and resend the batch.",
+                "applied": 0,
+                "results": transfers.failed(count, errors),
+            },
+            status=status.HTTP_400_BAD_REQUEST,
         )
 
 
 class InventoryTransferListView(generics.ListAPIView):
-    """GET /api/admin/inventory/transfers/ — Transfer history."""
+    """
+    GET /api/admin/inventory/transfers/ — Stock ledger, newest first.
+    Filters: product_id, variant_id, origin, reason.
+    """
 
     serializer_class = InventoryTransferSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
-        queryset = InventoryTransfer.objects.select_related("product", "admin_user")
-        product_id = self.request.query_params.get("product_id")
-        if product_id:
-            queryset = queryset.filter(product_id=product_id)
+        queryset = InventoryTransfer.objects.select_related("product", "variant", "admin_user")
+        # variant_id (+ origin) is served by the (variant, origin, created_at) index
+        for param in ("product_id", "variant_id", "origin", "reason"):
+            value = self.request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{param: value})
         return queryset
@@ -13,6 +13,15 @@ python manage.py collectstatic --noinput
 # Apply any new database migrations
 python manage.py migrate
 
+# Table for CATALOG_CACHE_BACKEND=db (no-op for other backends)
+python manage.py createcachetable
+
+# Re-render tester box snapshots in case the payload shape changed
+python manage.py rebuild_tester_boxes
+
+# Fill slug/image snapshots on order items placed before they existed (only touches empty rows)
+python manage.py backfill_order_item_snapshots
+
 # REMOVED: Superuser and Seed Data commands
 
 
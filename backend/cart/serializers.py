@@ -2,15 +2,74 @@
 Cart and Wishlist serializers.
 """
 
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db.models import Prefetch
 from rest_framework import serializers
 
-from products.serializers import ProductListSerializer, ProductThumbnailSerializer, ProductVariantSerializer
+from products.models import Product
+from products.serializers import ProductImageSerializer, ProductThumbnailSerializer, ProductVariantSerializer
 
 from .models import Cart, CartItem, Wishlist
 
+CART_ITEM_FIELDS = [
+    "cart", "product", "selected_origin", "quantity", "tester_box_items",
+    "variant__quantity_ml", "variant__oversell",
+    "variant__india_price", "variant__india_discount_price", "variant__india_stock",
+    "variant__switzerland_price", "variant__switzerland_discount_price", "variant__switzerland_stock",
+    "variant__product__name", "variant__product__slug",
+    "variant__product__inspired_by", "variant__product__is_active", "variant__product__is_roll_on",
+    "variant__product__primary_image",
+]
+
+
+class CartTotals(NamedTuple):
+    items: int
+    price: Decimal
+
+
+def load_cart(user):
+    """
+    The user's cart (created on first use) with its lines in `cart.lines`:
+    items, variants, products and primary images in one joined prefetch
+    query. `cart.totals` is computed once from the loaded lines.
+    """
+    lines = (
+        CartItem.objects.select_related("variant__product__primary_image")
+        .only(*CART_ITEM_FIELDS)
+        .order_by("pk")
+    )
+    cart, created = Cart.objects.prefetch_related(
+        Prefetch("items", queryset=lines, to_attr="lines"),
+    ).get_or_create(user=user)
+    if created:
+        cart.lines = []
+    cart.totals = CartTotals(
+        items=sum(item.quantity for item in cart.lines),
+        price=sum((item.line_total for item in cart.lines), Decimal("0.00")),
+    )
+    return cart
+
+
+class CartProductSerializer(serializers.ModelSerializer):
+    """Slim product block for cart lines: the line's variant is serialized beside it."""
+
+    primary_image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ["id", "name", "slug", "inspired_by", "is_active", "is_roll_on", "primary_image"]
+
+    def get_primary_image(self, obj):
+        if obj.primary_image_id:
+            return ProductImageSerializer(obj.primary_image).data
+        return None
+
 
 class CartItemSerializer(serializers.ModelSerializer):
-    product = ProductListSerializer(read_only=True)
+    # Same product as item.product, already joined through the variant
+    product = CartProductSerializer(source="variant.product", read_only=True)
     variant = ProductVariantSerializer(read_only=True)
     line_total = serializers.ReadOnlyField()
 
@@ -38,9 +97,11 @@ class CartItemWriteSerializer(serializers.Serializer):
 
 
 class CartSerializer(serializers.ModelSerializer):
-    items = CartItemSerializer(many=True, read_only=True)
-    total_items = serializers.ReadOnlyField()
-    total_price = serializers.ReadOnlyField()
+    """Renders a cart from load_cart()."""
+
+    items = CartItemSerializer(source="lines", many=True, read_only=True)
+    total_items = serializers.ReadOnlyField(source="totals.items")
+    total_price = serializers.ReadOnlyField(source="totals.price")
 
     class Meta:
         model = Cart
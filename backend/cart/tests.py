@@ -1,3 +1,55 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from products.models import Category, Product, ProductImage, ProductVariant
+
+
+@override_settings(STORAGES={**settings.STORAGES, "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"}})
+class CartReadTests(TestCase):
+    """The cart is read in a fixed number of queries however many lines it holds."""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Men")
+        self.user = User.objects.create_user(email="buyer@example.com", password="pass12345", first_name="B")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_lines(self, count):
+        for _ in range(count):
+            product = Product.objects.create(
+                name=f"Oud {Product.objects.count()}", description="-", category=self.category,
+            )
+            ProductImage.objects.create(product=product, image=f"products/{product.slug}.jpg")
+            variant = ProductVariant.objects.create(
+                product=product, quantity_ml=50, india_price=Decimal("1000.00"),
+                india_discount_price=Decimal("800.00"), switzerland_price=Decimal("50.00"), india_stock=10,
+            )
+            response = self.client.post("/api/cart/add/", {"variant_id": variant.pk, "quantity": 2}, format="json")
+            self.assertEqual(response.status_code, 200)
+
+    def test_cart_read_is_flat(self):
+        for count in (1, 10):
+            self.add_lines(count)
+            with self.assertNumQueries(2):  # cart, then its lines with variant/product/image joined
+                response = self.client.get("/api/cart/")
+        data = response.json()
+        self.assertEqual((len(data["items"]), data["total_items"], data["total_price"]), (11, 22, 17600.0))
+        line = data["items"][0]
+        self.assertEqual(line["line_total"], 1600.0)
+        self.assertEqual(set(line["product"]), {"id", "name", "slug", "inspired_by", "is_active", "is_roll_on", "primary_image"})
+        self.assertTrue(line["product"]["primary_image"]["image"].endswith(".jpg"))
+
+    def test_mutations_return_the_whole_cart(self):
+        self.add_lines(2)
+        item_id = self.client.get("/api/cart/").json()["items"][0]["id"]
+
+        data = self.client.put(f"/api/cart/update/{item_id}/", {"quantity": 5}, format="json").json()
+        self.assertEqual(data["total_items"], 7)
+        data = self.client.delete(f"/api/cart/remove/{item_id}/").json()
+        self.assertEqual(data["total_items"], 2)
+        data = self.client.delete("/api/cart/clear/").json()
+        self.assertEqual((data["items"], data["total_items"], data["total_price"]), ([], 0, 0.0))
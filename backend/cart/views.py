@@ -15,6 +15,7 @@ from .serializers import (
     CartSerializer,
     WishlistSerializer,
     WishlistToggleSerializer,
+    load_cart,
 )
 
 
@@ -24,9 +25,7 @@ class CartView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        return Response(CartSerializer(load_cart(request.user)).data)
 
 
 class CartAddView(APIView):
@@ -84,7 +83,7 @@ class CartAddView(APIView):
                 )
             cart_item.save()
 
-        return Response(CartSerializer(cart).data, status=status.HTTP_200_OK)
+        return Response(CartSerializer(load_cart(request.user)).data, status=status.HTTP_200_OK)
 
 
 class CartUpdateView(APIView):
@@ -122,7 +121,7 @@ class CartUpdateView(APIView):
         cart_item.quantity = quantity
         cart_item.save()
 
-        return Response(CartSerializer(cart_item.cart).data)
+        return Response(CartSerializer(load_cart(request.user)).data)
 
 
 class CartRemoveView(APIView):
@@ -141,9 +140,8 @@ class CartRemoveView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        cart = cart_item.cart
         cart_item.delete()
-        return Response(CartSerializer(cart).data)
+        return Response(CartSerializer(load_cart(request.user)).data)
 
 
 class CartClearView(APIView):
@@ -152,9 +150,8 @@ class CartClearView(APIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request):
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        cart.items.all().delete()
-        return Response(CartSerializer(cart).data)
+        CartItem.objects.filter(cart__user=request.user).delete()
+        return Response(CartSerializer(load_cart(request.user)).data)
 
 
 # ──────────────────────────────────────────────────
@@ -170,8 +167,8 @@ class WishlistView(generics.ListAPIView):
 
     def get_queryset(self):
         return Wishlist.objects.filter(user=self.request.user).select_related(
-            "product__category"
-        ).prefetch_related("product__images", "product__variants")
+            "product__category", "product__primary_image"
+        )
 
 
 class WishlistToggleView(APIView):
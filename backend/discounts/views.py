@@ -7,6 +7,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from orders.pricing import PricingError, UnknownDiscount, build_quote, load_cart_lines, resolve_discount
 from parfum.permissions import IsAdmin
 
 from .models import Discount
@@ -24,26 +25,21 @@ class DiscountApplyView(APIView):
 
         code = serializer.validated_data["code"]
         try:
-            discount = Discount.objects.get(code__iexact=code)
-        except Discount.DoesNotExist:
+            discount = resolve_discount(code)
+        except UnknownDiscount as exc:
             return Response(
-                {"error": "Invalid discount code."},
+                {"error": exc.message},
                 status=status.HTTP_404_NOT_FOUND,
             )
-
-        if not discount.is_valid:
+        except PricingError:
             return Response(
                 {"error": "This discount code is expired or no longer valid."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Calculate preview (using cart total if available)
-        from cart.models import Cart
-        try:
-            cart = Cart.objects.get(user=request.user)
-            cart_total = cart.total_price
-        except Cart.DoesNotExist:
-            cart_total = 0
+        # Calculate preview against the cart (empty cart → total 0)
+        quote = build_quote(load_cart_lines(request.user), discount)
+        cart_total = quote.subtotal
 
         if cart_total < discount.min_order_amount:
             return Response(
@@ -54,7 +50,7 @@ class DiscountApplyView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        discount_amount = discount.calculate_discount(cart_total)
+        discount_amount = quote.discount_amount
 
         return Response({
             "valid": True,
@@ -3,8 +3,12 @@ Admin configuration for Orders and Payments.
 """
 
 from django.contrib import admin
+from django.db import transaction
+from django.utils import timezone
 
-from .models import Order, OrderItem, Payment
+from .models import Order, OrderItem, Payment, PaymentOutbox, WebhookEvent
+from .signals import orders_bulk_updated
+from .transitions import apply_status_change
 
 
 class OrderItemInline(admin.TabularInline):
@@ -20,8 +24,8 @@ class PaymentInline(admin.StackedInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ["order_number", "user", "status", "total_amount", "created_at"]
-    list_filter = ["status", "created_at"]
+    list_display = ["order_number", "user", "status", "total_amount", "needs_review", "created_at"]
+    list_filter = ["status", "needs_review", "created_at"]
     search_fields = ["order_number", "user__email", "tracking_id"]
     readonly_fields = ["order_number", "subtotal", "discount_amount", "total_amount"]
     inlines = [OrderItemInline, PaymentInline]
@@ -30,15 +34,24 @@ class OrderAdmin(admin.ModelAdmin):
 
     @admin.action(description="Mark selected orders as Confirmed")
     def mark_confirmed(self, request, queryset):
-        queryset.update(status=Order.Status.CONFIRMED)
+        self._set_status(queryset, Order.Status.CONFIRMED)
 
     @admin.action(description="Mark selected orders as Shipped")
     def mark_shipped(self, request, queryset):
-        queryset.update(status=Order.Status.SHIPPED)
+        self._set_status(queryset, Order.Status.SHIPPED)
 
     @admin.action(description="Mark selected orders as Delivered")
     def mark_delivered(self, request, queryset):
-        queryset.update(status=Order.Status.DELIVERED)
+        self._set_status(queryset, Order.Status.DELIVERED)
+
+    def _set_status(self, queryset, new_status):
+        previous = dict(queryset.values_list("pk", "status"))
+        with transaction.atomic():
+            Order.objects.filter(pk__in=previous).update(status=new_status, updated_at=timezone.now())
+            orders_bulk_updated.send(sender=Order, order_ids=list(previous), status=new_status, previous=previous)
+            # Same payment and stock handling as AdminOrderStatusView
+            for order in Order.objects.filter(pk__in=previous).select_related("payment"):
+                apply_status_change(order, previous[order.pk])
 
 
 @admin.register(Payment)
@@ -46,3 +59,18 @@ class PaymentAdmin(admin.ModelAdmin):
     list_display = ["order", "method", "amount", "status", "transaction_id", "created_at"]
     list_filter = ["status", "method"]
     search_fields = ["transaction_id"]
+
+
+@admin.register(PaymentOutbox)
+class PaymentOutboxAdmin(admin.ModelAdmin):
+    list_display = ["order", "action", "status", "attempts", "next_attempt_at", "updated_at"]
+    list_filter = ["status", "action"]
+    readonly_fields = ["payload", "last_error", "created_at", "updated_at"]
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ["event_id", "event", "razorpay_order_id", "status", "attempts", "created_at"]
+    list_filter = ["status", "event"]
+    search_fields = ["event_id", "razorpay_order_id"]
+    readonly_fields = ["payload", "last_error", "created_at", "processed_at"]
@@ -0,0 +1,145 @@
+"""
+Streaming order export for finance and fulfilment.
+
+Orders are read in keyset pages over (created_at, pk): each chunk is its
+own ordered, sliced `.values()` query starting after the last row of the
+previous one, so only one chunk of orders is in memory at a time (MySQL
+client libraries buffer a whole `.iterator()` result). Each chunk's items
+come from a single `.values()` query. Rows are encoded and yielded as they are built,
+so the response never holds the whole export either.
+
+    csv     one row per order item, order and payment columns repeated
+    ndjson  one JSON object per order with its items nested
+"""
+
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OrderItem
+
+CHUNK_SIZE = 2000
+
+# (export column, values() lookup)
+ORDER_COLUMNS = [
+    ("order_id", "pk"),
+    ("order_number", "order_number"),
+    ("created_at", "created_at"),
+    ("status", "status"),
+    ("customer_email", "user__email"),
+    ("shipping_name", "shipping_name"),
+    ("shipping_address", "shipping_address"),
+    ("shipping_city", "shipping_city"),
+    ("shipping_pincode", "shipping_pincode"),
+    ("shipping_phone", "shipping_phone"),
+    ("tracking_id", "tracking_id"),
+    ("discount_code", "discount_code__code"),
+    ("subtotal", "subtotal"),
+    ("discount_amount", "discount_amount"),
+    ("gst_amount", "gst_amount"),
+    ("shipping_fee", "shipping_fee"),
+    ("total_amount", "total_amount"),
+]
+PAYMENT_COLUMNS = [
+    ("method", "payment__method"),
+    ("status", "payment__status"),
+    ("amount", "payment__amount"),
+    ("transaction_id", "payment__transaction_id"),
+    ("razorpay_order_id", "payment__razorpay_order_id"),
+    ("razorpay_payment_id", "payment__razorpay_payment_id"),
+    ("paid_at", "payment__paid_at"),
+]
+ITEM_COLUMNS = [
+    "product_name", "product_slug", "quantity_ml", "selected_origin",
+    "quantity", "oversold_quantity", "price_at_purchase",
+]
+
+CSV_HEADER = (
+    [name for name, _ in ORDER_COLUMNS]
+    + [f"payment_{name}" for name, _ in PAYMENT_COLUMNS]
+    + [f"item_{name}" for name in ITEM_COLUMNS]
+    + ["item_line_total"]
+)
+
+
+def parse_day(value, end=False):
+    """
+    YYYY-MM-DD → aware datetime bound in the project time zone (start of
+    the day, or start of the next day for an inclusive end date). Comparing
+    created_at against datetimes keeps the created_at index usable.
+    """
+    day = datetime.strptime(value, "%Y-%m-%d").date()
+    if end:
+        day += timedelta(days=1)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _chunks(queryset, chunk_size):
+    """Keyset pages of a values() queryset ordered by (created_at, pk)."""
+    page = queryset
+    while chunk := list(page[:chunk_size]):
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
+        page = queryset.filter(
+            Q(created_at__gt=last["created_at"]) | Q(created_at=last["created_at"], pk__gt=last["pk"])
+        )
+
+
+def iter_orders(queryset, chunk_size=None):
+    """Yield (order, payment, items) dicts for `queryset`, oldest first."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    lookups = [lookup for _, lookup in ORDER_COLUMNS + PAYMENT_COLUMNS]
+    orders = queryset.order_by("created_at", "pk").values(*lookups)
+    for chunk in _chunks(orders, chunk_size):
+        items = {}
+        for item in (
+            OrderItem.objects.filter(order_id__in=[row["pk"] for row in chunk])
+            .order_by("order_id", "pk")
+            .values("order_id", *ITEM_COLUMNS)
+        ):
+            items.setdefault(item.pop("order_id"), []).append(item)
+        for row in chunk:
+            order = {name: row[lookup] for name, lookup in ORDER_COLUMNS}
+            payment = {name: row[lookup] for name, lookup in PAYMENT_COLUMNS}
+            if payment["method"] is None:
+                payment = None
+            yield order, payment, items.get(row["pk"], [])
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    return "" if value is None else value
+
+
+def csv_rows(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    empty_payment = [""] * len(PAYMENT_COLUMNS)
+    empty_item = [""] * (len(ITEM_COLUMNS) + 1)
+    for order, payment, items in iter_orders(queryset):
+        head = [_cell(value) for value in order.values()]
+        head += [_cell(value) for value in payment.values()] if payment else empty_payment
+        if not items:
+            yield writer.writerow(head + empty_item)
+        for item in items:
+            line = [_cell(item[name]) for name in ITEM_COLUMNS]
+            yield writer.writerow(head + line + [item["price_at_purchase"] * item["quantity"]])
+
+
+def ndjson_rows(queryset):
+    for order, payment, items in iter_orders(queryset):
+        yield json.dumps({**order, "payment": payment, "items": items}, cls=DjangoJSONEncoder) + "\n"
@@ -0,0 +1,156 @@
+"""
+Razorpay calls made outside the checkout transaction.
+
+Checkout runs in three phases so that no transaction, row lock or pooled
+connection is held during the HTTPS round trip to Razorpay:
+
+1. price the order, reserve its stock, and create the order, its payment
+   and a PaymentOutbox entry, in one short transaction;
+2. deliver(): call Razorpay with the entry's payload, outside any
+   transaction;
+3. attach the Razorpay order id to the payment and close the entry, in a
+   second short transaction.
+
+A new entry is leased to the request that created it. If that request
+dies between phases, the entry stays pending: `manage.py
+process_payment_outbox` retries it once the lease runs out, with
+exponential backoff, and cancels the order when the attempts run out.
+"""
+
+import logging
+from datetime import timedelta
+
+import razorpay
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from discounts.models import Discount
+
+from .models import Order, Payment, PaymentOutbox
+from .signals import orders_bulk_updated
+from .stock import release_holds
+
+logger = logging.getLogger(__name__)
+
+# Initialize Razorpay client (None if keys not configured)
+razorpay_client = None
+if settings.RAZORPAY_KEY_ID and settings.RAZORPAY_KEY_SECRET:
+    razorpay_client = razorpay.Client(
+        auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
+    )
+
+GATEWAY_TIMEOUT = 10  # seconds per Razorpay request
+LEASE = timedelta(seconds=60)  # no retry while a delivery may still be in flight
+RETRY_BASE = timedelta(seconds=30)  # backoff: 30s, 60s, 120s, ...
+MAX_ATTEMPTS = 5
+
+
+def enqueue_razorpay_order(order, receipt):
+    """Phase 1: record the Razorpay order to create; call inside the order's transaction."""
+    return PaymentOutbox.objects.create(
+        order=order,
+        action=PaymentOutbox.Action.CREATE_RAZORPAY_ORDER,
+        payload={
+            # Razorpay expects amount in paise (INR * 100)
+            "amount": int(order.total_amount * 100),
+            "currency": "INR",
+            "receipt": receipt,
+            "payment_capture": 1,  # Auto-capture payment
+        },
+        next_attempt_at=timezone.now() + LEASE,
+    )
+
+
+def deliver(entry):
+    """
+    Phases 2 and 3 for an entry this process holds the lease on. Returns the
+    Razorpay order id, or None if the call failed (the entry records the
+    error and stays pending).
+    """
+    try:
+        rz_order = razorpay_client.order.create(entry.payload, timeout=GATEWAY_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Razorpay order creation failed for order {entry.order_id}: {e}")
+        PaymentOutbox.objects.filter(pk=entry.pk).update(
+            attempts=F("attempts") + 1,
+            last_error=str(e)[:1000],
+            updated_at=timezone.now(),
+        )
+        return None
+
+    with transaction.atomic():
+        Payment.objects.filter(order_id=entry.order_id).update(razorpay_order_id=rz_order["id"])
+        PaymentOutbox.objects.filter(pk=entry.pk).update(
+            status=PaymentOutbox.Status.DONE,
+            attempts=F("attempts") + 1,
+            last_error="",
+            updated_at=timezone.now(),
+        )
+    return rz_order["id"]
+
+
+def abandon(entry, reason=""):
+    """
+    Give up on an entry: fail it, cancel its unpaid order, release the stock
+    hold and give back the discount use, as the old rollback did.
+    """
+    with transaction.atomic():
+        PaymentOutbox.objects.filter(pk=entry.pk).update(
+            status=PaymentOutbox.Status.FAILED,
+            updated_at=timezone.now(),
+            **({"last_error": reason} if reason else {}),
+        )
+        release_holds([entry.order_id])
+        cancelled = Order.objects.filter(pk=entry.order_id, status=Order.Status.PENDING).update(
+            status=Order.Status.CANCELLED, updated_at=timezone.now(),
+        )
+        Payment.objects.filter(order_id=entry.order_id, status=Payment.Status.PENDING).update(
+            status=Payment.Status.FAILED,
+        )
+        if cancelled:
+            Discount.objects.filter(orders__pk=entry.order_id, times_used__gt=0).update(
+                times_used=F("times_used") - 1,
+            )
+            orders_bulk_updated.send(
+                sender=Order, order_ids=[entry.order_id],
+                status=Order.Status.CANCELLED, previous={entry.order_id: Order.Status.PENDING},
+            )
+
+
+def process_outbox(batch_size=100):
+    """
+    Retry pending entries whose lease or backoff has run out. Each entry is
+    claimed with a conditional UPDATE before its gateway call, so parallel
+    workers never deliver the same entry twice. Returns (delivered, failed).
+    """
+    delivered = failed = 0
+    now = timezone.now()
+    due = list(
+        PaymentOutbox.objects.filter(status=PaymentOutbox.Status.PENDING, next_attempt_at__lte=now)
+        .select_related("order")
+        .order_by("next_attempt_at")[:batch_size]
+    )
+    for entry in due:
+        claimed = PaymentOutbox.objects.filter(
+            pk=entry.pk, status=PaymentOutbox.Status.PENDING, next_attempt_at__lte=now,
+        ).update(next_attempt_at=timezone.now() + LEASE)
+        if not claimed:
+            continue
+        if entry.order.status != Order.Status.PENDING:
+            abandon(entry, reason=f"Order is {entry.order.status}")
+            failed += 1
+        elif not razorpay_client:
+            abandon(entry, reason="Online payments are not configured")
+            failed += 1
+        elif deliver(entry):
+            delivered += 1
+        elif entry.attempts + 1 >= MAX_ATTEMPTS:
+            abandon(entry)
+            failed += 1
+        else:
+            PaymentOutbox.objects.filter(pk=entry.pk).update(
+                next_attempt_at=timezone.now() + RETRY_BASE * 2 ** entry.attempts,
+            )
+    return delivered, failed
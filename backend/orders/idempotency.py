@@ -0,0 +1,182 @@
+"""
+Idempotency-Key support for the order endpoints mobile clients retry.
+
+@idempotent wraps an APIView handler. A request carrying an
+Idempotency-Key header claims the (user, key) row before the handler runs,
+and stores the final response on it afterwards:
+
+- a retry of a finished request replays the stored response without
+  running the handler (no pricing, stock or gateway work);
+- a duplicate arriving while the first request runs polls the key for up
+  to IDEMPOTENCY_WAIT_SECONDS, then replays the first response; if the
+  first request is still running by then it gets a 409 and should retry
+  shortly;
+- reusing a key for a different request (method, path or body) is rejected;
+- 5xx responses and exceptions release the key so the retry runs afresh,
+  unless the handler already committed an order under it (bind_order()):
+  that key is kept, and retries replay the order instead of placing a
+  second one.
+
+If the first request dies mid-way, its claim lapses after LOCK_TIMEOUT and
+the next retry takes the key over. Keys are purged after
+IDEMPOTENCY_KEY_TTL_HOURS by `manage.py purge_idempotency_keys`.
+"""
+
+import functools
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey, Order
+from .serializers import OrderSerializer
+
+HEADER = "Idempotency-Key"
+LOCK_TIMEOUT = timedelta(seconds=60)  # longer than a checkout incl. the gateway call
+POLL_INTERVAL = 0.2  # seconds between looks at a key another request holds
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256(f"{request.method} {request.path}\n".encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.status_code)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _replay_order(records, order_id):
+    """Response for a key whose handler failed after committing its order."""
+    order = Order.objects.select_related("user", "payment").prefetch_related("items").get(pk=order_id)
+    data = OrderSerializer(order).data
+    records.update(status_code=status.HTTP_201_CREATED, response_body=data, locked_until=None)
+    return _replay(records.get())
+
+
+def _claim(request, key, fingerprint):
+    """
+    Returns None once this request owns the key, or the Response to send
+    instead (replay, mismatch, or 409 if another request still holds it
+    after IDEMPOTENCY_WAIT_SECONDS).
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    user=request.user, key=key, fingerprint=fingerprint,
+                    locked_until=timezone.now() + LOCK_TIMEOUT,
+                )
+            return None
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if record is None:
+            continue  # released or purged in between: claim it again
+        if record.fingerprint != fingerprint:
+            return Response(
+                {"error": f"{HEADER} was already used for a different request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if record.status_code is not None:
+            return _replay(record)
+
+        # Not finished: take over a lapsed claim, else the owner is still running
+        now = timezone.now()
+        taken = IdempotencyKey.objects.filter(
+            Q(locked_until__lt=now) | Q(locked_until__isnull=True),
+            pk=record.pk, status_code__isnull=True,
+        ).update(locked_until=now + LOCK_TIMEOUT)
+        if not taken:
+            if time.monotonic() < deadline:
+                # Runs outside any transaction, so each look sees the owner's commits
+                time.sleep(POLL_INTERVAL)
+                continue
+            return Response(
+                {"error": f"A request with this {HEADER} is still in progress."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if record.order_id is not None:
+            return _replay_order(IdempotencyKey.objects.filter(pk=record.pk), record.order_id)
+        return None
+
+
+def _release(records):
+    """
+    Free the key of a failed request for a fresh retry, unless it placed an
+    order that still stands; that key is unlocked and replays the order.
+    """
+    records.filter(Q(order__isnull=True) | Q(order__status=Order.Status.CANCELLED)).delete()
+    records.update(locked_until=None)
+
+
+def bind_order(request, order):
+    """
+    Link the request's Idempotency-Key (if any) to `order`. Call inside the
+    transaction that creates the order, so the link commits with it.
+    """
+    key = request.headers.get(HEADER, "").strip()
+    if key:
+        IdempotencyKey.objects.filter(user=request.user, key=key).update(order=order)
+
+
+def idempotent(handler):
+    """Decorator for APIView handlers of authenticated, retry-prone POSTs."""
+
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER, "").strip()
+        if not key:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response(
+                {"error": f"{HEADER} must be at most 255 characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        blocked = _claim(request, key, _fingerprint(request))
+        if blocked is not None:
+            return blocked
+
+        records = IdempotencyKey.objects.filter(user=request.user, key=key)
+        try:
+            response = handler(self, request, *args, **kwargs)
+        except Exception:
+            _release(records)
+            raise
+        if response.status_code >= 500:
+            _release(records)
+        else:
+            records.update(
+                status_code=response.status_code,
+                response_body=response.data,
+                locked_until=None,
+            )
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys(batch_size=1000):
+    """Delete keys older than IDEMPOTENCY_KEY_TTL_HOURS, in batches. Returns the count."""
+    cutoff = timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    purged = 0
+    while True:
+        pks = list(
+            IdempotencyKey.objects.filter(created_at__lt=cutoff)
+            .order_by("created_at")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not pks:
+            return purged
+        purged += IdempotencyKey.objects.filter(pk__in=pks).delete()[0]
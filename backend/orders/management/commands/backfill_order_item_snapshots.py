@@ -0,0 +1,50 @@
+"""
+Fill product_slug / product_image on order items created before those
+snapshot columns existed. Walks items in primary-key batches: one items
+query, one products query and one bulk UPDATE per batch. Safe to re-run;
+only rows with an empty slug are touched.
+
+Usage: python manage.py backfill_order_item_snapshots [--batch-size 1000]
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = "Backfill product slug and image URL snapshots on existing order items"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        from orders.models import OrderItem
+        from products.models import Product
+
+        batch_size = options["batch_size"]
+        updated = 0
+        last_pk = 0
+        while True:
+            items = list(
+                OrderItem.objects.filter(pk__gt=last_pk, product_slug="")
+                .order_by("pk")
+                .only("pk", "product_id")[:batch_size]
+            )
+            if not items:
+                break
+            last_pk = items[-1].pk
+            products = (
+                Product.objects.select_related("primary_image")
+                .only("slug", "primary_image__image")
+                .in_bulk({item.product_id for item in items})
+            )
+            for item in items:
+                snapshot = OrderItem.product_snapshot(products[item.product_id])
+                item.product_slug = snapshot["product_slug"]
+                item.product_image = snapshot["product_image"]
+            with transaction.atomic():
+                OrderItem.objects.bulk_update(items, ["product_slug", "product_image"])
+            updated += len(items)
+            self.stdout.write(f"  ...{updated} items")
+
+        self.stdout.write(self.style.SUCCESS(f"[OK] Backfilled {updated} order item snapshots"))
@@ -0,0 +1,35 @@
+"""
+Retry gateway calls that checkout recorded but never finished (the request
+died or Razorpay failed), with exponential backoff. Orders whose calls keep
+failing are cancelled and their stock released. Run from cron every
+minute, or as a long-lived worker with --interval.
+
+Usage: python manage.py process_payment_outbox [--batch-size 100] [--interval 30]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Deliver pending PaymentOutbox entries to Razorpay"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Entries per run")
+        parser.add_argument(
+            "--interval", type=int, default=0,
+            help="Keep running, polling every N seconds (default: one pass and exit)",
+        )
+
+    def handle(self, *args, **options):
+        from orders.gateway import process_outbox
+
+        while True:
+            delivered, failed = process_outbox(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(
+                f"[OK] Delivered {delivered} outbox entries, abandoned {failed}"
+            ))
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,34 @@
+"""
+Apply queued Razorpay webhook events (payment captured/failed) in order per
+Razorpay order, retrying failures and dead-lettering events that keep
+failing. Run from cron every minute, or as a worker with --interval.
+
+Usage: python manage.py process_webhooks [--batch-size 200] [--interval 5]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Apply pending Razorpay webhook events from the inbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200, help="Razorpay orders per pass")
+        parser.add_argument(
+            "--interval", type=int, default=0,
+            help="Keep running, polling every N seconds (default: one pass and exit)",
+        )
+
+    def handle(self, *args, **options):
+        from orders.webhooks import process_events
+
+        while True:
+            applied, dead = process_events(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(
+                f"[OK] Applied {applied} webhook events, dead-lettered {dead}"
+            ))
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
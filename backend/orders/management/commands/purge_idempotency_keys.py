@@ -0,0 +1,21 @@
+"""
+Delete Idempotency-Key records older than IDEMPOTENCY_KEY_TTL_HOURS.
+Run from cron (hourly is plenty).
+
+Usage: python manage.py purge_idempotency_keys [--batch-size 1000]
+"""
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Purge expired Idempotency-Key records"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per DELETE")
+
+    def handle(self, *args, **options):
+        from orders.idempotency import purge_expired_keys
+
+        purged = purge_expired_keys(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"[OK] Purged {purged} idempotency keys"))
@@ -0,0 +1,32 @@
+"""
+Release stock held by unpaid online orders whose hold has expired: the
+order is cancelled and its pending payment marked failed. Run from cron
+every few minutes, or as a long-lived worker with --interval.
+
+Usage: python manage.py release_stock_holds [--batch-size 500] [--interval 60]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Cancel unpaid online orders whose stock hold has expired"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Orders per transaction")
+        parser.add_argument(
+            "--interval", type=int, default=0,
+            help="Keep running, sweeping every N seconds (default: sweep once and exit)",
+        )
+
+    def handle(self, *args, **options):
+        from orders.stock import release_expired_holds
+
+        while True:
+            released = release_expired_holds(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"[OK] Released {released} expired orders"))
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_orderitem_tester_box_items'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='oversold_quantity',
+            field=models.PositiveIntegerField(default=0, help_text='Units sold beyond available stock (variant allows oversell)'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_orderitem_oversold_quantity'),
+        ('products', '0018_testerbox_products_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, help_text='Unpaid online order: stock is reserved until this time', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['variant', 'selected_origin', 'hold_expires_at'], name='orders_orde_variant_9330f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['hold_expires_at', 'order'], name='orders_orde_hold_ex_e555fa_idx'),
+        ),
+    ]
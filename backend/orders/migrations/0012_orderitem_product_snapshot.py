@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 02:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_webhookevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_image',
+            field=models.CharField(blank=True, help_text='Primary image URL at time of purchase', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_slug',
+            field=models.SlugField(blank=True, help_text='Product slug at time of purchase', max_length=220),
+        ),
+    ]
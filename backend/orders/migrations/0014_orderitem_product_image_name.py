@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_order_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderitem',
+            name='product_image',
+            field=models.CharField(blank=True, help_text='Primary image (storage name) at time of purchase', max_length=500),
+        ),
+    ]
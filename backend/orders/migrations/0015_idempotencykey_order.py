@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0014_orderitem_product_image_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='order',
+            field=models.ForeignKey(blank=True, help_text="Order placed under this key, linked in the order's own transaction", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='orders.order'),
+        ),
+    ]
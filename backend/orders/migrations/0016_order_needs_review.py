@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0015_idempotencykey_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='needs_review',
+            field=models.BooleanField(default=False, help_text='Payment captured but its held stock could not be deducted; check stock before fulfilling'),
+        ),
+    ]
@@ -7,6 +7,7 @@ OrderItems preserve priceAtPurchase for historical accuracy.
 import uuid
 
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 
@@ -53,6 +54,10 @@ class Order(models.Model):
     # Tracking
     tracking_id = models.CharField(max_length=100, blank=True)
     notes = models.TextField(blank=True)
+    needs_review = models.BooleanField(
+        default=False,
+        help_text="Payment captured but its held stock could not be deducted; check stock before fulfilling",
+    )
 
     # Discount reference
     discount_code = models.ForeignKey(
@@ -72,6 +77,8 @@ class Order(models.Model):
         indexes = [
             models.Index(fields=["-created_at"]),
             models.Index(fields=["user", "status"]),
+            # Incremental rollups: orders changed since the last run
+            models.Index(fields=["updated_at"]),
         ]
 
     def __str__(self):
@@ -103,10 +110,22 @@ class OrderItem(models.Model):
     )
     # Snapshot fields — preserved from time of purchase
     product_name = models.CharField(max_length=200)
+    product_slug = models.SlugField(max_length=220, blank=True, help_text="Product slug at time of purchase")
+    product_image = models.CharField(max_length=500, blank=True, help_text="Primary image (storage name) at time of purchase")
     quantity_ml = models.PositiveIntegerField(default=0, help_text="ML size at time of purchase")
     selected_origin = models.CharField(max_length=20, default="india", help_text="Origin selected at purchase")
     quantity = models.PositiveIntegerField()
     price_at_purchase = models.DecimalField(max_digits=10, decimal_places=2)
+    oversold_quantity = models.PositiveIntegerField(
+        default=0,
+        help_text="Units sold beyond available stock (variant allows oversell)",
+    )
+
+    hold_expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Unpaid online order: stock is reserved until this time",
+    )
 
     tester_box_items = models.JSONField(
         default=list,
@@ -116,6 +135,11 @@ class OrderItem(models.Model):
 
     class Meta:
         ordering = ["id"]
+        indexes = [
+            # Active holds per variant/origin (available stock) and expiry sweeps
+            models.Index(fields=["variant", "selected_origin", "hold_expires_at"]),
+            models.Index(fields=["hold_expires_at", "order"]),
+        ]
 
     def __str__(self):
         return f"{self.quantity}x {self.product_name} ({self.quantity_ml}ml) @ Rs.{self.price_at_purchase}"
@@ -126,6 +150,20 @@ class OrderItem(models.Model):
             return 0
         return self.price_at_purchase * self.quantity
 
+    @staticmethod
+    def product_snapshot(product):
+        """
+        {product_slug, product_image} captured when the order is placed, so
+        order history never reads products. Uses the listing's primary_image
+        (load it with select_related to avoid a query) and stores its storage
+        name; the serializer turns it into a URL.
+        """
+        image = product.primary_image
+        return {
+            "product_slug": product.slug,
+            "product_image": image.image.name if image and image.image else "",
+        }
+
 
 class Payment(models.Model):
     """Payment tracking for orders. Supports UPI, digital wallets, COD."""
@@ -176,3 +214,123 @@ class Payment(models.Model):
 
     def __str__(self):
         return f"Payment {self.transaction_id or 'N/A'} — {self.get_status_display()}"
+
+
+class PaymentOutbox(models.Model):
+    """
+    Gateway call recorded in the same transaction as the order it belongs
+    to, then delivered outside it (see orders/gateway.py). Pending entries
+    whose delivery never finished are retried by process_payment_outbox.
+    """
+
+    class Action(models.TextChoices):
+        CREATE_RAZORPAY_ORDER = "razorpay_order", "Create Razorpay order"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name="outbox",
+    )
+    action = models.CharField(max_length=20, choices=Action.choices)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(help_text="Not retried before this time (lease or backoff)")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} for order {self.order_id} — {self.get_status_display()}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Client-supplied Idempotency-Key for a checkout, buy-now or payment
+    verification request, with the final response to replay on retries.
+    status_code is null while the first request is still running (or if it
+    failed after its order was committed; retries then replay the order).
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys",
+    )
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64, help_text="SHA-256 of method, path and body")
+    order = models.ForeignKey(
+        "Order",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="Order placed under this key, linked in the order's own transaction",
+    )
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="In-progress request owns the key until then; later, a retry may take over",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ("user", "key")
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code or 'in progress'})"
+
+
+class WebhookEvent(models.Model):
+    """
+    Razorpay webhook inbox. The webhook view only verifies and appends;
+    process_webhooks applies events in order per Razorpay order and moves
+    events that keep failing to the dead letter.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSED = "processed", "Processed"
+        DEAD = "dead", "Dead letter"
+
+    event_id = models.CharField(max_length=100, unique=True, help_text="X-Razorpay-Event-Id (or body hash)")
+    event = models.CharField(max_length=50)
+    razorpay_order_id = models.CharField(max_length=100, blank=True, db_index=True)
+    payload = models.JSONField(default=dict)
+    event_created_at = models.DateTimeField(null=True, blank=True, help_text="Event time reported by Razorpay")
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(auto_now_add=True)
+    last_error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.event} {self.event_id} — {self.get_status_display()}"
@@ -0,0 +1,203 @@
+"""
+Pricing for checkout, buy-now, the pricing previews, coupon apply and the
+batch quote endpoint.
+
+Lines are loaded in one query (a cart, or a set of variant/quantity/origin
+specs) into QuoteLine value objects; build_quote() then applies the
+discount, 18% GST and the Rs.50 shipping fee below Rs.499 exactly once.
+Views that need a quote more than once per request go through
+cart_quote(), which memoizes it on the request.
+"""
+
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db.models import Q
+
+from cart.models import CartItem
+from discounts.models import Discount
+from products.models import ProductVariant
+
+GST_RATE = Decimal("0.18")
+SHIPPING_FEE = Decimal("50.00")
+FREE_SHIPPING_THRESHOLD = 499
+
+VARIANT_FIELDS = [
+    "id", "quantity_ml", "oversell", "india_stock", "switzerland_stock",
+    "india_price", "india_discount_price", "switzerland_price", "switzerland_discount_price",
+    "product__id", "product__name", "product__slug", "product__is_active",
+    "product__primary_image__image",
+]
+
+
+class PricingError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class UnknownDiscount(PricingError):
+    pass
+
+
+class QuoteLine(NamedTuple):
+    variant: ProductVariant  # with .product loaded
+    origin: str
+    quantity: int
+    tester_box_items: tuple = ()
+
+    @property
+    def product(self):
+        return self.variant.product
+
+    @property
+    def unit_price(self):
+        if self.origin == "switzerland":
+            return self.variant.switzerland_effective_price
+        return self.variant.india_effective_price
+
+    @property
+    def line_total(self):
+        return self.unit_price * self.quantity
+
+
+class Quote(NamedTuple):
+    lines: list
+    discount: Discount
+    subtotal: Decimal
+    discount_amount: Decimal
+    gst_amount: Decimal
+    shipping_fee: Decimal
+    total_amount: Decimal
+
+    def as_preview(self):
+        """Pricing breakdown in the shape the preview endpoints return."""
+        return {
+            "subtotal": float(self.subtotal),
+            "discount_amount": float(self.discount_amount),
+            "gst_amount": float(self.gst_amount),
+            "shipping_fee": float(self.shipping_fee),
+            "total_amount": float(self.total_amount),
+            "free_shipping_threshold": FREE_SHIPPING_THRESHOLD,
+            "items": [
+                {
+                    "product_name": line.product.name,
+                    "quantity_ml": line.variant.quantity_ml,
+                    "selected_origin": line.origin,
+                    "quantity": line.quantity,
+                    "unit_price": float(line.unit_price),
+                    "line_total": float(line.line_total),
+                }
+                for line in self.lines
+            ],
+        }
+
+
+def load_cart_lines(user):
+    """The user's cart as QuoteLines, in one query."""
+    items = (
+        CartItem.objects.filter(cart__user=user)
+        .select_related("variant__product__primary_image")
+        .only("selected_origin", "quantity", "tester_box_items", *(f"variant__{f}" for f in VARIANT_FIELDS))
+        .order_by("pk")
+    )
+    return [
+        QuoteLine(item.variant, item.selected_origin, item.quantity, item.tester_box_items)
+        for item in items
+    ]
+
+
+def load_variants(variant_ids):
+    """{pk: ProductVariant with product} for the given ids, in one query."""
+    return {
+        variant.pk: variant
+        for variant in ProductVariant.objects.filter(pk__in=set(variant_ids))
+        .select_related("product__primary_image")
+        .only(*VARIANT_FIELDS)
+    }
+
+
+def resolve_discount(code, discounts=None):
+    """
+    The Discount for a coupon code (None for a blank code). Raises
+    PricingError if the code is unknown or not currently valid. Pass
+    `discounts` ({lowercased code: Discount}) to skip the lookup query.
+    """
+    code = (code or "").strip()
+    if not code:
+        return None
+    if discounts is None:
+        discount = Discount.objects.filter(code__iexact=code).first()
+    else:
+        discount = discounts.get(code.lower())
+    if discount is None:
+        raise UnknownDiscount("Invalid discount code.")
+    if not discount.is_valid:
+        raise PricingError("Discount code is expired or invalid.")
+    return discount
+
+
+def build_quote(lines, discount=None):
+    """Price a list of QuoteLines with an optional (already validated) Discount."""
+    subtotal = sum((line.line_total for line in lines), Decimal("0.00"))
+    discount_amount = Decimal(discount.calculate_discount(subtotal)) if discount else Decimal("0.00")
+    taxable_amount = subtotal - discount_amount
+    gst_amount = taxable_amount * GST_RATE
+    shipping_fee = SHIPPING_FEE if taxable_amount < FREE_SHIPPING_THRESHOLD else Decimal("0.00")
+    return Quote(
+        lines=lines,
+        discount=discount,
+        subtotal=subtotal,
+        discount_amount=discount_amount,
+        gst_amount=gst_amount,
+        shipping_fee=shipping_fee,
+        total_amount=taxable_amount + gst_amount + shipping_fee,
+    )
+
+
+def cart_quote(request, discount_code=""):
+    """Quote for the requesting user's cart, computed once per request and code."""
+    cache = request.__dict__.setdefault("_cart_quotes", {})
+    key = (discount_code or "").strip().lower()
+    if key not in cache:
+        lines = load_cart_lines(request.user)
+        if not lines:
+            raise PricingError("Cart is empty.")
+        cache[key] = build_quote(lines, resolve_discount(discount_code))
+    return cache[key]
+
+
+def quote_baskets(baskets):
+    """
+    Price many hypothetical baskets ({"items": [{variant_id, quantity,
+    selected_origin}], "discount_code"}) with one variant query and one
+    discount query in total. Returns a preview dict or {"error": ...} per
+    basket, in order.
+    """
+    variants = load_variants(
+        item["variant_id"] for basket in baskets for item in basket["items"]
+    )
+    codes = {basket.get("discount_code", "").strip() for basket in baskets} - {""}
+    lookup = Q()
+    for code in codes:
+        lookup |= Q(code__iexact=code)
+    discounts = {discount.code.lower(): discount for discount in Discount.objects.filter(lookup)} if codes else {}
+
+    results = []
+    for basket in baskets:
+        try:
+            lines = []
+            for item in basket["items"]:
+                variant = variants.get(item["variant_id"])
+                if variant is None:
+                    raise PricingError(f"Product variant {item['variant_id']} not found.", 404)
+                if not variant.product.is_active:
+                    raise PricingError(f"{variant.product.name} is no longer available.")
+                lines.append(QuoteLine(variant, item["selected_origin"], item["quantity"]))
+            quote = build_quote(lines, resolve_discount(basket.get("discount_code"), discounts))
+        except PricingError as exc:
+            results.append({"error": exc.message})
+            continue
+        results.append(quote.as_preview())
+    return results
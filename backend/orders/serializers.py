@@ -2,9 +2,12 @@
 Order and Payment serializers.
 """
 
+from django.core.files.storage import default_storage
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 
-from .models import Order, OrderItem, Payment
+from .models import Order, OrderItem, Payment, WebhookEvent
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -17,23 +20,20 @@ class OrderItemSerializer(serializers.ModelSerializer):
         model = OrderItem
         fields = [
             "id", "product", "product_name", "product_slug", "product_image",
-            "quantity_ml", "selected_origin", "quantity",
+            "quantity_ml", "selected_origin", "quantity", "oversold_quantity",
             "price_at_purchase", "line_total", "tester_box_items",
         ]
         read_only_fields = fields
 
     def get_product_slug(self, obj):
-        """Returns the slug of the related product."""
-        return obj.product.slug if obj.product else None
+        """Product slug captured at purchase time."""
+        return obj.product_slug or None
 
     def get_product_image(self, obj):
-        """Returns the URL of the primary image (sort_order=0) for the product."""
-        if not obj.product:
-            return None
-        img = obj.product.images.filter(sort_order=0).first()
-        if img and img.image:
-            return img.image.url
-        return None
+        """URL of the primary image captured at purchase time."""
+        if not obj.product_image or "://" in obj.product_image:  # rows written before names were stored
+            return obj.product_image or None
+        return default_storage.url(obj.product_image)
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -78,15 +78,42 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+def order_list_queryset(queryset, items=True):
+    """
+    Load everything OrderListSerializer touches in a fixed number of
+    queries: user and payment joined, `item_count` annotated, and the items
+    themselves prefetched only when they are serialized.
+
+    item_count is a correlated subquery rather than Count("items"), so it
+    needs no GROUP BY over every order column and survives later filters.
+    """
+    counts = (
+        OrderItem.objects.filter(order=OuterRef("pk"))
+        .order_by()
+        .values("order")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    queryset = queryset.select_related("user", "payment").annotate(
+        item_count=Coalesce(Subquery(counts), 0),
+    )
+    if items:
+        queryset = queryset.prefetch_related("items")
+    return queryset
+
+
 class OrderListSerializer(serializers.ModelSerializer):
-    """Order list containing nested items and payment details."""
+    """
+    Order list containing nested items and payment details. Expects a
+    queryset prepared by order_list_queryset().
+    """
 
     items = OrderItemSerializer(many=True, read_only=True)
     payment = PaymentSerializer(read_only=True)
     status_display = serializers.CharField(
         source="get_status_display", read_only=True
     )
-    item_count = serializers.IntegerField(source="items.count", read_only=True)
+    item_count = serializers.IntegerField(read_only=True)
     customer_email = serializers.EmailField(source="user.email", read_only=True)
     total_amount = serializers.FloatField()
     gst_amount = serializers.FloatField()
@@ -103,6 +130,13 @@ class OrderListSerializer(serializers.ModelSerializer):
         ]
 
 
+class AdminOrderListSerializer(OrderListSerializer):
+    """Admin grid row: OrderListSerializer without the nested items."""
+
+    class Meta(OrderListSerializer.Meta):
+        fields = [field for field in OrderListSerializer.Meta.fields if field != "items"]
+
+
 class CheckoutSerializer(serializers.Serializer):
     """Checkout from cart -> order."""
 
@@ -172,3 +206,35 @@ class BuyNowPreviewSerializer(serializers.Serializer):
         default="india"
     )
     discount_code = serializers.CharField(max_length=50, required=False, allow_blank=True)
+
+
+class QuoteItemSerializer(serializers.Serializer):
+    variant_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    selected_origin = serializers.ChoiceField(
+        choices=[("india", "India"), ("switzerland", "Switzerland")],
+        default="india"
+    )
+
+
+class QuoteBasketSerializer(serializers.Serializer):
+    items = QuoteItemSerializer(many=True, allow_empty=False)
+    discount_code = serializers.CharField(max_length=50, required=False, allow_blank=True)
+
+
+class QuoteSerializer(serializers.Serializer):
+    """Input for the batch quote endpoint — up to 50 hypothetical baskets."""
+
+    baskets = QuoteBasketSerializer(many=True, allow_empty=False, max_length=50)
+
+
+class WebhookEventSerializer(serializers.ModelSerializer):
+    """Inbox entry as shown in the admin dead-letter view."""
+
+    class Meta:
+        model = WebhookEvent
+        fields = [
+            "id", "event_id", "event", "razorpay_order_id", "status",
+            "attempts", "last_error", "event_created_at", "created_at", "payload",
+        ]
+        read_only_fields = fields
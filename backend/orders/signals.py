@@ -0,0 +1,10 @@
+"""
+Signals sent by order code paths that write with queryset.update() and so
+bypass post_save (hold expiry, gateway give-up, admin bulk actions).
+"""
+
+from django.dispatch import Signal
+
+# sender=Order, order_ids=[...], previous={order_id: status before}: these
+# orders were moved to the status given in `status` in bulk
+orders_bulk_updated = Signal()
@@ -0,0 +1,357 @@
+"""
+Stock deduction and reservation for checkout.
+
+COD orders deduct stock immediately: deduct_stock() locks every variant a
+checkout touches in primary-key order (so concurrent checkouts over the
+same variants queue up instead of deadlocking), checks the locked stock,
+and applies all decrements with one conditional UPDATE. The UPDATE
+re-checks each row's stock in its WHERE clause, so on backends without row
+locks a concurrent sale makes the checkout fail instead of overselling.
+
+Online orders only reserve: hold_stock() runs the same locked check, and
+the caller stamps each OrderItem with hold_expires_at. Stock is deducted
+by commit_holds() once the payment is captured (callers that have already
+recorded the capture use settle_holds(), which flags the order for review
+instead of raising); until then, or until the hold expires, the units are
+unavailable to everyone else:
+
+    available = on-hand stock - units on unexpired holds
+
+release_expired_holds() (run by `manage.py release_stock_holds`) cancels
+orders whose payment never arrived. Expired holds stop counting the moment
+they expire, so the sweeper only tidies up order and payment state.
+
+Variants with oversell="continue" may sell past zero: their stock floors
+at 0 and the shortfall is reported per line as `oversold`.
+
+Deductions are written to the stock ledger (analytics/ledger.py) by
+record_checkout() once the order they belong to exists; restock_order()
+returns what the ledger says an order took when it is cancelled.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from analytics import ledger, snapshot
+from analytics.models import InventoryTransfer
+from products.models import ProductVariant
+from products.signals import sync_variant_writes
+
+from .models import Order, OrderItem, Payment
+from .signals import orders_bulk_updated
+
+logger = logging.getLogger(__name__)
+
+STOCK_FIELDS = {"india": "india_stock", "switzerland": "switzerland_stock"}
+
+
+class StockLine(NamedTuple):
+    variant_id: int
+    origin: str
+    quantity: int
+    label: str  # product name, for error messages
+
+
+class InsufficientStock(Exception):
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def stock_field(origin):
+    return STOCK_FIELDS.get(origin, "india_stock")
+
+
+def hold_deadline():
+    """Expiry timestamp for a hold placed now."""
+    return timezone.now() + timedelta(minutes=settings.STOCK_HOLD_MINUTES)
+
+
+def held_units(variant_ids, now=None):
+    """
+    {(variant_id, stock field): units on unexpired holds}. Served by the
+    (variant, selected_origin, hold_expires_at) index on OrderItem.
+    """
+    rows = (
+        OrderItem.objects.filter(variant_id__in=variant_ids, hold_expires_at__gt=now or timezone.now())
+        .values("variant_id", "selected_origin")
+        .annotate(units=Sum(F("quantity") - F("oversold_quantity")))
+        .order_by()
+    )
+    held = defaultdict(int)
+    for row in rows:
+        held[(row["variant_id"], stock_field(row["selected_origin"]))] += row["units"]
+    return held
+
+
+def available_stock(variant, origin):
+    """On-hand stock of one variant/origin minus units on active holds."""
+    field = stock_field(origin)
+    return max(0, getattr(variant, field) - held_units([variant.pk])[(variant.pk, field)])
+
+
+def _allocate(lines):
+    """
+    Lock the variants behind `lines` and allocate their available stock to
+    the lines in order. Returns (variants, {(pk, field): units taken},
+    oversold per line) or raises InsufficientStock.
+    """
+    variants = {
+        variant.pk: variant
+        for variant in ProductVariant.objects.select_for_update()
+        .filter(pk__in={line.variant_id for line in lines})
+        .order_by("pk")
+        .only("pk", "product_id", "quantity_ml", "oversell", "india_stock", "switzerland_stock")
+    }
+    held = held_units(variants)
+
+    # A bucket is (variant, field); its remaining stock excludes other orders' holds
+    remaining = {}
+    deductions = defaultdict(int)
+    oversold = []
+    errors = []
+    for line in lines:
+        variant = variants.get(line.variant_id)
+        if variant is None:
+            errors.append(f"{line.label}: this size is no longer available.")
+            oversold.append(0)
+            continue
+        bucket = (variant.pk, stock_field(line.origin))
+        available = remaining.setdefault(bucket, max(0, getattr(variant, bucket[1]) - held[bucket]))
+        short = max(0, line.quantity - available)
+        if short and variant.oversell != "continue":
+            errors.append(
+                f"{line.label} ({variant.quantity_ml}ml - {line.origin}): "
+                f"only {available} in stock (requested {line.quantity})"
+            )
+        taken = line.quantity - short
+        remaining[bucket] = available - taken
+        deductions[bucket] += taken
+        oversold.append(short)
+
+    if errors:
+        raise InsufficientStock(errors)
+    return variants, deductions, oversold
+
+
+def hold_stock(lines):
+    """
+    Reserve stock for every StockLine, all or nothing, without deducting it;
+    call inside transaction.atomic() and create the OrderItems with
+    hold_expires_at=hold_deadline() in the same transaction. Returns the
+    oversold quantity for each line, like deduct_stock().
+    """
+    lines = list(lines)
+    if not lines:
+        return []
+    _, _, oversold = _allocate(lines)
+    return oversold
+
+
+def deduct_stock(lines):
+    """
+    Deduct stock for every StockLine, all or nothing; call inside
+    transaction.atomic(). Returns the oversold quantity for each line, in
+    order, or raises InsufficientStock listing every line that cannot be met.
+    """
+    lines = list(lines)
+    if not lines:
+        return []
+
+    variants, deductions, oversold = _allocate(lines)
+    _apply_deductions(variants, deductions)
+    return oversold
+
+
+def _apply_deductions(variants, deductions):
+    if not variants:
+        return
+    guard = Q()
+    for pk in variants:
+        guard |= Q(pk=pk, **{
+            f"{field}__gte": deductions[(pk, field)]
+            for field in STOCK_FIELDS.values() if (pk, field) in deductions
+        })
+    updates = {
+        field: F(field) - Case(
+            *[When(pk=pk, then=Value(amount)) for (pk, f), amount in deductions.items() if f == field],
+            default=Value(0),
+        )
+        for field in {field for _, field in deductions}
+    }
+    with transaction.atomic():
+        # Savepoint: a partial match is rolled back by the raise
+        if ProductVariant.objects.filter(guard).update(**updates) != len(variants):
+            raise InsufficientStock(["Stock changed while placing your order. Please try again."])
+
+    sync_variant_writes(variant.product_id for variant in variants.values())
+    snapshot.apply_stock_changes(
+        (variant.product_id, ledger.stock(variant), tuple(
+            getattr(variant, field) - deductions.get((variant.pk, field), 0) for field in STOCK_FIELDS.values()
+        ))
+        for variant in variants.values()
+    )
+
+
+def commit_holds(order):
+    """
+    Turn an order's holds into real deductions once its payment is captured.
+    Safe to call twice (verify-payment and the webhook race): the second call
+    finds no holds left. A hold that expired before the payment arrived may
+    find its units sold; that shortfall is added to oversold_quantity.
+    """
+    with transaction.atomic():
+        items = list(
+            OrderItem.objects.select_for_update()
+            .filter(order=order, hold_expires_at__isnull=False)
+            .order_by("pk")
+        )
+        if not items:
+            return
+        variants = {
+            variant.pk: variant
+            for variant in ProductVariant.objects.select_for_update()
+            .filter(pk__in={item.variant_id for item in items})
+            .order_by("pk")
+            .only("pk", "product_id", "india_stock", "switzerland_stock")
+        }
+        remaining = {}
+        deductions = defaultdict(int)
+        for item in items:
+            item.hold_expires_at = None
+            variant = variants.get(item.variant_id)
+            if variant is None:
+                continue  # variant deleted since checkout; nothing to deduct from
+            bucket = (variant.pk, stock_field(item.selected_origin))
+            available = remaining.setdefault(bucket, getattr(variant, bucket[1]))
+            wanted = item.quantity - item.oversold_quantity
+            taken = min(wanted, available)
+            remaining[bucket] = available - taken
+            deductions[bucket] += taken
+            item.oversold_quantity += wanted - taken
+        OrderItem.objects.bulk_update(items, ["oversold_quantity", "hold_expires_at"])
+        _apply_deductions(variants, deductions)
+        record_checkout(order, [item for item in items if item.variant_id in variants])
+
+
+def settle_holds(order):
+    """
+    commit_holds() for an order whose payment is already captured, so the
+    caller must not fail: if the deduction cannot be applied
+    (InsufficientStock), the order is flagged needs_review for an admin and
+    its holds are left for release_expired_holds() to retry. Returns
+    whether the holds were committed.
+    """
+    try:
+        commit_holds(order)
+    except InsufficientStock as exc:
+        order_id = getattr(order, "pk", order)
+        logger.error(f"Could not deduct held stock of paid order {order_id}: {exc}")
+        Order.objects.filter(pk=order_id).update(needs_review=True)
+        return False
+    return True
+
+
+def record_checkout(order, items):
+    """
+    Write the ledger rows for stock just deducted for `items` of `order`,
+    one per variant and origin; call in the deducting transaction, where the
+    variants are still locked, so the balances read back are exact.
+    """
+    taken = defaultdict(int)
+    for item in items:
+        if item.variant_id:
+            taken[(item.variant_id, item.selected_origin)] += item.quantity - item.oversold_quantity
+    if not taken:
+        return
+    variants = ProductVariant.objects.only("pk", "product_id", "india_stock", "switzerland_stock").in_bulk(
+        {variant_id for variant_id, _ in taken}
+    )
+    ledger.post(
+        ledger.entry(
+            variants[variant_id], origin, -units,
+            getattr(variants[variant_id], stock_field(origin)),
+            InventoryTransfer.Reason.CHECKOUT, order=order,
+        )
+        for (variant_id, origin), units in taken.items() if variant_id in variants
+    )
+
+
+def restock_order(order):
+    """
+    Return to stock whatever the ledger says `order` took and has not had
+    back yet, so cancelling twice (or cancelling an order whose holds were
+    never committed) returns nothing more.
+    """
+    outstanding = (
+        InventoryTransfer.objects.filter(order=order, variant__isnull=False)
+        .values("variant_id", "origin")
+        .annotate(net=Sum("delta"))
+        .order_by()
+    )
+    return ledger.apply(
+        [ledger.LedgerLine(row["variant_id"], row["origin"], -row["net"]) for row in outstanding if row["net"] < 0],
+        InventoryTransfer.Reason.CANCEL,
+        order=order,
+    )
+
+
+def release_holds(order_ids):
+    """Drop the holds of orders that will not be paid (cancelled, expired)."""
+    return OrderItem.objects.filter(
+        order_id__in=order_ids, hold_expires_at__isnull=False,
+    ).update(hold_expires_at=None)
+
+
+def release_expired_holds(batch_size=500, now=None):
+    """
+    Cancel unpaid online orders whose holds have expired, in batches of
+    orders: holds are cleared, the order becomes cancelled and its pending
+    payment failed. Orders whose payment row is locked (a verification in
+    flight) are skipped and picked up by the next run. Returns the number
+    of orders released.
+    """
+    now = now or timezone.now()
+    released = 0
+    last_id = 0
+    while True:
+        order_ids = list(
+            OrderItem.objects.filter(hold_expires_at__lte=now, order_id__gt=last_id)
+            .order_by("order_id")
+            .values_list("order_id", flat=True)
+            .distinct()[:batch_size]
+        )
+        if not order_ids:
+            return released
+        last_id = order_ids[-1]
+        with transaction.atomic():
+            payments = dict(
+                Payment.objects.select_for_update(skip_locked=True)
+                .filter(order_id__in=order_ids)
+                .values_list("order_id", "status")
+            )
+            unpaid = [pk for pk, state in payments.items() if state != Payment.Status.COMPLETED]
+            for order_id in payments.keys() - set(unpaid):
+                settle_holds(order_id)  # paid through a path that skipped the commit
+            release_holds(unpaid)
+            Order.objects.filter(pk__in=unpaid, status=Order.Status.PENDING).update(
+                status=Order.Status.CANCELLED, updated_at=now,
+            )
+            Payment.objects.filter(order_id__in=unpaid, status=Payment.Status.PENDING).update(
+                status=Payment.Status.FAILED,
+            )
+            if unpaid:
+                # Orders that were no longer pending were left as they were;
+                # either way no revenue moved
+                orders_bulk_updated.send(
+                    sender=Order, order_ids=unpaid,
+                    status=Order.Status.CANCELLED, previous=dict.fromkeys(unpaid, Order.Status.PENDING),
+                )
+        released += len(unpaid)
@@ -1,3 +1,837 @@
-from django.test import TestCase
+import csv
+import hashlib
+import hmac
+import io
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import razorpay
+from django.conf import settings
+from django.contrib.admin.sites import AdminSite
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from cart.models import Cart, CartItem
+from discounts.models import Discount
+from products.cache import catalog_cache, get_catalog_version
+from products.models import Category, Product, ProductImage, ProductVariant, TesterBox
+
+from . import export, gateway, stock, webhooks
+from .admin import OrderAdmin
+from .models import IdempotencyKey, Order, OrderItem, Payment, PaymentOutbox, WebhookEvent
+from .stock import InsufficientStock, available_stock, release_expired_holds
+
+
+SHIPPING = {
+    "shipping_name": "Test Buyer",
+    "shipping_address": "1 Test Street",
+    "shipping_city": "Mumbai",
+    "shipping_pincode": "400001",
+    "shipping_phone": "9999999999",
+    "payment_method": "cod",
+}
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """
+    Parallel buy-now requests against one variant must never oversell.
+    Needs real row locks (MySQL/PostgreSQL); SQLite's shared in-memory
+    test database only raises table-lock errors under threads.
+    """
+
+    WORKERS = 12
+    STOCK = 5
+
+    def setUp(self):
+        category = Category.objects.create(name="Men")
+        product = Product.objects.create(name="Last Bottle", description="-", category=category)
+        self.variant = ProductVariant.objects.create(
+            product=product, quantity_ml=50,
+            india_price=Decimal("999.00"), switzerland_price=Decimal("50.00"),
+            india_stock=self.STOCK,
+        )
+        self.users = [
+            User.objects.create_user(email=f"buyer{i}@example.com", password="pass12345", first_name="B")
+            for i in range(self.WORKERS)
+        ]
+
+    def _buy(self, user, results, barrier, **extra):
+        client = APIClient()
+        client.force_authenticate(user)
+        barrier.wait()
+        try:
+            response = client.post(
+                "/api/orders/buy-now/",
+                {"variant_id": self.variant.pk, "quantity": 1, **SHIPPING, **extra},
+                format="json",
+            )
+            results.append(response.status_code)
+        except Exception as exc:  # e.g. lock wait timeout under heavy contention
+            results.append(type(exc).__name__)
+        finally:
+            connection.close()
+
+    def _run_parallel(self, **extra):
+        results, barrier = [], threading.Barrier(self.WORKERS)
+        threads = [
+            threading.Thread(target=self._buy, args=(user, results, barrier), kwargs=extra)
+            for user in self.users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_parallel_checkouts_never_oversell(self):
+        results = self._run_parallel()
+
+        sold = results.count(201)
+        self.variant.refresh_from_db()
+        self.assertLessEqual(sold, self.STOCK)
+        self.assertEqual(self.variant.india_stock, self.STOCK - sold)
+        self.assertEqual(OrderItem.objects.filter(variant=self.variant).count(), sold)
+        self.assertFalse(OrderItem.objects.filter(oversold_quantity__gt=0).exists())
+        self.assertTrue(all(code in (201, 400) or isinstance(code, str) for code in results))
+
+    def test_oversell_continue_is_reported_per_line(self):
+        self.variant.oversell = "continue"
+        self.variant.save()
+
+        results = self._run_parallel()
+
+        sold = results.count(201)
+        self.variant.refresh_from_db()
+        items = OrderItem.objects.filter(variant=self.variant)
+        self.assertEqual(items.count(), sold)
+        self.assertEqual(self.variant.india_stock, max(0, self.STOCK - sold))
+        # Every unit beyond the opening stock is flagged on its order line
+        self.assertEqual(sum(item.oversold_quantity for item in items), max(0, sold - self.STOCK))
+
+
+class FakeRazorpay:
+    """
+    Local stand-in for api.razorpay.com. POST /v1/orders answers after
+    `delay` seconds, or with a server error while `fail` is set; `on_request`
+    runs in the server thread while the checkout waits for the reply.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.fail = False
+        self.on_request = None
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                fake.requests.append(body)
+                if fake.on_request:
+                    fake.on_request()
+                time.sleep(fake.delay)
+                if fake.fail:
+                    code, reply = 500, {"error": {"code": "SERVER_ERROR", "description": "down"}}
+                else:
+                    code, reply = 200, {"id": f"order_fake{len(fake.requests)}", **body}
+                payload = json.dumps(reply).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = razorpay.Client(
+            auth=("rzp_test_key", "secret"),
+            base_url=f"http://127.0.0.1:{self.server.server_port}",
+        )
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class GatewayTestMixin:
+    """Buyer, one variant and a FakeRazorpay patched in as the gateway client."""
+
+    delay = 0.0
+
+    def setUp(self):
+        category = Category.objects.create(name="Men")
+        product = Product.objects.create(name="Oud", description="-", category=category)
+        self.variant = ProductVariant.objects.create(
+            product=product, quantity_ml=50,
+            india_price=Decimal("999.00"), switzerland_price=Decimal("50.00"),
+            india_stock=5,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(email="buyer@example.com", password="pass12345", first_name="B")
+        )
+        self.fake = FakeRazorpay(delay=self.delay)
+        self.addCleanup(self.fake.stop)
+        patcher = mock.patch.object(gateway, "razorpay_client", self.fake.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def buy(self, quantity=2):
+        return self.client.post(
+            "/api/orders/buy-now/",
+            {"variant_id": self.variant.pk, "quantity": quantity, **SHIPPING, "payment_method": "upi"},
+            format="json",
+        )
+
+    def held(self):
+        return OrderItem.objects.filter(hold_expires_at__gt=timezone.now()).count()
+
+
+@skipUnlessDBFeature("has_select_for_update_nowait")
+class GatewayOutsideTransactionTests(GatewayTestMixin, TransactionTestCase):
+    """The Razorpay round trip must not run while checkout holds row locks."""
+
+    delay = 0.5
+
+    def test_variant_lock_is_released_before_gateway_call(self):
+        probes = []
+
+        def probe():
+            # Another connection tries to lock the variant while checkout waits on Razorpay
+            started = time.monotonic()
+            try:
+                with transaction.atomic():
+                    ProductVariant.objects.select_for_update(nowait=True).get(pk=self.variant.pk)
+                probes.append(time.monotonic() - started)
+            except DatabaseError:
+                probes.append(None)
+            finally:
+                connection.close()
+
+        self.fake.on_request = probe
+        started = time.monotonic()
+        response = self.buy()
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["razorpay_order_id"], "order_fake1")
+        self.assertGreaterEqual(elapsed, self.delay)
+        self.assertEqual(len(probes), 1)
+        self.assertIsNotNone(probes[0], "variant row was still locked during the gateway call")
+        self.assertLess(probes[0], 0.1)
+
+
+class PaymentOutboxTests(GatewayTestMixin, TestCase):
+    def test_gateway_success_attaches_razorpay_order(self):
+        response = self.buy()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.fake.requests[0]["amount"], response.data["amount_paise"])
+        payment = Payment.objects.get()
+        self.assertEqual(payment.razorpay_order_id, "order_fake1")
+        self.assertEqual(PaymentOutbox.objects.get().status, PaymentOutbox.Status.DONE)
+        self.assertEqual(self.held(), 1)
+
+    def test_gateway_failure_cancels_order_and_releases_hold(self):
+        self.fake.fail = True
+        response = self.buy()
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(Order.objects.get().status, Order.Status.CANCELLED)
+        self.assertEqual(Payment.objects.get().status, Payment.Status.FAILED)
+        self.assertEqual(PaymentOutbox.objects.get().status, PaymentOutbox.Status.FAILED)
+        self.assertEqual(self.held(), 0)
+
+    def test_outbox_retries_delivery_after_crash(self):
+        # The request dies between phase 1 and the gateway call
+        with mock.patch.object(gateway, "deliver", side_effect=RuntimeError("worker killed")):
+            with self.assertRaises(RuntimeError):
+                self.buy()
+        entry = PaymentOutbox.objects.get()
+        self.assertEqual(entry.status, PaymentOutbox.Status.PENDING)
+
+        # Still leased to the dead request: not retried yet
+        call_command("process_payment_outbox", stdout=mock.MagicMock())
+        self.assertEqual(self.fake.requests, [])
+
+        PaymentOutbox.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.fake.fail = True
+        call_command("process_payment_outbox", stdout=mock.MagicMock())
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.attempts), (PaymentOutbox.Status.PENDING, 1))
+        self.assertGreater(entry.next_attempt_at, timezone.now())  # backing off
+
+        PaymentOutbox.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.fake.fail = False
+        call_command("process_payment_outbox", stdout=mock.MagicMock())
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, PaymentOutbox.Status.DONE)
+        self.assertEqual(Payment.objects.get().razorpay_order_id, "order_fake2")
+        self.assertEqual(Order.objects.get().status, Order.Status.PENDING)
+
+    def test_outbox_gives_up_after_max_attempts(self):
+        with mock.patch.object(gateway, "deliver", side_effect=RuntimeError("worker killed")):
+            with self.assertRaises(RuntimeError):
+                self.buy()
+        PaymentOutbox.objects.update(
+            attempts=gateway.MAX_ATTEMPTS - 1,
+            next_attempt_at=timezone.now() - timedelta(seconds=1),
+        )
+        self.fake.fail = True
+        call_command("process_payment_outbox", stdout=mock.MagicMock())
+
+        self.assertEqual(PaymentOutbox.objects.get().status, PaymentOutbox.Status.FAILED)
+        self.assertEqual(Order.objects.get().status, Order.Status.CANCELLED)
+        self.assertEqual(self.held(), 0)
+
+
+class StockHoldTests(GatewayTestMixin, TestCase):
+    def on_hand(self):
+        self.variant.refresh_from_db()
+        return self.variant.india_stock
+
+    def test_admin_bulk_confirm_commits_the_hold(self):
+        self.assertEqual(self.buy().status_code, 201)
+        OrderAdmin(Order, AdminSite())._set_status(Order.objects.all(), Order.Status.CONFIRMED)
+
+        self.assertEqual((self.on_hand(), self.held()), (3, 0))
+        self.assertEqual(Payment.objects.get().status, Payment.Status.COMPLETED)
+
+        # Nothing is left for the sweeper to undo once the hold would have expired
+        release_expired_holds(now=timezone.now() + timedelta(days=1))
+        self.assertEqual(Order.objects.get().status, Order.Status.CONFIRMED)
+        self.assertEqual(Payment.objects.get().status, Payment.Status.COMPLETED)
+
+
+    def expire_holds(self):
+        OrderItem.objects.update(hold_expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_expired_holds_are_released_by_the_sweeper(self):
+        self.buy()
+        self.buy(quantity=1)
+        first, second = Order.objects.order_by("pk")
+        self.assertEqual(available_stock(self.variant, "india"), 2)
+
+        OrderItem.objects.filter(order=first).update(hold_expires_at=timezone.now() - timedelta(seconds=1))
+        # An expired hold stops counting before the sweeper runs
+        self.assertEqual(available_stock(self.variant, "india"), 4)
+
+        out = io.StringIO()
+        call_command("release_stock_holds", stdout=out)
+        self.assertIn("Released 1 expired orders", out.getvalue())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, first.payment.status), (Order.Status.CANCELLED, Payment.Status.FAILED))
+        self.assertEqual((second.status, second.payment.status), (Order.Status.PENDING, Payment.Status.PENDING))
+        self.assertFalse(OrderItem.objects.filter(order=first, hold_expires_at__isnull=False).exists())
+        self.assertEqual(self.on_hand(), 5)  # a hold never touched on-hand stock
+
+    def test_sweeper_commits_holds_of_orders_paid_without_a_commit(self):
+        self.buy()
+        Payment.objects.update(status=Payment.Status.COMPLETED)
+        self.expire_holds()
+
+        self.assertEqual(release_expired_holds(), 0)
+        self.assertEqual((self.on_hand(), self.held()), (3, 0))
+        self.assertEqual(Order.objects.get().status, Order.Status.PENDING)
+
+    def test_stock_conflict_at_capture_flags_the_order_for_review(self):
+        self.buy()
+        order = Order.objects.get()
+        conflict = InsufficientStock(["Stock changed while placing your order. Please try again."])
+        with mock.patch.object(stock, "_apply_deductions", side_effect=conflict), \
+                mock.patch.object(self.fake.client.utility, "verify_payment_signature", return_value=True):
+            response = self.client.post(f"/api/orders/{order.pk}/verify-payment/", {
+                "razorpay_payment_id": "pay_1", "razorpay_order_id": "order_fake1", "razorpay_signature": "sig",
+            }, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.needs_review), (Order.Status.CONFIRMED, True))
+        self.assertEqual(Payment.objects.get().status, Payment.Status.COMPLETED)
+        self.assertEqual((self.on_hand(), self.held()), (5, 1))  # the hold is kept for a retry
+
+        # The sweeper retries the deduction once the hold runs out
+        self.expire_holds()
+        release_expired_holds()
+        self.assertEqual(self.on_hand(), 3)
+        self.assertEqual(Order.objects.get().status, Order.Status.CONFIRMED)
+
+
+class IdempotencyKeyTests(GatewayTestMixin, TestCase):
+    def buy(self, quantity=2, key="key-1"):
+        return self.client.post(
+            "/api/orders/buy-now/",
+            {"variant_id": self.variant.pk, "quantity": quantity, **SHIPPING, "payment_method": "upi"},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_response_without_new_order(self):
+        first = self.buy()
+        retry = self.buy()
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json()["id"], first.data["id"])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(len(self.fake.requests), 1)
+
+    def test_key_reused_for_different_request_is_rejected(self):
+        self.buy(quantity=1)
+        response = self.buy(quantity=2)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_gateway_error_releases_key_for_retry(self):
+        self.fake.fail = True
+        self.assertEqual(self.buy().status_code, 502)
+        self.fake.fail = False
+        response = self.buy()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", response)
+
+    def test_failure_after_the_order_commits_keeps_the_key(self):
+        with mock.patch("orders.views._get_order_with_prefetch", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                self.buy()
+        retry = self.buy()
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json()["id"], Order.objects.get().pk)
+        self.assertEqual(self.buy().json(), retry.json())
+
+    def test_purge_removes_only_expired_keys(self):
+        self.buy(key="old")
+        self.buy(key="new")
+        IdempotencyKey.objects.filter(key="old").update(created_at=timezone.now() - timedelta(days=2))
+        call_command("purge_idempotency_keys", stdout=mock.MagicMock())
+
+        self.assertEqual(list(IdempotencyKey.objects.values_list("key", flat=True)), ["new"])
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class ConcurrentIdempotencyTests(GatewayTestMixin, TransactionTestCase):
+    """A duplicate arriving while the first request runs waits for it and replays its response."""
+
+    delay = 0.5
+
+    def buy_concurrently(self, count=3):
+        user = User.objects.get()
+        responses = []
+
+        def buy():
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                responses.append(client.post(
+                    "/api/orders/buy-now/",
+                    {"variant_id": self.variant.pk, "quantity": 1, **SHIPPING, "payment_method": "upi"},
+                    format="json",
+                    HTTP_IDEMPOTENCY_KEY="same",
+                ))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_concurrent_duplicates_wait_and_replay(self):
+        responses = self.buy_concurrently()
+
+        self.assertEqual([r.status_code for r in responses], [201, 201, 201])
+        self.assertEqual(len({r.json()["id"] for r in responses}), 1)
+        self.assertEqual(sum(r.get("Idempotent-Replayed") == "true" for r in responses), 2)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(len(self.fake.requests), 1)
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0)
+    def test_duplicate_gets_409_once_the_wait_runs_out(self):
+        responses = self.buy_concurrently()
+
+        self.assertEqual(sorted(r.status_code for r in responses), [201, 409, 409])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(len(self.fake.requests), 1)
+
+
+@override_settings(RAZORPAY_KEY_SECRET="webhook-secret")
+class WebhookInboxTests(GatewayTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.buy()
+        self.payment = Payment.objects.get()
+
+    def deliver(self, event, event_id, created_at, order_id=None):
+        body = json.dumps({
+            "event": event,
+            "created_at": created_at,
+            "payload": {"payment": {"entity": {
+                "id": f"pay_{event_id}", "order_id": order_id or self.payment.razorpay_order_id,
+            }}},
+        }).encode()
+        signature = hmac.new(b"webhook-secret", body, hashlib.sha256).hexdigest()
+        return self.client.post(
+            "/api/webhooks/razorpay/", body, content_type="application/json",
+            HTTP_X_RAZORPAY_SIGNATURE=signature, HTTP_X_RAZORPAY_EVENT_ID=event_id,
+        )
+
+    def process(self):
+        call_command("process_webhooks", stdout=mock.MagicMock())
+
+    def test_events_are_queued_deduplicated_and_applied_once(self):
+        for _ in range(3):
+            self.assertEqual(self.deliver("payment.captured", "evt_1", 100).status_code, 200)
+
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.Status.PENDING)  # acknowledged, not applied
+
+        self.process()
+        self.payment.refresh_from_db()
+        self.variant.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.Status.COMPLETED)
+        self.assertEqual(Order.objects.get().status, Order.Status.CONFIRMED)
+        self.assertEqual(self.variant.india_stock, 3)
+
+    def test_failure_reported_after_capture_does_not_undo_it(self):
+        # Delivered out of order: the capture (t=200) arrives before the failure (t=100)
+        self.deliver("payment.captured", "evt_2", 200)
+        self.deliver("payment.failed", "evt_1", 100)
+        self.process()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.Status.COMPLETED)
+
+        self.deliver("payment.failed", "evt_3", 300)
+        self.process()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.Status.COMPLETED)
+
+    def test_stock_conflict_at_capture_is_applied_and_flagged(self):
+        self.deliver("payment.captured", "evt_1", 100)
+        conflict = InsufficientStock(["Stock changed while placing your order. Please try again."])
+        with mock.patch.object(stock, "_apply_deductions", side_effect=conflict):
+            self.process()
+
+        self.assertEqual(WebhookEvent.objects.get().status, WebhookEvent.Status.PROCESSED)
+        order = Order.objects.get()
+        self.assertEqual((order.status, order.needs_review), (Order.Status.CONFIRMED, True))
+        self.assertEqual(Payment.objects.get().status, Payment.Status.COMPLETED)
+
+    def test_unknown_order_is_retried_then_dead_lettered_and_requeued(self):
+        self.deliver("payment.captured", "evt_x", 100, order_id="order_unknown")
+        for _ in range(webhooks.MAX_ATTEMPTS):
+            WebhookEvent.objects.update(next_attempt_at=timezone.now())
+            self.process()
+
+        event = WebhookEvent.objects.get()
+        self.assertEqual((event.status, event.attempts), (WebhookEvent.Status.DEAD, webhooks.MAX_ATTEMPTS))
+
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_superuser(
+            email="admin@example.com", password="pass12345", first_name="A",
+        ))
+        listed = admin.get("/api/admin/webhooks/dead-letter/")
+        self.assertEqual([row["event_id"] for row in listed.json()["results"]], ["evt_x"])
+
+        self.assertEqual(admin.post(f"/api/admin/webhooks/{event.pk}/retry/").status_code, 200)
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), (WebhookEvent.Status.PENDING, 0))
+
+
+class PricingTests(TestCase):
+    """Previews, checkout and the batch quote endpoint share one pricing path."""
+
+    def setUp(self):
+        category = Category.objects.create(name="Men")
+        self.variants = [
+            ProductVariant.objects.create(
+                product=Product.objects.create(name=f"Oud {i}", description="-", category=category),
+                quantity_ml=50, india_price=Decimal("300.00"), switzerland_price=Decimal("20.00"),
+                india_stock=10, switzerland_stock=10,
+            )
+            for i in range(3)
+        ]
+        Discount.objects.create(
+            code="SAVE10", value=Decimal("10.00"),
+            valid_from=timezone.now() - timedelta(days=1), valid_until=timezone.now() + timedelta(days=1),
+        )
+        self.user = User.objects.create_user(email="buyer@example.com", password="pass12345", first_name="B")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cart_preview_matches_checkout(self):
+        cart = Cart.objects.create(user=self.user)
+        for variant in self.variants:
+            CartItem.objects.create(cart=cart, product=variant.product, variant=variant, quantity=2)
+
+        with self.assertNumQueries(2):  # cart lines + discount
+            preview = self.client.post(
+                "/api/orders/cart-preview/", {"discount_code": "save10"}, format="json",
+            ).json()
+        order = self.client.post(
+            "/api/orders/checkout/", {**SHIPPING, "discount_code": "save10"}, format="json",
+        ).json()
+
+        self.assertEqual(preview["subtotal"], 1800.0)
+        self.assertEqual(preview["discount_amount"], 180.0)
+        for field in ("subtotal", "discount_amount", "gst_amount", "shipping_fee", "total_amount"):
+            self.assertEqual(order[field], preview[field], field)
+
+    def test_batch_quote_uses_two_queries(self):
+        baskets = [
+            {"items": [{"variant_id": variant.pk, "quantity": 1}], "discount_code": "SAVE10"}
+            for variant in self.variants
+        ]
+        baskets.append({"items": [{"variant_id": 0, "quantity": 1}]})
+        baskets.append({"items": [{"variant_id": self.variants[0].pk, "quantity": 1}], "discount_code": "NOPE"})
+
+        with self.assertNumQueries(2):  # variants + discounts
+            quotes = self.client.post("/api/orders/quote/", {"baskets": baskets}, format="json").json()["quotes"]
+
+        # 300 - 30 discount = 270 taxable, below 499 so shipping applies
+        self.assertEqual(quotes[0]["total_amount"], 368.6)
+        self.assertEqual(quotes[3], {"error": "Product variant 0 not found."})
+        self.assertEqual(quotes[4], {"error": "Invalid discount code."})
+
+
+@override_settings(STORAGES={**settings.STORAGES, "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"}})
+class StockSyncTests(TestCase):
+    """A sale re-versions every cached payload that shows the sold variants' stock."""
+
+    def setUp(self):
+        catalog_cache().clear()
+        category = Category.objects.create(name="Men")
+        self.product = Product.objects.create(name="Oud", description="-", category=category)
+        self.tester, self.small, _ = (
+            ProductVariant.objects.create(
+                product=self.product, quantity_ml=ml, india_price=Decimal(price),
+                switzerland_price=Decimal("50.00"), india_stock=stock,
+            )
+            for ml, price, stock in ((5, "199.00", 1), (50, "999.00", 1), (100, "1499.00", 5))
+        )
+        TesterBox.objects.create(name="Discovery").products.add(self.product)
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(email="buyer@example.com", password="pass12345", first_name="B")
+        )
+
+    def buy(self, variant):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/orders/buy-now/", {
+                "variant_id": variant.pk, "quantity": 1, "payment_method": "cod", **SHIPPING,
+            }, format="json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_sale_invalidates_detail_list_and_tester_box(self):
+        detail_url = f"/api/products/{self.product.slug}/"
+        etag = self.client.get(detail_url)["ETag"]
+        self.assertEqual(self.client.get("/api/products/")["X-Catalog-Cache"], "MISS")
+        self.client.get("/api/products/tester-boxes/")
+        catalog = get_catalog_version()
+
+        self.buy(self.small)
+        self.buy(self.tester)
+
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.has_india_stock)  # the 100ml is still in stock
+        self.assertEqual(get_catalog_version(), catalog + 2)
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        listing = self.client.get("/api/products/")
+        self.assertEqual(listing["X-Catalog-Cache"], "MISS")
+        variants = listing.json()["results"][0]["variants"]
+        self.assertEqual([(v["quantity_ml"], v["india_stock"]) for v in variants], [(50, 0), (100, 5)])
+
+        box = self.client.get("/api/products/tester-boxes/").json()[0]
+        tester = box["products"][0]["variants"][0]
+        self.assertEqual((tester["india_stock"], tester["in_stock"]), (0, False))
+
+
+@override_settings(STORAGES={**settings.STORAGES, "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"}})
+class OrderItemSnapshotTests(TestCase):
+    """Order history reads slug and image from the item, never from products."""
+
+    def setUp(self):
+        category = Category.objects.create(name="Men")
+        self.product = Product.objects.create(name="Oud Royale", description="-", category=category)
+        ProductImage.objects.create(product=self.product, image="products/oud.jpg")
+        self.variant = ProductVariant.objects.create(
+            product=self.product, quantity_ml=50,
+            india_price=Decimal("999.00"), switzerland_price=Decimal("50.00"), india_stock=10,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(email="buyer@example.com", password="pass12345", first_name="B")
+        )
+
+    def buy(self):
+        return self.client.post(
+            "/api/orders/buy-now/", {"variant_id": self.variant.pk, "quantity": 1, **SHIPPING}, format="json",
+        )
+
+    def test_snapshot_is_captured_and_served_without_product_queries(self):
+        for _ in range(3):
+            self.assertEqual(self.buy().status_code, 201)
+
+        with CaptureQueriesContext(connection) as queries:
+            results = self.client.get("/api/orders/").json()["results"]
+        self.assertFalse([q for q in queries if "products_product" in q["sql"]])
+        self.assertEqual(len(results), 3)
+        item = results[0]["items"][0]
+        self.assertEqual(item["product_slug"], "oud-royale")
+        self.assertTrue(item["product_image"].endswith("products/oud.jpg"))
+
+    def test_backfill_fills_existing_items(self):
+        self.buy()
+        OrderItem.objects.update(product_slug="", product_image="")
+
+        call_command("backfill_order_item_snapshots", batch_size=1, stdout=io.StringIO())
+
+        item = OrderItem.objects.get()
+        self.assertEqual((item.product_slug, item.product_image), ("oud-royale", "products/oud.jpg"))
+
+
+class OrderListQueryCountTests(TestCase):
+    """Order list pages cost a fixed number of queries however many rows they hold."""
+
+    def setUp(self):
+        category = Category.objects.create(name="Men")
+        self.product = Product.objects.create(name="Oud", description="-", category=category)
+        self.customer = User.objects.create_user(email="buyer@example.com", password="pass12345", first_name="B")
+        self.admin = User.objects.create_superuser(email="admin@example.com", password="pass12345", first_name="A")
+        self.client = APIClient()
+
+    def add_orders(self, count):
+        for _ in range(count):
+            order = Order.objects.create(
+                user=self.customer, subtotal=Decimal("200.00"), total_amount=Decimal("236.00"),
+                **{field: SHIPPING[field] for field in SHIPPING if field.startswith("shipping_")},
+            )
+            for quantity in (1, 2):
+                OrderItem.objects.create(
+                    order=order, product=self.product, product_name="Oud",
+                    quantity=quantity, price_at_purchase=Decimal("100.00"),
+                )
+            Payment.objects.create(order=order, method="cod", amount=order.total_amount)
+
+    def assert_flat(self, user, url, queries):
+        self.client.force_authenticate(user)
+        for count in (1, 10):
+            self.add_orders(count)
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+        return response.json()["results"]
+
+    def test_customer_order_list(self):
+        # COUNT, orders joined with user/payment, items
+        rows = self.assert_flat(self.customer, "/api/orders/", 3)
+        self.assertEqual(rows[0]["item_count"], 2)
+        self.assertEqual(rows[0]["customer_email"], "buyer@example.com")
+        self.assertEqual(len(rows[0]["items"]), 2)
+        self.assertEqual(rows[0]["payment"]["method"], "cod")
+
+    def test_admin_grid_leaves_out_items(self):
+        rows = self.assert_flat(self.admin, "/api/admin/orders/", 2)
+        self.assertNotIn("items", rows[0])
+        self.assertEqual(rows[0]["item_count"], 2)
+
+    def test_admin_grid_expands_items(self):
+        rows = self.assert_flat(self.admin, "/api/admin/orders/?expand=items", 3)
+        self.assertEqual(len(rows[0]["items"]), 2)
+
+    def test_dashboard_recent_orders(self):
+        self.client.force_authenticate(self.admin)
+        self.add_orders(1)
+        self.client.get("/api/admin/analytics/dashboard/")  # builds the snapshot
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_orders(1)  # drops the cached recent orders
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get("/api/admin/analytics/dashboard/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_orders(10)
+        with self.assertNumQueries(len(baseline)):
+            response = self.client.get("/api/admin/analytics/dashboard/")
+        self.assertEqual(len(response.json()["recent_orders"]), 10)
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Men")
+        self.product = Product.objects.create(name="Oud", description="-", category=category)
+        self.customer = User.objects.create_user(email="buyer@example.com", password="pass12345", first_name="B")
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_superuser(email="admin@example.com", password="pass12345", first_name="A")
+        )
+        self.orders = []
+        for index, state in enumerate(["delivered", "delivered", "cancelled", "delivered", "pending"]):
+            order = Order.objects.create(
+                user=self.customer, status=state, subtotal=Decimal("200.00"), total_amount=Decimal("236.00"),
+                **{field: SHIPPING[field] for field in SHIPPING if field.startswith("shipping_")},
+            )
+            for quantity in range(1, index % 3 + 2):
+                OrderItem.objects.create(
+                    order=order, product=self.product, product_name="Oud",
+                    quantity=quantity, price_at_purchase=Decimal("100.00"),
+                )
+            if state != "pending":
+                Payment.objects.create(order=order, method="cod", amount=order.total_amount)
+            self.orders.append(order)
+
+    def export(self, query):
+        response = self.client.get(f"/api/admin/orders/export/{query}")
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_has_one_row_per_item_and_reads_orders_in_chunks(self):
+        # Orders sharing a timestamp are paged by pk
+        Order.objects.filter(pk__in=[order.pk for order in self.orders[1:4]]).update(created_at=self.orders[1].created_at)
+        # An orders query and an items query per keyset page of 2 orders
+        with mock.patch.object(export, "CHUNK_SIZE", 2), self.assertNumQueries(3 + 3):
+            body = self.export("?status=delivered,cancelled,pending")
+
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), OrderItem.objects.count())
+        self.assertEqual([int(row["order_id"]) for row in rows[:3]], [self.orders[0].pk, self.orders[1].pk, self.orders[1].pk])
+        self.assertEqual(rows[2]["item_line_total"], "200.00")
+        self.assertEqual(rows[0]["customer_email"], "buyer@example.com")
+        self.assertEqual(rows[-1]["payment_method"], "")
+
+    def test_ndjson_nests_items_and_filters(self):
+        Order.objects.filter(pk=self.orders[0].pk).update(created_at=timezone.now() - timedelta(days=40))
+        start = (timezone.localdate() - timedelta(days=1)).isoformat()
+
+        lines = self.export(f"?output=ndjson&status=delivered&start_date={start}").splitlines()
+
+        orders = [json.loads(line) for line in lines]
+        self.assertEqual([order["order_id"] for order in orders], [self.orders[1].pk, self.orders[3].pk])
+        self.assertEqual(len(orders[0]["items"]), 2)
+        self.assertEqual(orders[0]["payment"]["method"], "cod")
+
+    def test_bad_parameters_are_rejected(self):
+        self.assertEqual(self.client.get("/api/admin/orders/export/?output=xml").status_code, 400)
+        self.assertEqual(self.client.get("/api/admin/orders/export/?start_date=yesterday").status_code, 400)
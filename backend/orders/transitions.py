@@ -0,0 +1,89 @@
+"""
+Side effects of an admin moving an order to a new status, shared by
+AdminOrderStatusView and the bulk actions in orders/admin.py. The caller
+saves the new status first, then calls apply_status_change():
+
+    confirmed, processing, shipped, delivered
+        a pending payment is marked completed and the order's stock holds
+        become real deductions (settle_holds)
+    cancelled
+        stock the order took comes back if it had not left the warehouse
+        (previous status pending or confirmed), holds are dropped, a
+        captured online payment is refunded through Razorpay and a pending
+        one is marked failed
+"""
+
+import logging
+
+from django.utils import timezone
+
+from . import gateway
+from .models import Order, Payment
+from .stock import release_holds, restock_order, settle_holds
+
+logger = logging.getLogger(__name__)
+
+FULFILMENT_STATUSES = (
+    Order.Status.CONFIRMED,
+    Order.Status.PROCESSING,
+    Order.Status.SHIPPED,
+    Order.Status.DELIVERED,
+)
+
+
+def _payment(order):
+    try:
+        return order.payment
+    except Payment.DoesNotExist:
+        return None
+
+
+def apply_status_change(order, previous_status):
+    """Settle stock and payment for `order`, just moved from `previous_status`."""
+    if order.status in FULFILMENT_STATUSES:
+        payment = _payment(order)
+        if payment and payment.status == Payment.Status.PENDING:
+            payment.status = Payment.Status.COMPLETED
+            payment.paid_at = timezone.now()
+            payment.save()
+        settle_holds(order)
+    elif order.status == Order.Status.CANCELLED:
+        # Stock that has left the warehouse comes back through a manual transfer
+        if previous_status in (Order.Status.PENDING, Order.Status.CONFIRMED):
+            restock_order(order)
+        release_holds([order.pk])
+        payment = _payment(order)
+        if payment is None:
+            return
+        if (
+            payment.method != Payment.Method.COD
+            and payment.status == Payment.Status.COMPLETED
+            and payment.razorpay_payment_id
+        ):
+            _refund(order, payment)
+        elif payment.status == Payment.Status.PENDING:
+            # COD or an unfinished online payment: nothing to refund
+            payment.status = Payment.Status.FAILED
+            payment.save()
+
+
+def _refund(order, payment):
+    if not gateway.razorpay_client:
+        logger.error("Razorpay client not configured; cannot process refund.")
+        return
+    try:
+        # Initiate full refund via Razorpay API
+        gateway.razorpay_client.refund.create({
+            "payment_id": payment.razorpay_payment_id,
+            "notes": {
+                "order_id": str(order.order_number),
+                "reason": "Admin cancelled the order.",
+            },
+        })
+    except Exception as e:
+        # The order stays cancelled; the refund has to be retried by hand
+        logger.error(f"Razorpay refund failed for Order {order.pk}: {e}")
+        return
+    payment.status = Payment.Status.REFUNDED
+    payment.save()
+    logger.info(f"Refund initiated for Order {order.pk} (Payment {payment.razorpay_payment_id})")
@@ -8,6 +8,7 @@ urlpatterns = [
     path("orders/buy-now/", views.BuyNowView.as_view(), name="buy-now"),
     path("orders/cart-preview/", views.CartPricingPreviewView.as_view(), name="cart-preview"),
     path("orders/buynow-preview/", views.BuyNowPricingPreviewView.as_view(), name="buynow-preview"),
+    path("orders/quote/", views.QuoteView.as_view(), name="order-quote"),
     path("orders/", views.OrderListView.as_view(), name="order-list"),
     path("orders/<int:pk>/", views.OrderDetailView.as_view(), name="order-detail"),
     path("orders/<int:order_id>/verify-payment/", views.VerifyPaymentView.as_view(), name="verify-payment"),
@@ -16,5 +17,8 @@ urlpatterns = [
     path("webhooks/razorpay/", views.RazorpayWebhookView.as_view(), name="razorpay-webhook"),
     # Admin
     path("admin/orders/", views.AdminOrderListView.as_view(), name="admin-order-list"),
+    path("admin/orders/export/", views.AdminOrderExportView.as_view(), name="admin-order-export"),
     path("admin/orders/<int:pk>/status/", views.AdminOrderStatusView.as_view(), name="admin-order-status"),
+    path("admin/webhooks/dead-letter/", views.AdminWebhookDeadLetterView.as_view(), name="admin-webhook-dead-letter"),
+    path("admin/webhooks/<int:pk>/retry/", views.AdminWebhookRetryView.as_view(), name="admin-webhook-retry"),
 ]
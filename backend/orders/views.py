@@ -9,48 +9,64 @@ import logging
 import razorpay
 from django.conf import settings
 from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from decimal import Decimal
 from rest_framework import generics, status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from cart.models import Cart
-from discounts.models import Discount
+from cart.models import Cart, CartItem
+from parfum.pagination import CreatedAtCursorPagination
 from parfum.permissions import IsAdmin
 
-from .models import Order, OrderItem, Payment
+from . import export, gateway, webhooks
+from .idempotency import bind_order, idempotent
+from .models import Order, OrderItem, Payment, WebhookEvent
+from .pricing import (
+    PricingError,
+    QuoteLine,
+    build_quote,
+    cart_quote,
+    load_variants,
+    quote_baskets,
+    resolve_discount,
+)
+from .stock import (
+    InsufficientStock,
+    StockLine,
+    available_stock,
+    settle_holds,
+    deduct_stock,
+    hold_deadline,
+    hold_stock,
+    record_checkout,
+)
+from .transitions import apply_status_change
 from .serializers import (
     BuyNowPreviewSerializer,
     BuyNowSerializer,
     CartPreviewSerializer,
+    AdminOrderListSerializer,
     CheckoutSerializer,
     OrderListSerializer,
     OrderSerializer,
     OrderStatusUpdateSerializer,
     PaymentCreateSerializer,
+    QuoteSerializer,
     RazorpayVerifySerializer,
+    WebhookEventSerializer,
+    order_list_queryset,
 )
 
 logger = logging.getLogger(__name__)
 
-# Initialize Razorpay client (None if keys not configured)
-razorpay_client = None
-if settings.RAZORPAY_KEY_ID and settings.RAZORPAY_KEY_SECRET:
-    razorpay_client = razorpay.Client(
-        auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-    )
-
-
 def _get_order_with_prefetch(order_pk):
     """Re-fetch an order with all related data needed for serialization."""
     return (
-        Order.objects.prefetch_related(
-            "items__product__images",
-            "items__variant",
-            "payment",
-        ).get(pk=order_pk)
+        Order.objects.select_related("user", "payment")
+        .prefetch_related("items")
+        .get(pk=order_pk)
     )
 
 
@@ -66,50 +82,39 @@ class CheckoutView(APIView):
     For COD: creates order immediately with pending payment.
     For online payments (UPI/card/wallet/netbanking): creates a Razorpay order
     and returns razorpay_order_id + key_id for frontend to open the popup.
+    Online orders only hold their stock (see orders/stock.py) until the
+    payment is verified or the hold expires.
     """
 
     permission_classes = [IsAuthenticated]
 
-    @transaction.atomic
+    @idempotent
     def post(self, request):
         serializer = CheckoutSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
 
-        # ── Get cart ──
-        try:
-            cart = Cart.objects.prefetch_related(
-                "items__product", "items__variant"
-            ).get(user=request.user)
-        except Cart.DoesNotExist:
+        is_cod = data["payment_method"] == Payment.Method.COD
+        if not is_cod and not gateway.razorpay_client:
             return Response(
-                {"error": "Cart is empty."},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"error": "Online payments are not configured. Please use COD."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
-        cart_items = cart.items.all()
-        if not cart_items.exists():
+        # ── Price the cart (one query for every line) ──
+        try:
+            quote = cart_quote(request, data.get("discount_code", ""))
+        except PricingError as exc:
             return Response(
-                {"error": "Cart is empty."},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"error": exc.message},
+                status=exc.status_code,
             )
 
-        # ── Validate stock ──
+        # ── Validate products (stock is checked under lock below) ──
         errors = []
-        for item in cart_items:
-            available_stock = (
-                item.variant.switzerland_stock
-                if item.selected_origin == "switzerland"
-                else item.variant.india_stock
-            )
-            if item.quantity > available_stock and item.variant.oversell != 'continue':
-                errors.append(
-                    f"{item.product.name} ({item.variant.quantity_ml}ml - {item.selected_origin}): "
-                    f"only {available_stock} in stock "
-                    f"(requested {item.quantity})"
-                )
-            if not item.product.is_active:
-                errors.append(f"{item.product.name} is no longer available.")
+        for line in quote.lines:
+            if not line.product.is_active:
+                errors.append(f"{line.product.name} is no longer available.")
 
         if errors:
             return Response(
@@ -117,121 +122,98 @@ class CheckoutView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # ── Calculate totals ──
-        subtotal = sum(item.line_total for item in cart_items)
-        discount_amount = 0
-        discount_obj = None
-
-        discount_code = data.get("discount_code", "").strip()
-        if discount_code:
+        # ── Phase 1: reserve stock and create the order (short transaction) ──
+        with transaction.atomic():
+            # ── Lock and deduct stock (COD) or hold it until payment (online) ──
+            hold_until = None if is_cod else hold_deadline()
+            reserve = deduct_stock if is_cod else hold_stock
             try:
-                discount_obj = Discount.objects.get(code__iexact=discount_code)
-                if not discount_obj.is_valid:
-                    return Response(
-                        {"error": "Discount code is expired or invalid."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-                discount_amount = discount_obj.calculate_discount(subtotal)
-            except Discount.DoesNotExist:
+                oversold = reserve(
+                    StockLine(line.variant.pk, line.origin, line.quantity, line.product.name)
+                    for line in quote.lines
+                )
+            except InsufficientStock as exc:
                 return Response(
-                    {"error": "Invalid discount code."},
+                    {"errors": exc.errors},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-        taxable_amount = subtotal - discount_amount
-        gst_amount = taxable_amount * Decimal("0.18")
-        shipping_fee = Decimal("50.00") if taxable_amount < 499 else Decimal("0.00")
-        total_amount = taxable_amount + gst_amount + shipping_fee
-        
-        is_cod = data["payment_method"] == Payment.Method.COD
+            # ── Create order ──
+            order = Order.objects.create(
+                user=request.user,
+                subtotal=quote.subtotal,
+                discount_amount=quote.discount_amount,
+                gst_amount=quote.gst_amount,
+                shipping_fee=quote.shipping_fee,
+                total_amount=quote.total_amount,
+                shipping_name=data["shipping_name"],
+                shipping_address=data["shipping_address"],
+                shipping_city=data["shipping_city"],
+                shipping_pincode=data["shipping_pincode"],
+                shipping_phone=data["shipping_phone"],
+                discount_code=quote.discount,
+                status=Order.Status.PENDING,
+            )
+            bind_order(request, order)
+
+            # ── Create order items ──
+            items = []
+            for line, line_oversold in zip(quote.lines, oversold):
+                items.append(OrderItem.objects.create(
+                    order=order,
+                    product=line.product,
+                    variant=line.variant,
+                    product_name=line.product.name,
+                    **OrderItem.product_snapshot(line.product),
+                    quantity_ml=line.variant.quantity_ml,
+                    selected_origin=line.origin,
+                    quantity=line.quantity,
+                    oversold_quantity=line_oversold,
+                    hold_expires_at=hold_until,
+                    price_at_purchase=line.unit_price,
+                    tester_box_items=line.tester_box_items,
+                ))
+            if is_cod:
+                record_checkout(order, items)
+
+            # ── Create payment record ──
+            payment_status = Payment.Status.PENDING
+            if is_cod:
+                # COD orders: payment is pending until delivery
+                payment_status = Payment.Status.PENDING
+
+            Payment.objects.create(
+                order=order,
+                method=data["payment_method"],
+                amount=quote.total_amount,
+                status=payment_status,
+            )
+
+            if not is_cod:
+                outbox = gateway.enqueue_razorpay_order(order, receipt=f"order_{order.pk}")
 
-        # ── Create Razorpay order (for online payments only) ──
+            # ── Update discount usage ──
+            if quote.discount:
+                quote.discount.times_used += 1
+                quote.discount.save(update_fields=["times_used"])
+
+            # ── Clear cart ──
+            # COD: clear immediately (no payment popup needed)
+            # Online: keep cart until payment is verified (see VerifyPaymentView)
+            if is_cod:
+                CartItem.objects.filter(cart__user=request.user).delete()
+
+        # ── Phases 2 + 3: create the Razorpay order outside the transaction ──
         razorpay_order_id = None
         if not is_cod:
-            if not razorpay_client:
-                return Response(
-                    {"error": "Online payments are not configured. Please use COD."},
-                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
-                )
-            try:
-                # Razorpay expects amount in paise (INR * 100)
-                rz_order = razorpay_client.order.create({
-                    "amount": int(total_amount * 100),
-                    "currency": "INR",
-                    "receipt": f"order_{request.user.pk}_{timezone.now().strftime('%Y%m%d%H%M%S')}",
-                    "payment_capture": 1,  # Auto-capture payment
-                })
-                razorpay_order_id = rz_order["id"]
-            except Exception as e:
-                logger.error(f"Razorpay order creation failed: {e}")
+            razorpay_order_id = gateway.deliver(outbox)
+            if razorpay_order_id is None:
+                gateway.abandon(outbox)
                 return Response(
                     {"error": "Payment gateway error. Please try again."},
                     status=status.HTTP_502_BAD_GATEWAY,
                 )
 
-        # ── Create order ──
-        order = Order.objects.create(
-            user=request.user,
-            subtotal=subtotal,
-            discount_amount=discount_amount,
-            gst_amount=gst_amount,
-            shipping_fee=shipping_fee,
-            total_amount=total_amount,
-            shipping_name=data["shipping_name"],
-            shipping_address=data["shipping_address"],
-            shipping_city=data["shipping_city"],
-            shipping_pincode=data["shipping_pincode"],
-            shipping_phone=data["shipping_phone"],
-            discount_code=discount_obj,
-            status=Order.Status.PENDING,
-        )
-
-        # ── Create order items & deduct stock ──
-        for item in cart_items:
-            OrderItem.objects.create(
-                order=order,
-                product=item.product,
-                variant=item.variant,
-                product_name=item.product.name,
-                quantity_ml=item.variant.quantity_ml,
-                selected_origin=item.selected_origin,
-                quantity=item.quantity,
-                price_at_purchase=item.line_total / item.quantity,
-                tester_box_items=item.tester_box_items,
-            )
-            # Deduct from the correct regional stock
-            if item.selected_origin == "switzerland":
-                item.variant.switzerland_stock = max(0, item.variant.switzerland_stock - item.quantity)
-                item.variant.save(update_fields=["switzerland_stock"])
-            else:
-                item.variant.india_stock = max(0, item.variant.india_stock - item.quantity)
-                item.variant.save(update_fields=["india_stock"])
-
-        # ── Create payment record ──
-        payment_status = Payment.Status.PENDING
-        if is_cod:
-            # COD orders: payment is pending until delivery
-            payment_status = Payment.Status.PENDING
-
-        Payment.objects.create(
-            order=order,
-            method=data["payment_method"],
-            amount=total_amount,
-            status=payment_status,
-            razorpay_order_id=razorpay_order_id,
-        )
-
-        # ── Update discount usage ──
-        if discount_obj:
-            discount_obj.times_used += 1
-            discount_obj.save(update_fields=["times_used"])
-
-        # ── Clear cart ──
-        # COD: clear immediately (no payment popup needed)
-        # Online: keep cart until payment is verified (see VerifyPaymentView)
-        if is_cod:
-            cart.items.all().delete()
-
         # ── Build response ──
         order = _get_order_with_prefetch(order.pk)
         response_data = OrderSerializer(order).data
@@ -240,7 +222,7 @@ class CheckoutView(APIView):
             # Frontend needs these to open Razorpay checkout popup
             response_data["razorpay_order_id"] = razorpay_order_id
             response_data["razorpay_key_id"] = settings.RAZORPAY_KEY_ID
-            response_data["amount_paise"] = int(total_amount * 100)
+            response_data["amount_paise"] = int(quote.total_amount * 100)
             response_data["currency"] = "INR"
 
         return Response(response_data, status=status.HTTP_201_CREATED)
@@ -256,20 +238,22 @@ class BuyNowView(APIView):
 
     permission_classes = [IsAuthenticated]
 
-    @transaction.atomic
+    @idempotent
     def post(self, request):
         serializer = BuyNowSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
 
-        # ── Get variant ──
-        from products.models import ProductVariant
-
-        try:
-            variant = ProductVariant.objects.select_related("product").get(
-                pk=data["variant_id"]
+        is_cod = data["payment_method"] == Payment.Method.COD
+        if not is_cod and not gateway.razorpay_client:
+            return Response(
+                {"error": "Online payments are not configured. Please use COD."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
-        except ProductVariant.DoesNotExist:
+
+        # ── Get variant ──
+        variant = load_variants([data["variant_id"]]).get(data["variant_id"])
+        if variant is None:
             return Response(
                 {"error": "Product variant not found."},
                 status=status.HTTP_404_NOT_FOUND,
@@ -285,118 +269,94 @@ class BuyNowView(APIView):
                 {"error": f"{product.name} is no longer available."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        available_stock = (
-            variant.switzerland_stock if origin == "switzerland" else variant.india_stock
-        )
-        if quantity > available_stock and variant.oversell != 'continue':
-            return Response(
-                {"error": f"{product.name} ({variant.quantity_ml}ml - {origin}): "
-                          f"only {available_stock} in stock (requested {quantity})"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
 
         # ── Calculate totals ──
-        price = variant.switzerland_effective_price if origin == "switzerland" else variant.india_effective_price
-        subtotal = price * quantity
-        discount_amount = 0
-        discount_obj = None
+        try:
+            quote = build_quote(
+                [QuoteLine(variant, origin, quantity)],
+                resolve_discount(data.get("discount_code", "")),
+            )
+        except PricingError as exc:
+            return Response(
+                {"error": exc.message},
+                status=exc.status_code,
+            )
 
-        discount_code = data.get("discount_code", "").strip()
-        if discount_code:
+        # ── Phase 1: reserve stock and create the order (short transaction) ──
+        with transaction.atomic():
+            # ── Lock and deduct stock (COD) or hold it until payment (online) ──
+            hold_until = None if is_cod else hold_deadline()
+            reserve = deduct_stock if is_cod else hold_stock
             try:
-                discount_obj = Discount.objects.get(code__iexact=discount_code)
-                if not discount_obj.is_valid:
-                    return Response(
-                        {"error": "Discount code is expired or invalid."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-                discount_amount = discount_obj.calculate_discount(subtotal)
-            except Discount.DoesNotExist:
+                [oversold] = reserve([StockLine(variant.pk, origin, quantity, product.name)])
+            except InsufficientStock as exc:
                 return Response(
-                    {"error": "Invalid discount code."},
+                    {"error": exc.errors[0]},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-        taxable_amount = subtotal - discount_amount
-        gst_amount = taxable_amount * Decimal("0.18")
-        shipping_fee = Decimal("50.00") if taxable_amount < 499 else Decimal("0.00")
-        total_amount = taxable_amount + gst_amount + shipping_fee
-        
-        is_cod = data["payment_method"] == Payment.Method.COD
+            # ── Create order ──
+            order = Order.objects.create(
+                user=request.user,
+                subtotal=quote.subtotal,
+                discount_amount=quote.discount_amount,
+                gst_amount=quote.gst_amount,
+                shipping_fee=quote.shipping_fee,
+                total_amount=quote.total_amount,
+                shipping_name=data["shipping_name"],
+                shipping_address=data["shipping_address"],
+                shipping_city=data["shipping_city"],
+                shipping_pincode=data["shipping_pincode"],
+                shipping_phone=data["shipping_phone"],
+                discount_code=quote.discount,
+                status=Order.Status.PENDING,
+            )
+            bind_order(request, order)
+
+            # ── Create single order item ──
+            item = OrderItem.objects.create(
+                order=order,
+                product=product,
+                variant=variant,
+                product_name=product.name,
+                **OrderItem.product_snapshot(product),
+                quantity_ml=variant.quantity_ml,
+                selected_origin=origin,
+                quantity=quantity,
+                oversold_quantity=oversold,
+                hold_expires_at=hold_until,
+                price_at_purchase=quote.lines[0].unit_price,
+            )
+            if is_cod:
+                record_checkout(order, [item])
 
-        # ── Create Razorpay order (online payments only) ──
+            # ── Create payment record ──
+            Payment.objects.create(
+                order=order,
+                method=data["payment_method"],
+                amount=quote.total_amount,
+                status=Payment.Status.PENDING,
+            )
+
+            if not is_cod:
+                outbox = gateway.enqueue_razorpay_order(order, receipt=f"buynow_{order.pk}")
+
+            # ── Update discount usage ──
+            if quote.discount:
+                quote.discount.times_used += 1
+                quote.discount.save(update_fields=["times_used"])
+
+        # ── Phases 2 + 3: create the Razorpay order outside the transaction ──
         razorpay_order_id = None
         if not is_cod:
-            if not razorpay_client:
-                return Response(
-                    {"error": "Online payments are not configured. Please use COD."},
-                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
-                )
-            try:
-                rz_order = razorpay_client.order.create({
-                    "amount": int(total_amount * 100),
-                    "currency": "INR",
-                    "receipt": f"buynow_{request.user.pk}_{timezone.now().strftime('%Y%m%d%H%M%S')}",
-                    "payment_capture": 1,
-                })
-                razorpay_order_id = rz_order["id"]
-            except Exception as e:
-                logger.error(f"Razorpay order creation failed: {e}")
+            razorpay_order_id = gateway.deliver(outbox)
+            if razorpay_order_id is None:
+                gateway.abandon(outbox)
                 return Response(
                     {"error": "Payment gateway error. Please try again."},
                     status=status.HTTP_502_BAD_GATEWAY,
                 )
 
-        # ── Create order ──
-        order = Order.objects.create(
-            user=request.user,
-            subtotal=subtotal,
-            discount_amount=discount_amount,
-            gst_amount=gst_amount,
-            shipping_fee=shipping_fee,
-            total_amount=total_amount,
-            shipping_name=data["shipping_name"],
-            shipping_address=data["shipping_address"],
-            shipping_city=data["shipping_city"],
-            shipping_pincode=data["shipping_pincode"],
-            shipping_phone=data["shipping_phone"],
-            discount_code=discount_obj,
-            status=Order.Status.PENDING,
-        )
-
-        # ── Create single order item & deduct stock ──
-        OrderItem.objects.create(
-            order=order,
-            product=product,
-            variant=variant,
-            product_name=product.name,
-            quantity_ml=variant.quantity_ml,
-            selected_origin=origin,
-            quantity=quantity,
-            price_at_purchase=price,
-        )
-        # Deduct from the correct regional stock
-        if origin == "switzerland":
-            variant.switzerland_stock = max(0, variant.switzerland_stock - quantity)
-            variant.save(update_fields=["switzerland_stock"])
-        else:
-            variant.india_stock = max(0, variant.india_stock - quantity)
-            variant.save(update_fields=["india_stock"])
-
-        # ── Create payment record ──
-        Payment.objects.create(
-            order=order,
-            method=data["payment_method"],
-            amount=total_amount,
-            status=Payment.Status.PENDING,
-            razorpay_order_id=razorpay_order_id,
-        )
-
-        # ── Update discount usage ──
-        if discount_obj:
-            discount_obj.times_used += 1
-            discount_obj.save(update_fields=["times_used"])
-
         # ── Build response ──
         order = _get_order_with_prefetch(order.pk)
         response_data = OrderSerializer(order).data
@@ -404,7 +364,7 @@ class BuyNowView(APIView):
         if not is_cod and razorpay_order_id:
             response_data["razorpay_order_id"] = razorpay_order_id
             response_data["razorpay_key_id"] = settings.RAZORPAY_KEY_ID
-            response_data["amount_paise"] = int(total_amount * 100)
+            response_data["amount_paise"] = int(quote.total_amount * 100)
             response_data["currency"] = "INR"
 
         return Response(response_data, status=status.HTTP_201_CREATED)
@@ -424,6 +384,7 @@ class VerifyPaymentView(APIView):
 
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request, order_id):
         # Validate input
         serializer = RazorpayVerifySerializer(data=request.data)
@@ -467,7 +428,7 @@ class VerifyPaymentView(APIView):
 
         # Verify HMAC signature
         try:
-            razorpay_client.utility.verify_payment_signature({
+            gateway.razorpay_client.utility.verify_payment_signature({
                 "razorpay_order_id": razorpay_order_id,
                 "razorpay_payment_id": razorpay_payment_id,
                 "razorpay_signature": razorpay_signature,
@@ -484,16 +445,24 @@ class VerifyPaymentView(APIView):
             )
 
         # ── Payment verified — mark as completed ──
-        payment.razorpay_payment_id = razorpay_payment_id
-        payment.razorpay_signature = razorpay_signature
-        payment.transaction_id = razorpay_payment_id
-        payment.status = Payment.Status.COMPLETED
-        payment.paid_at = timezone.now()
-        payment.save()
-
-        # Update order status
-        order.status = Order.Status.CONFIRMED
-        order.save(update_fields=["status"])
+        with transaction.atomic():
+            payment.razorpay_payment_id = razorpay_payment_id
+            payment.razorpay_signature = razorpay_signature
+            payment.transaction_id = razorpay_payment_id
+            payment.status = Payment.Status.COMPLETED
+            payment.paid_at = timezone.now()
+            payment.save()
+
+            # Update order status and turn the stock hold into a deduction
+            if order.status == Order.Status.CANCELLED:
+                logger.warning(
+                    f"Payment {razorpay_payment_id} captured after order {order.pk} "
+                    f"was cancelled (stock hold expired); refund required"
+                )
+            else:
+                order.status = Order.Status.CONFIRMED
+                order.save(update_fields=["status", "updated_at"])
+                settle_holds(order)
 
         # ── Clear cart (deferred from checkout for online payments) ──
         try:
@@ -518,7 +487,8 @@ class RazorpayWebhookView(APIView):
     Razorpay sends payment.captured event here.
 
     No auth required (called by Razorpay servers).
-    Verified via webhook signature.
+    Verified via webhook signature, then stored in the WebhookEvent inbox
+    and acknowledged; see orders/webhooks.py for processing.
     """
 
     permission_classes = [AllowAny]
@@ -549,53 +519,12 @@ class RazorpayWebhookView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Parse event
-        event = request.data.get("event")
-        payload = request.data.get("payload", {})
-
-        if event == "payment.captured":
-            payment_entity = payload.get("payment", {}).get("entity", {})
-            rz_order_id = payment_entity.get("order_id")
-            rz_payment_id = payment_entity.get("id")
-
-            if rz_order_id:
-                try:
-                    payment = Payment.objects.get(razorpay_order_id=rz_order_id)
-                    if payment.status != Payment.Status.COMPLETED:
-                        payment.razorpay_payment_id = rz_payment_id
-                        payment.transaction_id = rz_payment_id
-                        payment.status = Payment.Status.COMPLETED
-                        payment.paid_at = timezone.now()
-                        payment.save()
-
-                        # Confirm the order
-                        order = payment.order
-                        if order.status == Order.Status.PENDING:
-                            order.status = Order.Status.CONFIRMED
-                            order.save(update_fields=["status"])
-
-                        logger.info(
-                            f"Webhook: Payment confirmed for order {order.pk}"
-                        )
-                except Payment.DoesNotExist:
-                    logger.warning(
-                        f"Webhook: No payment found for razorpay order {rz_order_id}"
-                    )
-
-        elif event == "payment.failed":
-            payment_entity = payload.get("payment", {}).get("entity", {})
-            rz_order_id = payment_entity.get("order_id")
-
-            if rz_order_id:
-                try:
-                    payment = Payment.objects.get(razorpay_order_id=rz_order_id)
-                    payment.status = Payment.Status.FAILED
-                    payment.save(update_fields=["status"])
-                    logger.info(
-                        f"Webhook: Payment failed for razorpay order {rz_order_id}"
-                    )
-                except Payment.DoesNotExist:
-                    pass
+        # Append to the inbox and acknowledge; process_webhooks applies it
+        webhooks.record_event(
+            webhook_body,
+            request.data,
+            event_id=request.META.get("HTTP_X_RAZORPAY_EVENT_ID", ""),
+        )
 
         return Response({"status": "ok"})
 
@@ -620,77 +549,20 @@ class CartPricingPreviewView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        # ── Get cart ──
-        try:
-            cart = Cart.objects.prefetch_related(
-                "items__product", "items__variant"
-            ).get(user=request.user)
-        except Cart.DoesNotExist:
-            return Response(
-                {"error": "Cart is empty."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        cart_items = cart.items.all()
-        if not cart_items.exists():
-            return Response(
-                {"error": "Cart is empty."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
         serializer = CartPreviewSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
 
-        # ── Calculate subtotal ──
-        subtotal = sum(item.line_total for item in cart_items)
-
-        # ── Discount ──
-        discount_amount = Decimal("0.00")
-        discount_code = data.get("discount_code", "").strip()
-        if discount_code:
-            try:
-                discount_obj = Discount.objects.get(code__iexact=discount_code)
-                if not discount_obj.is_valid:
-                    return Response(
-                        {"error": "Discount code is expired or invalid."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-                discount_amount = discount_obj.calculate_discount(subtotal)
-            except Discount.DoesNotExist:
-                return Response(
-                    {"error": "Invalid discount code."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-        # ── GST & Shipping (exact same logic as CheckoutView) ──
-        taxable_amount = subtotal - discount_amount
-        gst_amount = taxable_amount * Decimal("0.18")
-        shipping_fee = Decimal("50.00") if taxable_amount < 499 else Decimal("0.00")
-        total_amount = taxable_amount + gst_amount + shipping_fee
-
-        # ── Build per-item breakdown ──
-        items_data = []
-        for item in cart_items:
-            unit_price = item.line_total / item.quantity if item.quantity else 0
-            items_data.append({
-                "product_name": item.product.name,
-                "quantity_ml": item.variant.quantity_ml,
-                "selected_origin": item.selected_origin,
-                "quantity": item.quantity,
-                "unit_price": float(unit_price),
-                "line_total": float(item.line_total),
-            })
+        # ── Same quote CheckoutView places the order with ──
+        try:
+            quote = cart_quote(request, data.get("discount_code", ""))
+        except PricingError as exc:
+            return Response(
+                {"error": exc.message},
+                status=exc.status_code,
+            )
 
-        return Response({
-            "subtotal": float(subtotal),
-            "discount_amount": float(discount_amount),
-            "gst_amount": float(gst_amount),
-            "shipping_fee": float(shipping_fee),
-            "total_amount": float(total_amount),
-            "free_shipping_threshold": 499,
-            "items": items_data,
-        })
+        return Response(quote.as_preview())
 
 
 class BuyNowPricingPreviewView(APIView):
@@ -717,13 +589,8 @@ class BuyNowPricingPreviewView(APIView):
         data = serializer.validated_data
 
         # ── Get variant ──
-        from products.models import ProductVariant
-
-        try:
-            variant = ProductVariant.objects.select_related("product").get(
-                pk=data["variant_id"]
-            )
-        except ProductVariant.DoesNotExist:
+        variant = load_variants([data["variant_id"]]).get(data["variant_id"])
+        if variant is None:
             return Response(
                 {"error": "Product variant not found."},
                 status=status.HTTP_404_NOT_FOUND,
@@ -740,58 +607,56 @@ class BuyNowPricingPreviewView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        available_stock = (
-            variant.switzerland_stock if origin == "switzerland" else variant.india_stock
-        )
-        if quantity > available_stock and variant.oversell != 'continue':
+        in_stock = available_stock(variant, origin)
+        if quantity > in_stock and variant.oversell != 'continue':
             return Response(
                 {"error": f"{product.name} ({variant.quantity_ml}ml - {origin}): "
-                          f"only {available_stock} in stock (requested {quantity})"},
+                          f"only {in_stock} in stock (requested {quantity})"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # ── Calculate totals (exact same logic as BuyNowView) ──
-        price = variant.switzerland_effective_price if origin == "switzerland" else variant.india_effective_price
-        subtotal = price * quantity
+        # ── Calculate totals (same code path as BuyNowView) ──
+        try:
+            quote = build_quote(
+                [QuoteLine(variant, origin, quantity)],
+                resolve_discount(data.get("discount_code", "")),
+            )
+        except PricingError as exc:
+            return Response(
+                {"error": exc.message},
+                status=exc.status_code,
+            )
+
+        return Response(quote.as_preview())
 
-        discount_amount = Decimal("0.00")
-        discount_code = data.get("discount_code", "").strip()
-        if discount_code:
-            try:
-                discount_obj = Discount.objects.get(code__iexact=discount_code)
-                if not discount_obj.is_valid:
-                    return Response(
-                        {"error": "Discount code is expired or invalid."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-                discount_amount = discount_obj.calculate_discount(subtotal)
-            except Discount.DoesNotExist:
-                return Response(
-                    {"error": "Invalid discount code."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
 
-        taxable_amount = subtotal - discount_amount
-        gst_amount = taxable_amount * Decimal("0.18")
-        shipping_fee = Decimal("50.00") if taxable_amount < 499 else Decimal("0.00")
-        total_amount = taxable_amount + gst_amount + shipping_fee
+class QuoteView(APIView):
+    """
+    POST /api/orders/quote/
 
-        return Response({
-            "subtotal": float(subtotal),
-            "discount_amount": float(discount_amount),
-            "gst_amount": float(gst_amount),
-            "shipping_fee": float(shipping_fee),
-            "total_amount": float(total_amount),
-            "free_shipping_threshold": 499,
-            "items": [{
-                "product_name": product.name,
-                "quantity_ml": variant.quantity_ml,
-                "selected_origin": origin,
-                "quantity": quantity,
-                "unit_price": float(price),
-                "line_total": float(subtotal),
-            }],
-        })
+    Prices up to 50 hypothetical baskets in one request (one variant query
+    and one discount query in total). Nothing is reserved or created.
+
+    Body:
+        {
+            "baskets": [
+                {
+                    "items": [{"variant_id": 47, "quantity": 2, "selected_origin": "india"}],
+                    "discount_code": "SAVE10"      // optional
+                }
+            ]
+        }
+
+    Response: {"quotes": [...]} — one preview breakdown (same shape as
+    /orders/buynow-preview/) or {"error": "..."} per basket, in order.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = QuoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({"quotes": quote_baskets(serializer.validated_data["baskets"])})
 
 
 class OrderListView(generics.ListAPIView):
@@ -799,12 +664,10 @@ class OrderListView(generics.ListAPIView):
 
     serializer_class = OrderListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
-        return (
-            Order.objects.filter(user=self.request.user)
-            .prefetch_related("items__product__images", "items__variant", "payment")
-        )
+        return order_list_queryset(Order.objects.filter(user=self.request.user))
 
 
 class OrderDetailView(generics.RetrieveAPIView):
@@ -814,7 +677,7 @@ class OrderDetailView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        qs = Order.objects.prefetch_related("items__product__images", "items__variant", "payment")
+        qs = Order.objects.select_related("user", "payment").prefetch_related("items")
         if self.request.user.is_admin:
             return qs
         return qs.filter(user=self.request.user)
@@ -826,21 +689,80 @@ class OrderDetailView(generics.RetrieveAPIView):
 
 
 class AdminOrderListView(generics.ListAPIView):
-    """GET /api/admin/orders/ — All orders for admin."""
+    """
+    GET /api/admin/orders/ — All orders for admin.
+
+    Rows leave out the line items; pass ?expand=items to include them.
+    """
 
-    serializer_class = OrderListSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
+    pagination_class = CreatedAtCursorPagination
+
+    def expand_items(self):
+        return "items" in self.request.query_params.get("expand", "").split(",")
+
+    def get_serializer_class(self):
+        return OrderListSerializer if self.expand_items() else AdminOrderListSerializer
 
     def get_queryset(self):
-        queryset = Order.objects.prefetch_related(
-            "items__product__images", "items__variant", "payment"
-        )
+        queryset = order_list_queryset(Order.objects.all(), items=self.expand_items())
         status_filter = self.request.query_params.get("status")
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         return queryset
 
 
+class AdminOrderExportView(APIView):
+    """
+    GET /api/admin/orders/export/ — Stream orders with items and payments.
+
+    Query params:
+        output      csv (default, one row per item) or ndjson (one order per line)
+        status      e.g. delivered, or a comma-separated list
+        start_date  YYYY-MM-DD, inclusive
+        end_date    YYYY-MM-DD, inclusive
+
+    Memory use is constant: orders are read in keyset pages over
+    (created_at, pk) and written out as they are read (see orders/export.py).
+    """
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    FORMATS = {
+        "csv": (export.csv_rows, "text/csv"),
+        "ndjson": (export.ndjson_rows, "application/x-ndjson"),
+    }
+
+    def get(self, request):
+        params = request.query_params
+        output = params.get("output", "csv")
+        if output not in self.FORMATS:
+            return Response(
+                {"error": "output must be 'csv' or 'ndjson'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = Order.objects.all()
+        if params.get("status"):
+            queryset = queryset.filter(status__in=params["status"].split(","))
+        try:
+            if params.get("start_date"):
+                queryset = queryset.filter(created_at__gte=export.parse_day(params["start_date"]))
+            if params.get("end_date"):
+                queryset = queryset.filter(created_at__lt=export.parse_day(params["end_date"], end=True))
+        except ValueError:
+            return Response(
+                {"error": "Dates must be in YYYY-MM-DD format."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        rows, content_type = self.FORMATS[output]
+        response = StreamingHttpResponse(rows(queryset), content_type=content_type)
+        stamp = timezone.localdate().isoformat()
+        response["Content-Disposition"] = f'attachment; filename="orders-{stamp}.{output}"'
+        return response
+
+
 class AdminOrderStatusView(APIView):
     """PUT /api/admin/orders/{id}/status/ — Update order status."""
 
@@ -858,6 +780,7 @@ class AdminOrderStatusView(APIView):
         serializer = OrderStatusUpdateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
+        previous_status = order.status
         order.status = serializer.validated_data["status"]
         if serializer.validated_data.get("tracking_id"):
             order.tracking_id = serializer.validated_data["tracking_id"]
@@ -865,56 +788,39 @@ class AdminOrderStatusView(APIView):
             order.notes = serializer.validated_data["notes"]
         order.save()
 
-        # If order is confirmed/shipped, mark payment as completed
-        if order.status in [Order.Status.CONFIRMED, Order.Status.SHIPPED]:
-            try:
-                payment = order.payment
-                if payment.status == Payment.Status.PENDING:
-                    payment.status = Payment.Status.COMPLETED
-                    payment.paid_at = timezone.now()
-                    payment.save()
-            except Payment.DoesNotExist:
-                pass
-
-        # If order is cancelled, initiate refund for completed online payments
-        elif order.status == Order.Status.CANCELLED:
-            try:
-                payment = order.payment
-                if (
-                    payment.method != Payment.Method.COD
-                    and payment.status == Payment.Status.COMPLETED
-                    and payment.razorpay_payment_id
-                ):
-                    if razorpay_client:
-                        try:
-                            # Initiate full refund via Razorpay API
-                            razorpay_client.refund.create({
-                                "payment_id": payment.razorpay_payment_id,
-                                "notes": {
-                                    "order_id": str(order.order_number),
-                                    "reason": "Admin cancelled the order."
-                                }
-                            })
-                            payment.status = Payment.Status.REFUNDED
-                            payment.save()
-                            logger.info(f"Refund initiated for Order {order.pk} (Payment {payment.razorpay_payment_id})")
-                        except Exception as e:
-                            logger.error(f"Razorpay refund failed for Order {order.pk}: {e}")
-                            # We still save the order status as cancelled, 
-                            # but admin might need to retry the refund manually if Razorpay errors out.
-                    else:
-                        logger.error("Razorpay client not configured; cannot process refund.")
-                elif payment.status == Payment.Status.PENDING:
-                    # If it was pending (e.g., COD or incomplete online), just mark it failed/cancelled
-                    payment.status = Payment.Status.FAILED
-                    payment.save()
-
-            except Payment.DoesNotExist:
-                pass
-
+        apply_status_change(order, previous_status)
         return Response(OrderSerializer(order).data)
 
 
+class AdminWebhookDeadLetterView(generics.ListAPIView):
+    """GET /api/admin/webhooks/dead-letter/ — Webhook events that kept failing."""
+
+    serializer_class = WebhookEventSerializer
+    permission_classes = [IsAuthenticated, IsAdmin]
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        return WebhookEvent.objects.filter(status=WebhookEvent.Status.DEAD).order_by("-created_at")
+
+
+class AdminWebhookRetryView(APIView):
+    """POST /api/admin/webhooks/{id}/retry/ — Requeue a dead-letter event."""
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def post(self, request, pk):
+        try:
+            event = WebhookEvent.objects.get(pk=pk, status=WebhookEvent.Status.DEAD)
+        except WebhookEvent.DoesNotExist:
+            return Response(
+                {"error": "Dead-letter event not found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        webhooks.requeue(event)
+        event.refresh_from_db()
+        return Response(WebhookEventSerializer(event).data)
+
+
 class PaymentUpdateView(APIView):
     """POST /api/orders/{order_id}/payment/ — Record/update payment info."""
 
@@ -945,3 +851,4 @@ class PaymentUpdateView(APIView):
         payment.save()
 
         return Response(OrderSerializer(order).data)
+
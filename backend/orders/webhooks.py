@@ -0,0 +1,156 @@
+"""
+Razorpay webhook inbox processing.
+
+RazorpayWebhookView verifies the signature, appends the event to
+WebhookEvent (deduplicated on the event id) and acknowledges at once, so
+webhook latency does not depend on order processing. process_events()
+(run by `manage.py process_webhooks`) applies pending events in batches:
+
+- events for one Razorpay order are applied oldest first, under a lock on
+  its Payment row, so workers never apply them out of order or twice;
+- payment.captured is terminal: a late payment.failed never undoes it;
+- a failing event is retried with backoff, and later events for the same
+  order wait behind it; after MAX_ATTEMPTS it moves to the dead letter
+  (GET /api/admin/webhooks/dead-letter/) and the rest of the order's
+  events continue.
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, Payment, WebhookEvent
+from .stock import settle_holds
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE = timedelta(seconds=30)  # backoff: 30s, 60s, 120s, ...
+MAX_ATTEMPTS = 6
+
+
+class PaymentNotFound(Exception):
+    pass
+
+
+def record_event(body, data, event_id=""):
+    """Append a verified webhook to the inbox; returns False for a duplicate delivery."""
+    entity = (data.get("payload") or {}).get("payment", {}).get("entity", {})
+    created = data.get("created_at")
+    _, created_new = WebhookEvent.objects.get_or_create(
+        event_id=event_id or hashlib.sha256(body).hexdigest(),
+        defaults={
+            "event": str(data.get("event", ""))[:50],
+            "razorpay_order_id": entity.get("order_id") or "",
+            "payload": data,
+            "event_created_at": (
+                datetime.fromtimestamp(created, tz=dt_timezone.utc)
+                if isinstance(created, (int, float)) else None
+            ),
+        },
+    )
+    return created_new
+
+
+def apply_event(event):
+    """Apply one event to its Payment/Order; raises to have it retried."""
+    if event.event not in ("payment.captured", "payment.failed") or not event.razorpay_order_id:
+        return  # nothing to apply
+
+    entity = event.payload.get("payload", {}).get("payment", {}).get("entity", {})
+    payment = Payment.objects.select_related("order").filter(
+        razorpay_order_id=event.razorpay_order_id,
+    ).first()
+    if payment is None:
+        raise PaymentNotFound(f"No payment found for razorpay order {event.razorpay_order_id}")
+
+    if payment.status == Payment.Status.COMPLETED:
+        return  # duplicate capture, or a failure reported after the capture
+
+    if event.event == "payment.failed":
+        payment.status = Payment.Status.FAILED
+        payment.save(update_fields=["status"])
+        logger.info(f"Webhook: Payment failed for razorpay order {event.razorpay_order_id}")
+        return
+
+    payment.razorpay_payment_id = entity.get("id")
+    payment.transaction_id = entity.get("id")
+    payment.status = Payment.Status.COMPLETED
+    payment.paid_at = timezone.now()
+    payment.save()
+
+    # Confirm the order and deduct its held stock
+    order = payment.order
+    if order.status == Order.Status.PENDING:
+        order.status = Order.Status.CONFIRMED
+        order.save(update_fields=["status", "updated_at"])
+        settle_holds(order)
+    elif order.status == Order.Status.CANCELLED:
+        logger.warning(
+            f"Webhook: Payment {payment.razorpay_payment_id} captured after order "
+            f"{order.pk} was cancelled (stock hold expired); refund required"
+        )
+    logger.info(f"Webhook: Payment confirmed for order {order.pk}")
+
+
+def _process_group(razorpay_order_id, now):
+    """Apply the due events of one Razorpay order, oldest first. Returns (applied, dead)."""
+    applied = dead = 0
+    with transaction.atomic():
+        # Serializes workers per payment; the events are re-read under the lock
+        list(Payment.objects.select_for_update().filter(razorpay_order_id=razorpay_order_id))
+        events = (
+            WebhookEvent.objects.filter(razorpay_order_id=razorpay_order_id, status=WebhookEvent.Status.PENDING)
+            .order_by("event_created_at", "id")
+        )
+        for event in events:
+            if event.next_attempt_at > now:
+                break  # backing off; later events wait behind it
+            try:
+                with transaction.atomic():
+                    apply_event(event)
+            except Exception as e:
+                event.attempts += 1
+                event.last_error = str(e)[:1000]
+                if event.attempts < MAX_ATTEMPTS:
+                    event.next_attempt_at = now + RETRY_BASE * 2 ** (event.attempts - 1)
+                    event.save(update_fields=["attempts", "last_error", "next_attempt_at"])
+                    break
+                logger.error(f"Webhook event {event.event_id} moved to dead letter: {e}")
+                event.status = WebhookEvent.Status.DEAD
+                event.save(update_fields=["attempts", "last_error", "status"])
+                dead += 1
+                continue
+            event.status = WebhookEvent.Status.PROCESSED
+            event.processed_at = timezone.now()
+            event.save(update_fields=["status", "processed_at"])
+            applied += 1
+    return applied, dead
+
+
+def process_events(batch_size=200):
+    """Apply due pending events for up to `batch_size` Razorpay orders. Returns (applied, dead)."""
+    now = timezone.now()
+    order_ids = list(
+        WebhookEvent.objects.filter(status=WebhookEvent.Status.PENDING, next_attempt_at__lte=now)
+        .order_by("razorpay_order_id")
+        .values_list("razorpay_order_id", flat=True)
+        .distinct()[:batch_size]
+    )
+    applied = dead = 0
+    for razorpay_order_id in order_ids:
+        group_applied, group_dead = _process_group(razorpay_order_id, now)
+        applied += group_applied
+        dead += group_dead
+    return applied, dead
+
+
+def requeue(event):
+    """Send a dead-letter event back to the inbox for another round of attempts."""
+    WebhookEvent.objects.filter(pk=event.pk).update(
+        status=WebhookEvent.Status.PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+    )
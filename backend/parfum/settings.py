@@ -9,6 +9,7 @@ from datetime import timedelta
 from pathlib import Path
 
 import dj_database_url
+from corsheaders.defaults import default_headers
 from decouple import Csv, config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -117,6 +118,41 @@ DATABASES = {
     )
 }
 
+# =============================================================================
+# CACHES — "catalog" holds pre-rendered public catalog responses.
+# CATALOG_CACHE_BACKEND: locmem (per process), file, or db
+# (db needs `python manage.py createcachetable`).
+# =============================================================================
+CATALOG_CACHE_BACKEND = config("CATALOG_CACHE_BACKEND", default="locmem")
+CATALOG_CACHE_TIMEOUT = config("CATALOG_CACHE_TIMEOUT", default=60 * 60, cast=int)
+
+_CATALOG_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "parfum-catalog",
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": config("CATALOG_CACHE_DIR", default=str(BASE_DIR / "cache" / "catalog")),
+    },
+    "db": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "catalog_cache",
+    },
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "parfum-default",
+    },
+    "catalog": {
+        **_CATALOG_CACHE_BACKENDS[CATALOG_CACHE_BACKEND],
+        "TIMEOUT": CATALOG_CACHE_TIMEOUT,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
 # =============================================================================
 # PASSWORD HASHING — Argon2 (OWASP recommended)
 # =============================================================================
@@ -199,6 +235,7 @@ else:
         "https://swissaroma.vercel.app",     # Vercel preview
     ]
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 
 # =============================================================================
 # CSRF — Trusted origins for Django admin (api.swissaromas.com/admin/)
@@ -252,6 +289,18 @@ MEDIA_ROOT = BASE_DIR / "media"
 RAZORPAY_KEY_ID = config("RAZORPAY_KEY_ID", default="")
 RAZORPAY_KEY_SECRET = config("RAZORPAY_KEY_SECRET", default="")
 
+# Minutes an unpaid online order holds its stock before
+# `manage.py release_stock_holds` cancels it
+STOCK_HOLD_MINUTES = config("STOCK_HOLD_MINUTES", default=15, cast=int)
+
+# Hours a checkout/verify Idempotency-Key replays its response before
+# `manage.py purge_idempotency_keys` deletes it
+IDEMPOTENCY_KEY_TTL_HOURS = config("IDEMPOTENCY_KEY_TTL_HOURS", default=24, cast=int)
+
+# Seconds a duplicate request waits for the first request with the same
+# Idempotency-Key to finish (then replays it) before answering 409
+IDEMPOTENCY_WAIT_SECONDS = config("IDEMPOTENCY_WAIT_SECONDS", default=10, cast=float)
+
 # =============================================================================
 # SECURITY HEADERS
 # =============================================================================
@@ -28,6 +28,7 @@ def api_root(request):
                 "profile": "/api/auth/profile/",
                 "change_password": "/api/auth/change-password/",
             },
+            "home": "/api/home/",
             "products": {
                 "list": "/api/products/",
                 "new_arrivals": "/api/products/new-arrivals/",
@@ -60,6 +61,7 @@ def api_root(request):
                 "buy_now": "/api/orders/buy-now/",
                 "cart_preview": "/api/orders/cart-preview/",
                 "buynow_preview": "/api/orders/buynow-preview/",
+                "quote": "/api/orders/quote/",
                 "list": "/api/orders/",
                 "detail": "/api/orders/{id}/",
             },
@@ -73,13 +75,18 @@ def api_root(request):
             "admin": {
                 "dashboard": "/api/admin/analytics/dashboard/",
                 "sales": "/api/admin/analytics/sales/",
+                "sales_cube": "/api/admin/analytics/cube/",
                 "products": "/api/admin/products/",
                 "categories": "/api/admin/categories/",
                 "collections": "/api/admin/collections/",
+                "catalog_cache": "/api/admin/catalog-cache/",
                 "orders": "/api/admin/orders/",
+                "orders_export": "/api/admin/orders/export/",
+                "webhook_dead_letter": "/api/admin/webhooks/dead-letter/",
                 "reviews": "/api/admin/reviews/",
                 "discounts": "/api/admin/discounts/",
                 "inventory_transfer": "/api/admin/inventory/transfer/",
+                "inventory_transfer_batch": "/api/admin/inventory/transfer/batch/",
                 "inventory_transfers": "/api/admin/inventory/transfers/",
             },
         },
@@ -31,6 +31,10 @@ class ProductAdmin(admin.ModelAdmin):
     inlines = [ProductVariantInline, ProductImageInline]
     list_editable = ["is_active", "is_roll_on"]
 
+    def save_model(self, request, obj, form, change):
+        # Listing summary and content version columns are kept by products.signals
+        obj.save(update_fields=Product.edit_fields() if change else None)
+
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -0,0 +1,199 @@
+"""
+Versioned response cache and conditional GET support for the public catalog.
+
+Responses are rendered once and stored in the "catalog" cache under
+`catalog:<version>:<scheme>://<host><path>?<sorted query>`; the scheme and
+host are part of the key because pagination links in the body are
+absolute. The version lives in the
+CatalogVersion row and is bumped (after commit) by the signals in
+products.signals whenever a product, variant, image, category, collection
+or tester box changes, so stale entries are simply never read again and
+age out via the cache timeout.
+
+The same versions drive HTTP validators: list endpoints send an ETag built
+from the catalog version, detail endpoints one built from the product's
+content_version, and both answer If-None-Match / If-Modified-Since with a
+304 before any serializer runs.
+"""
+
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from .models import CatalogVersion, Product
+
+CATALOG_VERSION_PK = 1
+HITS_KEY = "catalog:stats:hits"
+MISSES_KEY = "catalog:stats:misses"
+
+
+def catalog_cache():
+    return caches["catalog"]
+
+
+def get_catalog_state():
+    """Return (version, updated_at) of the catalog; (0, None) before the first write."""
+    state = (
+        CatalogVersion.objects.filter(pk=CATALOG_VERSION_PK)
+        .values_list("version", "updated_at")
+        .first()
+    )
+    return state or (0, None)
+
+
+def get_catalog_version():
+    return get_catalog_state()[0]
+
+
+def _bump():
+    updated = CatalogVersion.objects.filter(pk=CATALOG_VERSION_PK).update(
+        version=F("version") + 1, updated_at=timezone.now(),
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(pk=CATALOG_VERSION_PK, defaults={"version": 1})
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response once the current transaction commits."""
+    transaction.on_commit(_bump)
+
+
+def touch_products(condition):
+    """Bump content_version on every product matching `condition` (a Q object)."""
+    Product.objects.filter(condition).update(
+        content_version=F("content_version") + 1,
+        content_updated_at=timezone.now(),
+    )
+
+
+def record_cache_hit():
+    _incr(HITS_KEY)
+
+
+def record_cache_miss():
+    _incr(MISSES_KEY)
+
+
+def _incr(key):
+    cache = catalog_cache()
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def get_cache_stats():
+    cache = catalog_cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "backend": settings.CATALOG_CACHE_BACKEND,
+        "version": get_catalog_version(),
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+    }
+
+
+def reset_cache_stats():
+    catalog_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+def catalog_cache_key(request, version):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    return f"catalog:{version}:{request.scheme}://{request.get_host()}{request.path}?{query}"
+
+
+def not_modified_response(request, etag, last_modified):
+    """Return a 304 if the request's validators still match, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
+
+
+def cached_json_response(content, state):
+    response = HttpResponse(content, content_type="application/json")
+    response["X-Catalog-Cache"] = state
+    return response
+
+
+class CatalogCacheMixin:
+    """
+    For public ListAPIViews: answer conditional GETs from the catalog version,
+    then serve the pre-rendered JSON for that version, or render, store and
+    return it on a miss.
+    """
+
+    def list(self, request, *args, **kwargs):
+        version, modified = get_catalog_state()
+        key = catalog_cache_key(request, version)
+        etag = quote_etag(f"catalog-{version}-{hashlib.md5(key.encode()).hexdigest()[:16]}")
+
+        not_modified = not_modified_response(request, etag, modified)
+        if not_modified is not None:
+            return not_modified
+
+        cache = catalog_cache()
+        content = cache.get(key)
+        if content is not None:
+            record_cache_hit()
+            return set_validators(self._cached_response(content, "HIT"), etag, modified)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        content = JSONRenderer().render(response.data)
+        cache.set(key, content)
+        record_cache_miss()
+        return set_validators(self._cached_response(content, "MISS"), etag, modified)
+
+    def _cached_response(self, content, state):
+        return cached_json_response(content, state)
+
+
+class ProductConditionalRetrieveMixin:
+    """
+    For product RetrieveAPIViews: look up only the product's content version
+    and return 304 when the client's ETag / Last-Modified is still current.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        state = (
+            self.get_queryset()
+            .prefetch_related(None)
+            .filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+            .values_list("pk", "content_version", "content_updated_at")
+            .first()
+        )
+        if state is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        pk, content_version, modified = state
+        etag = quote_etag(f"product-{pk}-{content_version}")
+        not_modified = not_modified_response(request, etag, modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag, modified)
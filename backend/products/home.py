@@ -0,0 +1,140 @@
+"""
+Storefront home feed: every home-page rail built from one product query.
+
+The new-arrivals, top-10 (men / women / unisex) and top roll-on rails all
+come from a single fetch that ranks products with window functions, so the
+home page costs one product query instead of five separately prefetched ones.
+Each rail is cached on its own under the catalog version, and the combined
+payload is cached pre-rendered (see HomeFeedView).
+"""
+
+import json
+from datetime import timedelta
+
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from rest_framework.renderers import JSONRenderer
+
+from .cache import catalog_cache, record_cache_hit, record_cache_miss
+from .models import Collection, Product
+from .registry import category_blocks, with_product_count
+from .serializers import CollectionSerializer, ProductThumbnailSerializer
+
+NEW_ARRIVAL_DAYS = 30
+TOP_RAIL_SIZE = 10
+
+# rail name → category slug for the per-category top-10 rails
+TOP_CATEGORY_RAILS = {
+    "top_mens": "men",
+    "top_womens": "women",
+    "top_unisex": "unisex",
+}
+
+PRODUCT_RAILS = ["new_arrivals", *TOP_CATEGORY_RAILS, "top_roll_ons"]
+RAILS = [*PRODUCT_RAILS, "collections"]
+
+_TOP_ORDER = [F("avg_rating").desc(), F("created_at").desc()]
+
+
+def build_product_rails(version=None):
+    """Return {rail: serialized products} for every product rail in one query."""
+    cutoff = timezone.now() - timedelta(days=NEW_ARRIVAL_DAYS)
+    products = (
+        Product.objects.filter(is_active=True)
+        .select_related("category", "primary_image")
+        .annotate(
+            category_rank=Window(
+                RowNumber(),
+                partition_by=[F("is_roll_on"), F("category_id")],
+                order_by=_TOP_ORDER,
+            ),
+            roll_on_rank=Window(
+                RowNumber(),
+                partition_by=[F("is_roll_on")],
+                order_by=_TOP_ORDER,
+            ),
+        )
+        .filter(
+            Q(is_roll_on=False, created_at__gte=cutoff)
+            | Q(is_roll_on=False, category__slug__in=TOP_CATEGORY_RAILS.values(),
+                category_rank__lte=TOP_RAIL_SIZE)
+            | Q(is_roll_on=True, roll_on_rank__lte=TOP_RAIL_SIZE)
+        )
+    )
+
+    products = list(products)
+    rails = {name: [] for name in PRODUCT_RAILS}
+    slug_to_rail = {slug: name for name, slug in TOP_CATEGORY_RAILS.items()}
+    for product in products:
+        if product.is_roll_on:
+            rails["top_roll_ons"].append(product)
+            continue
+        if product.created_at >= cutoff:
+            rails["new_arrivals"].append(product)
+        rail = slug_to_rail.get(product.category.slug)
+        if rail and product.category_rank <= TOP_RAIL_SIZE:
+            rails[rail].append(product)
+
+    rails["new_arrivals"].sort(key=lambda p: p.created_at, reverse=True)
+    for name in [*TOP_CATEGORY_RAILS, "top_roll_ons"]:
+        rails[name].sort(key=lambda p: (p.avg_rating, p.created_at), reverse=True)
+
+    # One registry lookup for all five rails
+    blocks = category_blocks(version=version)
+    if any(product.category_id not in blocks for product in products):
+        blocks = category_blocks(refresh=True, version=version)
+    context = {"category_blocks": blocks}
+    return {
+        name: ProductThumbnailSerializer(items, many=True, context=context).data
+        for name, items in rails.items()
+    }
+
+
+def build_collections_rail():
+    collections = with_product_count(Collection.objects.filter(is_active=True))
+    return CollectionSerializer(collections, many=True).data
+
+
+def _rail_key(version, name):
+    return f"home:{version}:rail:{name}"
+
+
+def render_home_feed(version):
+    """
+    Return (content, cache_state) for the home payload at a catalog version.
+
+    The combined payload is served straight from cache when present;
+    otherwise cached rail fragments are reused, missing ones rebuilt
+    (all product rails share one query) and the result stitched together.
+    """
+    cache = catalog_cache()
+    payload_key = f"home:{version}:payload"
+    content = cache.get(payload_key)
+    if content is not None:
+        record_cache_hit()
+        return content, "HIT"
+
+    rail_keys = {name: _rail_key(version, name) for name in RAILS}
+    cached = cache.get_many(rail_keys.values())
+    fragments = {name: cached[key] for name, key in rail_keys.items() if key in cached}
+
+    built = {}
+    if any(name not in fragments for name in PRODUCT_RAILS):
+        built.update(build_product_rails(version))
+    if "collections" not in fragments:
+        built["collections"] = build_collections_rail()
+
+    renderer = JSONRenderer()
+    for name, data in built.items():
+        if name not in fragments:
+            fragments[name] = renderer.render(data)
+    cache.set_many({rail_keys[name]: fragments[name] for name in RAILS if rail_keys[name] not in cached})
+
+    content = b"{" + b",".join(
+        json.dumps(name).encode() + b":" + fragments[name] for name in RAILS
+    ) + b"}"
+    cache.set(payload_key, content)
+    record_cache_miss()
+    return content, "MISS"
@@ -0,0 +1,441 @@
+"""
+Bulk catalog import for `dumpdata`-style fixtures (see import_catalog).
+
+Records are streamed from the file one at a time, buffered per model and
+written in batches with bulk_create / bulk_update / upserts, in dependency
+order (categories and collections before products, products before
+variants, images and tester boxes). Nothing goes through Model.save(), so:
+
+- rows are matched on natural keys (slug, name, product + size, product +
+  image path) rather than fixture pks, and fixture pks are remapped; a
+  matched row only has the fields its record carries updated;
+- product slugs are resolved in memory against every slug already taken;
+- the 5ml placeholder variant ProductVariant.save() would add, listing
+  summaries, search tokens, tester box snapshots, content versions and the
+  catalog cache version are all brought up to date once, at the end;
+- stock columns written by a batch are recorded in the stock ledger
+  (reason "import") batch by batch.
+"""
+
+import codecs
+import json
+import time
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from analytics import ledger
+from analytics.models import InventoryTransfer
+
+from .cache import bump_catalog_version, touch_products
+from .models import Category, Collection, Product, ProductImage, ProductVariant, TesterBox
+from .search import index_products
+from .signals import variants_written
+from .summary import refresh_listing_summaries
+from .tester_boxes import TESTER_ML, refresh_tester_boxes
+
+CATEGORY = "products.category"
+COLLECTION = "products.collection"
+PRODUCT = "products.product"
+VARIANT = "products.productvariant"
+IMAGE = "products.productimage"
+TESTER_BOX = "products.testerbox"
+
+# Flush order: every model only references models listed before it
+IMPORT_ORDER = [CATEGORY, COLLECTION, PRODUCT, VARIANT, IMAGE, TESTER_BOX]
+
+PRODUCT_FIELDS = ["name", "inspired_by", "description", "avg_rating", "is_active", "is_roll_on", "category"]
+VARIANT_FIELDS = [
+    "india_price", "india_discount_price", "india_stock",
+    "switzerland_price", "switzerland_discount_price", "switzerland_stock",
+    "oversell",
+]
+
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+class CatalogImportError(Exception):
+    pass
+
+
+# ──────────────────────────────────────────────────
+# STREAMING READER
+# ──────────────────────────────────────────────────
+
+
+def detect_encoding(path):
+    """Guess a file's encoding from its BOM, or its NUL-byte layout without one."""
+    with open(path, "rb") as fh:
+        head = fh.read(4)
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    if len(head) >= 2 and head[0] and not head[1]:
+        return "utf-16-le"
+    if len(head) >= 2 and not head[0] and head[1]:
+        return "utf-16-be"
+    return "utf-8"
+
+
+def iter_records(path, encoding=None, chunk_size=1 << 16):
+    """
+    Yield the objects of a JSON array or JSON-lines file without loading it.
+    Top-level entries must be objects, which never decode from a truncated
+    chunk, so a failed decode simply means "read more".
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding=encoding or detect_encoding(path), newline="") as fh:
+        buffer, pos, eof = "", 0, False
+        while True:
+            # Skip whitespace and the array punctuation between records
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,[]":
+                pos += 1
+            if pos >= len(buffer) and eof:
+                return
+            try:
+                if pos >= len(buffer):
+                    raise ValueError
+                record, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise CatalogImportError(f"Malformed JSON near character {pos} of the current chunk")
+                chunk = fh.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            if not isinstance(record, dict):
+                raise CatalogImportError(f"Expected an object per record, got {type(record).__name__}")
+            pos = end
+            yield record
+
+
+# ──────────────────────────────────────────────────
+# IMPORTER
+# ──────────────────────────────────────────────────
+
+
+def _upsert_options(unique_fields, update_fields):
+    options = {"update_conflicts": True, "update_fields": update_fields}
+    # MySQL upserts on any unique key and rejects an explicit target
+    if connection.features.supports_update_conflicts_with_target:
+        options["unique_fields"] = unique_fields
+    return options
+
+
+class CatalogImporter:
+    """
+    Feed records with add(), then call finish(). `progress`, if given, is
+    called with a status line after every flushed batch.
+    """
+
+    def __init__(self, batch_size=1000, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.buffers = {label: [] for label in IMPORT_ORDER}
+        self.pk_map = {label: {} for label in IMPORT_ORDER}
+        self.counts = Counter()
+        self.product_ids = set()
+        self.sized_product_ids = set()
+        self.tester_box_ids = set()
+        self.pending_box_products = {}
+        self.taken_slugs = set(Product.objects.values_list("slug", flat=True))
+        self.started = time.monotonic()
+
+    @property
+    def total(self):
+        return sum(count for label, count in self.counts.items() if label in self.buffers)
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.total / elapsed if elapsed else 0.0
+
+    def add(self, record):
+        label = str(record.get("model", "")).lower()
+        if label not in self.buffers:
+            self.counts["skipped"] += 1
+            return
+        self.buffers[label].append(record)
+        if len(self.buffers[label]) >= self.batch_size:
+            self.flush(upto=label)
+
+    def flush(self, upto=None):
+        for label in IMPORT_ORDER:
+            records, self.buffers[label] = self.buffers[label], []
+            if records:
+                getattr(self, f"_import_{label.split('.')[1]}")(records)
+                self.counts[label] += len(records)
+                if self.progress:
+                    self.progress(f"{label}: {self.counts[label]} rows ({self.rate():,.0f} rows/s)")
+            if label == upto:
+                return
+
+    def finish(self):
+        """Flush what is left and rebuild everything the bulk writes bypassed."""
+        self.flush()
+        self._link(TesterBox.products.through, "testerbox_id", "product_id", {
+            box_id: [self._ref(PRODUCT, pk) for pk in product_pks]
+            for box_id, product_pks in self.pending_box_products.items()
+        })
+        self._add_tester_variants()
+
+        product_ids = list(self.product_ids)
+        refresh_listing_summaries(product_ids)
+        index_products(product_ids)
+        for start in range(0, len(product_ids), self.batch_size):
+            touch_products(Q(pk__in=product_ids[start:start + self.batch_size]))
+
+        box_ids = self.tester_box_ids | set(
+            TesterBox.products.through.objects.filter(product_id__in=product_ids)
+            .values_list("testerbox_id", flat=True)
+        )
+        refresh_tester_boxes(box_ids)
+        bump_catalog_version()
+        variants_written.send(sender=ProductVariant, product_ids=set(product_ids))
+        return self.counts
+
+    # -- Helpers --
+
+    def _ref(self, label, fixture_pk):
+        """Database pk for a fixture pk; pks not in the file are assumed to exist already."""
+        return self.pk_map[label].get(fixture_pk, fixture_pk)
+
+    def _unique_slug(self, name):
+        base = slugify(name) or "product"
+        slug, counter = base, 1
+        while slug in self.taken_slugs:
+            slug = f"{base}-{counter}"
+            counter += 1
+        return slug
+
+    @staticmethod
+    def _restore_created_at(model, objs, records):
+        """bulk_create stamps auto_now_add; put the fixture's timestamps back."""
+        stamped = []
+        for obj, record in zip(objs, records):
+            created_at = parse_datetime(record["fields"].get("created_at") or "")
+            if created_at:
+                obj.created_at = created_at
+                stamped.append(obj)
+        if stamped:
+            model.objects.bulk_update(stamped, ["created_at"])
+
+    def _field_values(self, model, fields, names):
+        """Coerce the fixture values of `names` present in `fields` to Python types."""
+        return {
+            name: model._meta.get_field(name).to_python(fields[name])
+            for name in names if name in fields
+        }
+
+    @staticmethod
+    def _update_present(model, rows, fields):
+        """
+        bulk_update matched (obj, record) rows, writing only the `fields` each
+        record carries, so a partial record leaves the others as they are.
+        """
+        groups = defaultdict(list)
+        for obj, record in rows:
+            groups[tuple(name for name in fields if name in record["fields"])].append(obj)
+        for present, objs in groups.items():
+            if present:
+                model.objects.bulk_update(objs, present)
+
+    def _import_named(self, model, label, records, fields):
+        """Categories, collections and tester boxes: match on slug, then on name."""
+        slugs = [r["fields"].get("slug") or slugify(r["fields"].get("name", "")) for r in records]
+        names = [r["fields"].get("name") for r in records]
+        matched = {}
+        for pk, slug, name in model.objects.filter(
+            Q(slug__in=slugs) | Q(name__in=names)
+        ).values_list("pk", "slug", "name"):
+            matched[("slug", slug)] = matched[("name", name)] = pk
+
+        # Last record wins when a slug repeats within the batch
+        rows = {}
+        for slug, record in zip(slugs, records):
+            obj = model(slug=slug, **self._field_values(model, record["fields"], fields))
+            obj.pk = matched.get(("slug", slug)) or matched.get(("name", obj.name))
+            rows[slug] = (obj, record)
+
+        self._update_present(model, [(obj, record) for obj, record in rows.values() if obj.pk], fields)
+        self._create_by_slug(model, [(obj, record) for obj, record in rows.values() if not obj.pk])
+
+        for slug, record in zip(slugs, records):
+            self.pk_map[label][record.get("pk")] = rows[slug][0].pk
+        return [obj.pk for obj, _ in rows.values()]
+
+    def _create_by_slug(self, model, rows):
+        """bulk_create (obj, record) pairs and read their pks back by slug."""
+        if not rows:
+            return
+        objs = [obj for obj, _ in rows]
+        model.objects.bulk_create(objs)
+        # Not every backend returns pks from bulk_create
+        pks = dict(model.objects.filter(slug__in=[obj.slug for obj in objs]).values_list("slug", "pk"))
+        for obj in objs:
+            obj.pk = pks[obj.slug]
+        self._restore_created_at(model, objs, [record for _, record in rows])
+
+    def _link(self, through, owner_field, target_field, links):
+        """Replace the m2m rows of every owner in `links` ({owner pk: [target pks]})."""
+        if not links:
+            return
+        through.objects.filter(**{f"{owner_field}__in": links}).delete()
+        through.objects.bulk_create(
+            [
+                through(**{owner_field: owner, target_field: target})
+                for owner, targets in links.items()
+                for target in set(targets)
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+
+    # -- Per-model batches --
+
+    def _import_category(self, records):
+        self._import_named(Category, CATEGORY, records, ["name", "description", "image"])
+
+    def _import_collection(self, records):
+        self._import_named(Collection, COLLECTION, records, ["name", "description", "image", "is_active"])
+
+    def _import_testerbox(self, records):
+        self._import_named(TesterBox, TESTER_BOX, records, ["name", "description", "is_active"])
+        for record in records:
+            box_id = self.pk_map[TESTER_BOX][record.get("pk")]
+            self.tester_box_ids.add(box_id)
+            if "products" in record["fields"]:
+                # Boxes may precede their products in a dumpdata file; link in finish()
+                self.pending_box_products[box_id] = record["fields"]["products"]
+
+    def _import_product(self, records):
+        """Match on slug; records without one match an existing product by name."""
+        given = [r["fields"]["slug"] for r in records if r["fields"].get("slug")]
+        nameless = [r["fields"]["name"] for r in records if not r["fields"].get("slug")]
+        existing = {}
+        slug_for_name = {}
+        for pk, slug, name in Product.objects.filter(
+            Q(slug__in=given) | Q(name__in=nameless)
+        ).order_by("-pk").values_list("pk", "slug", "name"):
+            existing[slug] = pk
+            slug_for_name[name] = slug  # the oldest product of a name wins
+        fields = [name for name in PRODUCT_FIELDS if name != "category"]
+
+        rows = {}
+        for record in records:
+            f = record["fields"]
+            slug = f.get("slug") or slug_for_name.get(f["name"]) or self._unique_slug(f["name"])
+            if not f.get("slug"):
+                slug_for_name[f["name"]] = slug
+            self.taken_slugs.add(slug)
+            obj = Product(slug=slug, **self._field_values(Product, f, fields))
+            if "category" in f:
+                obj.category_id = self._ref(CATEGORY, f["category"])
+            obj.pk = existing.get(slug)
+            rows[slug] = (obj, record)
+
+        self._update_present(Product, [(obj, record) for obj, record in rows.values() if obj.pk], PRODUCT_FIELDS)
+        self._create_by_slug(Product, [(obj, record) for obj, record in rows.values() if not obj.pk])
+
+        links = {}
+        for obj, record in rows.values():
+            self.pk_map[PRODUCT][record.get("pk")] = obj.pk
+            self.product_ids.add(obj.pk)
+            if "collections" in record["fields"]:
+                links[obj.pk] = [self._ref(COLLECTION, pk) for pk in record["fields"]["collections"]]
+        self._link(Product.collections.through, "product_id", "collection_id", links)
+
+    def _import_productvariant(self, records):
+        present = [name for name in VARIANT_FIELDS if any(name in r["fields"] for r in records)]
+        rows = {}
+        for record in records:
+            f = record["fields"]
+            obj = ProductVariant(
+                product_id=self._ref(PRODUCT, f["product"]),
+                quantity_ml=f["quantity_ml"],
+                **self._field_values(ProductVariant, f, present),
+            )
+            rows[(obj.product_id, obj.quantity_ml)] = obj
+            self.product_ids.add(obj.product_id)
+            if obj.quantity_ml != TESTER_ML:
+                self.sized_product_ids.add(obj.product_id)
+        stocked = [origin for origin in ledger.ORIGINS if ledger.stock_field(origin) in present]
+        before = self._variant_stock(rows) if stocked else {}
+        ProductVariant.objects.bulk_create(
+            list(rows.values()),
+            **_upsert_options(["product", "quantity_ml"], present),
+        )
+        if stocked:
+            self._record_stock(rows, before, stocked)
+
+    @staticmethod
+    def _variant_stock(rows):
+        """{(product_id, quantity_ml): (pk, india_stock, switzerland_stock)} of the rows that exist."""
+        found = ProductVariant.objects.filter(
+            product_id__in={product_id for product_id, _ in rows},
+            quantity_ml__in={quantity_ml for _, quantity_ml in rows},
+        ).values_list("product_id", "quantity_ml", "pk", "india_stock", "switzerland_stock")
+        return {(product_id, ml): rest for product_id, ml, *rest in found if (product_id, ml) in rows}
+
+    def _record_stock(self, rows, before, stocked):
+        """Ledger rows for the stock an upsert batch set, against what was there before."""
+        after = self._variant_stock(rows)
+        entries = []
+        for key, obj in rows.items():
+            obj.pk = after[key][0]
+            old = dict(zip(ledger.ORIGINS, before.get(key, (None, 0, 0))[1:]))
+            for origin in stocked:
+                balance = getattr(obj, ledger.stock_field(origin))
+                entries.append(ledger.entry(obj, origin, balance - old[origin], balance, InventoryTransfer.Reason.IMPORT))
+        ledger.post(entries)
+
+    def _import_productimage(self, records):
+        product_ids = {self._ref(PRODUCT, r["fields"]["product"]) for r in records}
+        existing = {
+            (product_id, image): pk
+            for product_id, image, pk in ProductImage.objects.filter(
+                product_id__in=product_ids
+            ).values_list("product_id", "image", "pk")
+        }
+
+        rows = {}
+        for record in records:
+            f = record["fields"]
+            obj = ProductImage(
+                product_id=self._ref(PRODUCT, f["product"]),
+                **self._field_values(ProductImage, f, ["image", "alt_text", "sort_order"]),
+            )
+            obj.pk = existing.get((obj.product_id, obj.image.name))
+            rows[(obj.product_id, obj.image.name)] = obj
+            self.product_ids.add(obj.product_id)
+
+        updated = [obj for obj in rows.values() if obj.pk]
+        if updated:
+            ProductImage.objects.bulk_update(updated, ["alt_text", "sort_order"])
+        ProductImage.objects.bulk_create([obj for obj in rows.values() if not obj.pk])
+
+    def _add_tester_variants(self):
+        """The empty 5ml variant ProductVariant.save() would have created."""
+        sized = list(self.sized_product_ids)
+        for start in range(0, len(sized), self.batch_size):
+            chunk = sized[start:start + self.batch_size]
+            have = set(
+                ProductVariant.objects.filter(product_id__in=chunk, quantity_ml=TESTER_ML)
+                .values_list("product_id", flat=True)
+            )
+            ProductVariant.objects.bulk_create([
+                ProductVariant(
+                    product_id=product_id, quantity_ml=TESTER_ML,
+                    india_price=Decimal("0.00"), switzerland_price=Decimal("0.00"),
+                )
+                for product_id in chunk if product_id not in have
+            ])
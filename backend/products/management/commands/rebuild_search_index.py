@@ -0,0 +1,19 @@
+"""
+Rebuild the product search index from scratch.
+
+Usage: python manage.py rebuild_search_index
+"""
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Re-tokenize every product into the /api/search/ index"
+
+    def handle(self, *args, **options):
+        from products.models import Product
+        from products.search import index_products
+
+        product_ids = list(Product.objects.values_list("pk", flat=True))
+        indexed = index_products(product_ids)
+        self.stdout.write(self.style.SUCCESS(f"[OK] Indexed {indexed} products"))
@@ -0,0 +1,20 @@
+"""
+Rebuild the materialized product snapshot on every tester box.
+Run after deploys that change the tester box payload, or after bulk edits
+that bypass model signals.
+
+Usage: python manage.py rebuild_tester_boxes
+"""
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Rebuild TesterBox product snapshots (5ml products, stock, primary image)"
+
+    def handle(self, *args, **options):
+        from products.models import TesterBox
+        from products.tester_boxes import refresh_tester_boxes
+
+        updated = refresh_tester_boxes(TesterBox.objects.values_list("pk", flat=True))
+        self.stdout.write(self.style.SUCCESS(f"[OK] Rebuilt {updated} tester boxes"))
@@ -0,0 +1,20 @@
+"""
+Recompute the denormalized listing summary columns on every product.
+Run after bulk stock/price edits that bypass model signals.
+
+Usage: python manage.py refresh_listing_summaries
+"""
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Rebuild Product listing summaries (min prices, stock flags, primary image)"
+
+    def handle(self, *args, **options):
+        from products.models import Product
+        from products.summary import refresh_listing_summaries
+
+        product_ids = list(Product.objects.values_list("pk", flat=True))
+        updated = refresh_listing_summaries(product_ids)
+        self.stdout.write(self.style.SUCCESS(f"[OK] Refreshed {updated} product summaries"))
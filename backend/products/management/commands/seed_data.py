@@ -592,6 +592,7 @@ class Command(BaseCommand):
                         product=product,
                         variant=variant,
                         product_name=product.name,
+                        **OrderItem.product_snapshot(product),
                         quantity_ml=variant.quantity_ml,
                         selected_origin="india",
                         quantity=qty,
@@ -699,21 +700,9 @@ class Command(BaseCommand):
     # ANALYTICS
     # ------------------------------------------------------------------
     def _create_analytics(self):
-        from analytics.models import SalesAnalytics
+        from analytics.rollup import rollup_cube, rollup_sales
 
-        self.stdout.write("[ANALYTICS] Creating analytics data...")
-        today = timezone.now().date()
-
-        for i in range(30):
-            date = today - timedelta(days=i)
-            SalesAnalytics.objects.get_or_create(
-                date=date,
-                defaults={
-                    "total_orders": random.randint(5, 30),
-                    "total_revenue": Decimal(str(random.randint(15000, 120000))),
-                    "products_sold": random.randint(10, 80),
-                    "new_customers": random.randint(1, 10),
-                },
-            )
-
-        self.stdout.write("  Created 30 days of analytics")
+        self.stdout.write("[ANALYTICS] Rolling up daily sales from the seeded orders...")
+        days = rollup_sales(full=True)
+        rollup_cube(full=True)
+        self.stdout.write(f"  Created {days} days of analytics")
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.15 on 2026-10-18 01:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_listing_summary(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductVariant = apps.get_model("products", "ProductVariant")
+    ProductImage = apps.get_model("products", "ProductImage")
+
+    for product in Product.objects.all():
+        india_prices, swiss_prices = [], []
+        for v in ProductVariant.objects.filter(product=product):
+            product.variant_count += 1
+            product.has_india_stock |= v.india_stock > 0
+            product.has_switzerland_stock |= v.switzerland_stock > 0
+            if v.quantity_ml != 5:
+                india_prices.append(v.india_discount_price or v.india_price)
+                swiss_prices.append(v.switzerland_discount_price or v.switzerland_price)
+        product.india_min_price = min(india_prices, default=0)
+        product.switzerland_min_price = min(swiss_prices, default=0)
+        product.primary_image = (
+            ProductImage.objects.filter(product=product).order_by("sort_order", "id").first()
+        )
+        product.save(update_fields=[
+            "india_min_price", "switzerland_min_price", "has_india_stock",
+            "has_switzerland_stock", "variant_count", "primary_image",
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_alter_productvariant_india_price_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='has_india_stock',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='has_switzerland_stock',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='india_min_price',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, help_text='Lowest effective India price across non-5ml variants', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.productimage'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='switzerland_min_price',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, help_text='Lowest effective Switzerland price across non-5ml variants', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='variant_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_listing_summary, migrations.RunPython.noop),
+    ]
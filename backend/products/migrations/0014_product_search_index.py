@@ -0,0 +1,57 @@
+# Generated by Django 5.1.15 on 2026-10-18 01:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_search_index(apps, schema_editor):
+    from collections import Counter
+
+    from products.search import FIELD_WEIGHTS, tokenize
+
+    Product = apps.get_model("products", "Product")
+    ProductSearchToken = apps.get_model("products", "ProductSearchToken")
+
+    rows = []
+    for product in Product.objects.select_related("category").prefetch_related("collections"):
+        weights = Counter()
+        sources = {
+            "name": [product.name],
+            "inspired_by": [product.inspired_by],
+            "description": [product.description],
+            "category": [product.category.name],
+            "collections": [c.name for c in product.collections.all()],
+        }
+        for field, texts in sources.items():
+            for text in texts:
+                for token in tokenize(text):
+                    weights[token] += FIELD_WEIGHTS[field]
+        rows.extend(
+            ProductSearchToken(product_id=product.pk, token=token, weight=weight)
+            for token, weight in weights.items()
+        )
+    ProductSearchToken.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_product_listing_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'product'], name='products_pr_token_28f114_idx')],
+                'unique_together': {('product', 'token')},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
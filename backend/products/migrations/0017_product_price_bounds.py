@@ -0,0 +1,54 @@
+# Generated by Django 5.1.15 on 2026-10-18 01:48
+
+from django.db import migrations, models
+
+
+def backfill_max_prices(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductVariant = apps.get_model("products", "ProductVariant")
+
+    for product in Product.objects.all():
+        india_prices, swiss_prices = [], []
+        for v in ProductVariant.objects.filter(product=product).exclude(quantity_ml=5):
+            india_prices.append(v.india_discount_price or v.india_price)
+            swiss_prices.append(v.switzerland_discount_price or v.switzerland_price)
+        product.india_max_price = max(india_prices, default=0)
+        product.switzerland_max_price = max(swiss_prices, default=0)
+        product.save(update_fields=["india_max_price", "switzerland_max_price"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_product_content_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='india_max_price',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, help_text='Highest effective India price across non-5ml variants', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='switzerland_max_price',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, help_text='Highest effective Switzerland price across non-5ml variants', max_digits=10),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['india_min_price'], name='products_pr_india_m_62fd56_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['india_max_price'], name='products_pr_india_m_df89f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['switzerland_min_price'], name='products_pr_switzer_9a388a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['switzerland_max_price'], name='products_pr_switzer_ea9ea2_idx'),
+        ),
+        migrations.RunPython(backfill_max_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0017_product_price_bounds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testerbox',
+            name='products_snapshot',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -3,6 +3,7 @@ Product models: Category, Collection, Product, ProductVariant, ProductImage.
 """
 
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 
 
@@ -63,6 +64,8 @@ class TesterBox(models.Model):
         blank=True,
     )
     is_active = models.BooleanField(default=True)
+    # Rendered member products, maintained by products.tester_boxes
+    products_snapshot = models.JSONField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -111,6 +114,41 @@ class Product(models.Model):
         blank=True,
     )
 
+    # Listing summary — denormalized from variants/images by products.summary.
+    # Lets listings serialize without per-row variant/image queries.
+    india_min_price = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0.00, editable=False,
+        help_text="Lowest effective India price across non-5ml variants",
+    )
+    india_max_price = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0.00, editable=False,
+        help_text="Highest effective India price across non-5ml variants",
+    )
+    switzerland_min_price = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0.00, editable=False,
+        help_text="Lowest effective Switzerland price across non-5ml variants",
+    )
+    switzerland_max_price = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0.00, editable=False,
+        help_text="Highest effective Switzerland price across non-5ml variants",
+    )
+    has_india_stock = models.BooleanField(default=False, editable=False)
+    has_switzerland_stock = models.BooleanField(default=False, editable=False)
+    variant_count = models.PositiveIntegerField(default=0, editable=False)
+    primary_image = models.ForeignKey(
+        "ProductImage",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+    )
+
+    # Content version — bumped whenever anything in the detail payload changes
+    # (product, variants, images, category, collections); drives detail ETags.
+    content_version = models.PositiveBigIntegerField(default=1, editable=False)
+    content_updated_at = models.DateTimeField(default=timezone.now, editable=False)
+
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -120,6 +158,28 @@ class Product(models.Model):
         indexes = [
             models.Index(fields=["-created_at"]),
             models.Index(fields=["category", "is_active"]),
+            models.Index(fields=["india_min_price"]),
+            models.Index(fields=["india_max_price"]),
+            models.Index(fields=["switzerland_min_price"]),
+            models.Index(fields=["switzerland_max_price"]),
+        ]
+
+    # Maintained by products.signals via queryset updates. Edits save with
+    # update_fields=Product.edit_fields() so a (possibly stale) in-memory
+    # instance never writes them back.
+    DERIVED_FIELDS = {
+        "india_min_price", "india_max_price", "switzerland_min_price",
+        "switzerland_max_price", "has_india_stock",
+        "has_switzerland_stock", "variant_count", "primary_image",
+        "content_version", "content_updated_at",
+    }
+
+    @classmethod
+    def edit_fields(cls):
+        """update_fields for saving an edited product: everything but DERIVED_FIELDS."""
+        return [
+            f.name for f in cls._meta.concrete_fields
+            if not f.primary_key and f.name not in cls.DERIVED_FIELDS
         ]
 
     def save(self, *args, **kwargs):
@@ -139,16 +199,12 @@ class Product(models.Model):
     @property
     def starting_price(self):
         """Returns the lowest effective price across all non-5ml variants (for listings)."""
-        variant = self.variants.exclude(quantity_ml=5).order_by("india_price").first()
-        if variant:
-            return variant.india_effective_price
-        return 0.00
+        return self.india_min_price
 
     @property
     def in_stock(self):
         """True if any variant has stock."""
-        from django.db.models import Q
-        return self.variants.filter(Q(india_stock__gt=0) | Q(switzerland_stock__gt=0)).exists()
+        return self.has_india_stock or self.has_switzerland_stock
 
 
 class ProductVariant(models.Model):
@@ -264,3 +320,41 @@ class ProductImage(models.Model):
 
     def __str__(self):
         return f"Image for {self.product.name} (order: {self.sort_order})"
+
+
+class ProductSearchToken(models.Model):
+    """
+    Inverted index row for /api/search/: one token per product with its
+    accumulated field weight. Maintained by products.search.
+    """
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="search_tokens",
+    )
+    token = models.CharField(max_length=50)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ("product", "token")
+        indexes = [
+            models.Index(fields=["token", "product"]),
+        ]
+
+    def __str__(self):
+        return f"{self.token} → {self.product_id} ({self.weight})"
+
+
+class CatalogVersion(models.Model):
+    """
+    Single-row counter bumped after every committed catalog write.
+    Public catalog responses are cached under the current version
+    (see products.cache), so a bump invalidates all of them at once.
+    """
+
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Catalog v{self.version}"
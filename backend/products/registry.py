@@ -0,0 +1,75 @@
+"""
+Product counts and the in-process category registry.
+
+Category and collection payloads carry `product_count`. List endpoints
+annotate it onto their queryset (one query for the whole page) instead of
+running a COUNT per row.
+
+Every product payload also nests its category block. Those blocks are built
+for all categories at once, kept per process and keyed by the catalog
+version, so any catalog write (see products.cache) rebuilds them on next use
+and a listing never re-serializes the same category per row.
+"""
+
+import threading
+
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+
+from .cache import get_catalog_version
+from .models import Category, Collection, Product
+
+_lock = threading.Lock()
+_registry = {"version": None, "blocks": {}}
+
+# Product field pointing at each counted model
+_PRODUCT_RELATION = {Category: "category", Collection: "collections"}
+
+
+def with_product_count(queryset):
+    """
+    Annotate `product_count`, the number of active products, onto a
+    Category or Collection queryset.
+
+    A correlated subquery rather than Count("products"), so the count stays
+    right when the queryset is later filtered through products (prefetches).
+    """
+    relation = _PRODUCT_RELATION[queryset.model]
+    counts = (
+        Product.objects.filter(is_active=True, **{relation: OuterRef("pk")})
+        .order_by()
+        .values(relation)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return queryset.annotate(product_count=Coalesce(Subquery(counts), 0))
+
+
+def collections_with_count():
+    """Prefetch for Product.collections with product_count annotated."""
+    return Prefetch("collections", queryset=with_product_count(Collection.objects.all()))
+
+
+def build_category_blocks(category_ids=None):
+    """Serialize category blocks straight from the database (all, or just `category_ids`)."""
+    from .serializers import CategorySerializer
+
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(pk__in=category_ids)
+    categories = with_product_count(categories)
+    return {block["id"]: block for block in CategorySerializer(categories, many=True).data}
+
+
+def category_blocks(refresh=False, version=None):
+    """
+    Return {category_id: serialized category} for the current catalog
+    version; callers that have just read the version may pass it in.
+    """
+    if version is None:
+        version = get_catalog_version()
+    with _lock:
+        if refresh or _registry["version"] != version:
+            _registry["blocks"] = build_category_blocks()
+            _registry["version"] = version
+        return _registry["blocks"]
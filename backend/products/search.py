@@ -0,0 +1,144 @@
+"""
+Product search index: tokenization, incremental indexing and ranked lookup.
+
+Each product is broken into lowercase ASCII tokens drawn from its name,
+inspired_by, description, category and collection names. Tokens are stored
+in ProductSearchToken with a per-field weight so a query becomes an indexed
+prefix scan over the token column instead of an icontains table scan.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+
+from .models import Product, ProductSearchToken
+
+# Relevance weight per indexed field
+FIELD_WEIGHTS = {
+    "name": 10,
+    "inspired_by": 6,
+    "category": 4,
+    "collections": 3,
+    "description": 1,
+}
+
+# Exact token matches score higher than prefix matches
+EXACT_MATCH_BONUS = 2
+
+STOP_WORDS = {"a", "an", "and", "by", "for", "in", "of", "on", "or", "s", "the", "to", "with"}
+
+MAX_TOKEN_LENGTH = 50
+MAX_QUERY_TERMS = 8
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Split text into normalized, accent-free lowercase tokens."""
+    if not text:
+        return []
+    normalized = unicodedata.normalize("NFKD", str(text))
+    ascii_text = normalized.encode("ascii", "ignore").decode("ascii").lower()
+    return [
+        token[:MAX_TOKEN_LENGTH]
+        for token in _TOKEN_RE.findall(ascii_text)
+        if token not in STOP_WORDS
+    ]
+
+
+def product_token_weights(product):
+    """Return {token: weight} for a product with category and collections loaded."""
+    weights = Counter()
+    sources = {
+        "name": [product.name],
+        "inspired_by": [product.inspired_by],
+        "description": [product.description],
+        "category": [product.category.name if product.category_id else ""],
+        "collections": [c.name for c in product.collections.all()],
+    }
+    for field, texts in sources.items():
+        for text in texts:
+            for token in tokenize(text):
+                weights[token] += FIELD_WEIGHTS[field]
+    return weights
+
+
+def index_products(product_ids, batch_size=500):
+    """(Re)build the search tokens for the given products."""
+    product_ids = [pk for pk in set(product_ids) if pk is not None]
+    indexed = 0
+    for start in range(0, len(product_ids), batch_size):
+        chunk = product_ids[start:start + batch_size]
+        products = (
+            Product.objects.filter(pk__in=chunk)
+            .select_related("category")
+            .prefetch_related("collections")
+        )
+        rows = [
+            ProductSearchToken(product_id=product.pk, token=token, weight=weight)
+            for product in products
+            for token, weight in product_token_weights(product).items()
+        ]
+        with transaction.atomic():
+            ProductSearchToken.objects.filter(product_id__in=chunk).delete()
+            ProductSearchToken.objects.bulk_create(rows, batch_size=1000)
+        indexed += len(chunk)
+    return indexed
+
+
+def search_products(query, queryset=None):
+    """
+    Return `queryset` (default: all products) restricted to products matching
+    every query term, annotated with `relevance` and ordered best-first.
+    Terms match indexed tokens by prefix, so partial keystrokes still hit.
+    A query with no indexable terms (only stop words such as "by the", or
+    only non-Latin script) falls back to a name / inspired_by substring match.
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        query = query.strip()
+        if not query:
+            return queryset.none()
+        return (
+            queryset.filter(Q(name__icontains=query) | Q(inspired_by__icontains=query))
+            .annotate(relevance=Value(0, output_field=IntegerField()))
+            .order_by("-avg_rating", "-created_at")
+        )
+
+    any_term = Q()
+    for term in terms:
+        any_term |= Q(token__startswith=term)
+
+    per_term = {
+        f"t{i}": Max(Case(
+            When(token__startswith=term, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        for i, term in enumerate(terms)
+    }
+    matches = (
+        ProductSearchToken.objects.filter(any_term)
+        .values("product_id")
+        .annotate(
+            score=Sum(F("weight") * Case(
+                When(token__in=terms, then=Value(EXACT_MATCH_BONUS)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )),
+            **per_term,
+        )
+        .filter(**{name: 1 for name in per_term})
+    )
+    relevance = matches.filter(product_id=OuterRef("pk")).values("score")[:1]
+    return (
+        queryset.filter(pk__in=matches.values("product_id"))
+        .annotate(relevance=Subquery(relevance, output_field=IntegerField()))
+        .order_by("-relevance", "-avg_rating", "-created_at")
+    )
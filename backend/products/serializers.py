@@ -5,10 +5,19 @@ Product serializers with nested variants, images, categories, and collections.
 from rest_framework import serializers
 
 from .models import Category, Collection, Product, ProductImage, ProductVariant, TesterBox
+from .registry import category_blocks
 
 
-class CategorySerializer(serializers.ModelSerializer):
-    product_count = serializers.IntegerField(source="products.count", read_only=True)
+class ProductCountMixin:
+    """product_count from the view's annotation, falling back to a COUNT on single writes."""
+
+    def get_product_count(self, obj):
+        count = getattr(obj, "product_count", None)
+        return obj.products.filter(is_active=True).count() if count is None else count
+
+
+class CategorySerializer(ProductCountMixin, serializers.ModelSerializer):
+    product_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
@@ -16,8 +25,8 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ["slug"]
 
 
-class CollectionSerializer(serializers.ModelSerializer):
-    product_count = serializers.IntegerField(source="products.count", read_only=True)
+class CollectionSerializer(ProductCountMixin, serializers.ModelSerializer):
+    product_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Collection
@@ -28,6 +37,27 @@ class CollectionSerializer(serializers.ModelSerializer):
         read_only_fields = ["slug"]
 
 
+class CategoryBlockField(serializers.Field):
+    """Nested category block served from the in-process category registry."""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        kwargs.setdefault("source", "category_id")
+        super().__init__(**kwargs)
+
+    def to_representation(self, category_id):
+        if "category_blocks" in self.context:
+            return self.context["category_blocks"].get(category_id)
+        blocks = getattr(self, "_blocks", None)
+        if blocks is None:
+            blocks = self._blocks = category_blocks()
+        if category_id not in blocks and not getattr(self, "_refreshed", False):
+            # A category newer than the registry: rebuild once
+            blocks = self._blocks = category_blocks(refresh=True)
+            self._refreshed = True
+        return blocks.get(category_id)
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
@@ -77,7 +107,7 @@ class TesterBoxVariantSerializer(serializers.ModelSerializer):
 class ProductListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for product listings."""
 
-    category = CategorySerializer(read_only=True)
+    category = CategoryBlockField()
     primary_image = serializers.SerializerMethodField()
     variants = serializers.SerializerMethodField()
     starting_price = serializers.ReadOnlyField()
@@ -92,10 +122,9 @@ class ProductListSerializer(serializers.ModelSerializer):
         ]
 
     def get_primary_image(self, obj):
-        """Returns the first image by sort_order as the main image."""
-        first_image = obj.images.first()  # already ordered by sort_order
-        if first_image:
-            return ProductImageSerializer(first_image).data
+        """Returns the denormalized primary image (lowest sort_order)."""
+        if obj.primary_image_id:
+            return ProductImageSerializer(obj.primary_image).data
         return None
 
     def get_variants(self, obj):
@@ -107,7 +136,7 @@ class ProductListSerializer(serializers.ModelSerializer):
 class ProductThumbnailSerializer(serializers.ModelSerializer):
     """Ultra-lightweight serializer for product thumbnails (Home, Top 10, etc.)."""
 
-    category = CategorySerializer(read_only=True)
+    category = CategoryBlockField()
     primary_image = serializers.SerializerMethodField()
     starting_price = serializers.ReadOnlyField()
 
@@ -119,16 +148,15 @@ class ProductThumbnailSerializer(serializers.ModelSerializer):
         ]
 
     def get_primary_image(self, obj):
-        """Returns the first image by sort_order as the main image."""
-        first_image = obj.images.first()
-        if first_image:
-            return ProductImageSerializer(first_image).data
+        """Returns the denormalized primary image (lowest sort_order)."""
+        if obj.primary_image_id:
+            return ProductImageSerializer(obj.primary_image).data
         return None
 
 
 class TesterBoxItemSerializer(serializers.ModelSerializer):
     """Serialize the individual products inside a TesterBox."""
-    category = CategorySerializer(read_only=True)
+    category = CategoryBlockField()
     primary_image = serializers.SerializerMethodField()
     variants = serializers.SerializerMethodField()
     starting_price = serializers.ReadOnlyField()
@@ -143,9 +171,9 @@ class TesterBoxItemSerializer(serializers.ModelSerializer):
         ]
 
     def get_primary_image(self, obj):
-        first_image = obj.images.filter(sort_order=0).first()
-        if first_image:
-            return ProductImageSerializer(first_image).data
+        """Returns the denormalized primary image (lowest sort_order)."""
+        if obj.primary_image_id:
+            return ProductImageSerializer(obj.primary_image).data
         return None
 
     def get_variants(self, obj):
@@ -154,13 +182,17 @@ class TesterBoxItemSerializer(serializers.ModelSerializer):
 
 class TesterBoxSerializer(serializers.ModelSerializer):
     """Public read-only serializer for Tester Boxes and their 5ml products."""
-    products = TesterBoxItemSerializer(many=True, read_only=True)
+    products = serializers.SerializerMethodField()
 
     class Meta:
         model = TesterBox
         fields = ["id", "name", "slug", "description", "products", "created_at"]
         read_only_fields = ["slug", "created_at"]
 
+    def get_products(self, obj):
+        # Pre-rendered by products.tester_boxes
+        return obj.products_snapshot or []
+
 class AdminTesterBoxWriteSerializer(serializers.ModelSerializer):
     """Admin writes tester boxes with related product IDs."""
     product_ids = serializers.PrimaryKeyRelatedField(
@@ -191,7 +223,7 @@ class AdminTesterBoxWriteSerializer(serializers.ModelSerializer):
 class ProductDetailSerializer(serializers.ModelSerializer):
     """Full product detail with all images, variants, categories, collections."""
 
-    category = CategorySerializer(read_only=True)
+    category = CategoryBlockField()
     collections = CollectionSerializer(many=True, read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
     variants = serializers.SerializerMethodField()
@@ -241,7 +273,7 @@ class ProductWriteSerializer(serializers.ModelSerializer):
         collections = validated_data.pop("collections", None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        instance.save(update_fields=Product.edit_fields())
         if collections is not None:
             instance.collections.set(collections)
         return instance
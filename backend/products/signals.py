@@ -0,0 +1,191 @@
+"""
+Signal handlers keeping denormalized product data in sync:
+listing summaries (variants/images), the search index (text fields),
+per-product content versions (detail ETags), tester box snapshots and the
+catalog response cache version (any catalog write).
+"""
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from .cache import bump_catalog_version, touch_products
+from .models import Category, Collection, Product, ProductImage, ProductVariant, TesterBox
+from .search import index_products
+from .summary import refresh_changed_summaries, refresh_listing_summaries
+from .tester_boxes import refresh_tester_boxes, refresh_tester_boxes_for
+
+# Product fields that feed the search index
+SEARCH_FIELDS = {"name", "inspired_by", "description", "category", "category_id"}
+
+# sender=ProductVariant, product_ids=set: a catalog import wrote these
+# products and their variants in bulk, without model signals
+variants_written = Signal()
+
+
+def product_payloads_changed(condition):
+    """Re-version products matching `condition` and rebuild the tester boxes holding them."""
+    touch_products(condition)
+    refresh_tester_boxes_for(condition)
+
+
+def sync_variant_writes(product_ids):
+    """
+    Do what the variant signals would have done for variant rows written with
+    queryset.update() (e.g. checkout stock deduction), which sends no signals.
+    Runs once the writer's transaction commits, outside its row locks.
+    Variant stock is part of the product detail, list and tester box
+    payloads, so every written product is re-versioned, its boxes are
+    rebuilt and the catalog version moves; listing summaries are only
+    rewritten where a column actually changed (e.g. a region selling out).
+    """
+    product_ids = set(product_ids)
+    transaction.on_commit(lambda: _sync_summaries(product_ids))
+
+
+def _sync_summaries(product_ids):
+    refresh_changed_summaries(product_ids)
+    product_payloads_changed(Q(pk__in=product_ids))
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def refresh_product_summary(sender, instance, **kwargs):
+    """Recompute the parent product's listing summary after a variant/image write."""
+    refresh_listing_summaries([instance.product_id])
+    product_payloads_changed(Q(pk=instance.product_id))
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_category(sender, instance, update_fields=None, **kwargs):
+    instance._previous_category_id = None
+    instance._previous_is_active = None
+    if instance.pk and not instance._state.adding and (
+        update_fields is None or {"category", "is_active"}.intersection(update_fields)
+    ):
+        instance._previous_category_id, instance._previous_is_active = (
+            Product.objects.filter(pk=instance.pk).values_list("category_id", "is_active").first()
+            or (None, None)
+        )
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, created, update_fields=None, **kwargs):
+    """Re-tokenize and re-version a product after it is saved."""
+    # Nested category and collection blocks carry product_count (active
+    # products), so joining, leaving or (de)activating in a category or
+    # collection changes the detail payload of every product in it.
+    condition = Q(pk=instance.pk)
+    previous_category_id = getattr(instance, "_previous_category_id", None)
+    previous_is_active = getattr(instance, "_previous_is_active", None)
+    if created or (previous_category_id and previous_category_id != instance.category_id):
+        condition |= Q(category_id__in={instance.category_id, previous_category_id} - {None})
+    if previous_is_active is not None and previous_is_active != instance.is_active:
+        condition |= Q(category_id=instance.category_id) | Q(collections__in=instance.collections.all())
+    product_payloads_changed(condition)
+
+    if update_fields and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    index_products([instance.pk])
+
+
+@receiver(pre_delete, sender=Product)
+def remember_product_relations(sender, instance, **kwargs):
+    instance._collection_ids = list(instance.collections.values_list("pk", flat=True))
+    instance._tester_box_ids = list(instance.tester_boxes.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def touch_deleted_product_siblings(sender, instance, **kwargs):
+    touch_products(Q(collections__in=getattr(instance, "_collection_ids", [])))
+    product_payloads_changed(Q(category_id=instance.category_id))
+    refresh_tester_boxes(getattr(instance, "_tester_box_ids", []))
+
+
+@receiver(post_save, sender=Category)
+def index_category_products(sender, instance, created, **kwargs):
+    if not created:
+        product_payloads_changed(Q(category=instance))
+        index_products(instance.products.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Collection)
+def index_collection_products(sender, instance, created, **kwargs):
+    if not created:
+        touch_products(Q(collections=instance))
+        index_products(instance.products.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Collection)
+def remember_collection_products(sender, instance, **kwargs):
+    instance._product_ids = list(instance.products.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Collection)
+def index_deleted_collection_products(sender, instance, **kwargs):
+    product_ids = getattr(instance, "_product_ids", [])
+    touch_products(Q(pk__in=product_ids))
+    index_products(product_ids)
+
+
+@receiver(m2m_changed, sender=Product.collections.through)
+def index_product_collections(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep collection tokens and content versions current when links change."""
+    if action == "pre_clear":
+        related = instance.products if reverse else instance.collections
+        instance._cleared_pks = set(related.values_list("pk", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if action == "post_clear":
+        pk_set = getattr(instance, "_cleared_pks", set())
+    pk_set = pk_set or set()
+
+    if reverse:
+        # instance is a Collection, pk_set holds product ids
+        touch_products(Q(collections=instance) | Q(pk__in=pk_set))
+        index_products(pk_set)
+    else:
+        # instance is a Product, pk_set holds collection ids
+        touch_products(Q(pk=instance.pk) | Q(collections__in=pk_set))
+        index_products([instance.pk])
+
+
+@receiver(m2m_changed, sender=TesterBox.products.through)
+def refresh_tester_box_members(sender, instance, action, reverse, pk_set, **kwargs):
+    """Rebuild box snapshots when products are added to or removed from boxes."""
+    if action == "pre_clear" and reverse:
+        instance._cleared_box_pks = set(instance.tester_boxes.values_list("pk", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        # instance is a TesterBox
+        refresh_tester_boxes([instance.pk])
+    elif action == "post_clear":
+        refresh_tester_boxes(getattr(instance, "_cleared_box_pks", set()))
+    else:
+        # instance is a Product, pk_set holds box ids
+        refresh_tester_boxes(pk_set or set())
+
+
+CATALOG_MODELS = [Product, ProductVariant, ProductImage, Category, Collection, TesterBox]
+
+
+def invalidate_catalog_cache(sender, action=None, **kwargs):
+    if action and action.startswith("pre_"):
+        return
+    bump_catalog_version()
+
+
+for _model in CATALOG_MODELS:
+    post_save.connect(invalidate_catalog_cache, sender=_model, dispatch_uid=f"catalog-save-{_model.__name__}")
+    post_delete.connect(invalidate_catalog_cache, sender=_model, dispatch_uid=f"catalog-delete-{_model.__name__}")
+
+m2m_changed.connect(invalidate_catalog_cache, sender=Product.collections.through, dispatch_uid="catalog-m2m-collections")
+m2m_changed.connect(invalidate_catalog_cache, sender=TesterBox.products.through, dispatch_uid="catalog-m2m-tester-boxes")
@@ -0,0 +1,103 @@
+"""
+Listing summary maintenance for Product.
+
+Product carries denormalized listing columns (min/max price per region,
+stock flags, primary image, variant count) so list/thumbnail serializers never
+touch variants or images per row. These helpers recompute those columns
+from ProductVariant/ProductImage inside the database: one UPDATE with
+correlated subqueries per batch of products.
+"""
+
+from decimal import Decimal
+
+from django.db.models import (
+    Case, Count, DecimalField, Exists, F, Max, Min, OuterRef, Subquery, When,
+)
+from django.db.models.functions import Coalesce
+
+from .models import Product, ProductImage, ProductVariant
+
+SUMMARY_FIELDS = [
+    "india_min_price",
+    "india_max_price",
+    "switzerland_min_price",
+    "switzerland_max_price",
+    "has_india_stock",
+    "has_switzerland_stock",
+    "variant_count",
+    "primary_image",
+]
+
+PRICE_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+
+def _effective(region):
+    """discount_price when set (and non-zero), else price — as in ProductVariant."""
+    return Case(
+        When(**{f"{region}_discount_price__gt": 0}, then=F(f"{region}_discount_price")),
+        default=F(f"{region}_price"),
+        output_field=PRICE_FIELD,
+    )
+
+
+def _variant_aggregate(aggregate, exclude_testers=False):
+    variants = ProductVariant.objects.filter(product=OuterRef("pk"))
+    if exclude_testers:
+        variants = variants.exclude(quantity_ml=5)
+    return Subquery(
+        variants.order_by().values("product").annotate(value=aggregate).values("value")
+    )
+
+
+def summary_expressions():
+    """{field: expression} computing every listing summary column for a product row."""
+    expressions = {}
+    for region in ("india", "switzerland"):
+        for bound, aggregate in (("min", Min), ("max", Max)):
+            expressions[f"{region}_{bound}_price"] = Coalesce(
+                _variant_aggregate(aggregate(_effective(region)), exclude_testers=True),
+                Decimal("0.00"),
+                output_field=PRICE_FIELD,
+            )
+        expressions[f"has_{region}_stock"] = Exists(
+            ProductVariant.objects.filter(product=OuterRef("pk"), **{f"{region}_stock__gt": 0})
+        )
+    expressions["variant_count"] = Coalesce(_variant_aggregate(Count("pk")), 0)
+    expressions["primary_image"] = Subquery(
+        ProductImage.objects.filter(product=OuterRef("pk"))
+        .order_by("sort_order", "id")
+        .values("pk")[:1]
+    )
+    return expressions
+
+
+def refresh_listing_summaries(product_ids, batch_size=500):
+    """Recompute and persist listing summary columns for the given products."""
+    product_ids = [pk for pk in set(product_ids) if pk is not None]
+    updated = 0
+    for start in range(0, len(product_ids), batch_size):
+        chunk = product_ids[start:start + batch_size]
+        updated += Product.objects.filter(pk__in=chunk).update(**summary_expressions())
+    return updated
+
+
+def refresh_changed_summaries(product_ids, batch_size=500):
+    """
+    Like refresh_listing_summaries(), but compares first and writes only the
+    products whose columns would change. Returns their ids.
+    """
+    product_ids = [pk for pk in set(product_ids) if pk is not None]
+    changed = []
+    for start in range(0, len(product_ids), batch_size):
+        chunk = product_ids[start:start + batch_size]
+        rows = Product.objects.filter(pk__in=chunk).annotate(**{
+            f"new_{field}": expression for field, expression in summary_expressions().items()
+        }).values("pk", *SUMMARY_FIELDS, *(f"new_{field}" for field in SUMMARY_FIELDS))
+        stale = [
+            row["pk"] for row in rows
+            if any(row[field] != row[f"new_{field}"] for field in SUMMARY_FIELDS)
+        ]
+        if stale:
+            Product.objects.filter(pk__in=stale).update(**summary_expressions())
+            changed += stale
+    return changed
@@ -0,0 +1,73 @@
+"""
+Materialized tester box payloads.
+
+Each TesterBox stores its rendered member products (only those sold in
+5ml, with their 5ml variants, category block and primary image) in
+`products_snapshot`, so /api/products/tester-boxes/ reads one row per box.
+products.signals rebuilds the affected snapshots whenever box membership
+changes or a member product, its variants, images or category change.
+"""
+
+import json
+from collections import defaultdict
+
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from .models import Product, ProductVariant, TesterBox
+from .registry import build_category_blocks
+
+TESTER_ML = 5
+
+
+def build_snapshots(box_ids):
+    """Return {box_id: [rendered product, ...]} for the given boxes."""
+    from .serializers import TesterBoxItemSerializer
+
+    snapshots = {pk: [] for pk in box_ids}
+    boxes_by_product = defaultdict(list)
+    memberships = TesterBox.products.through.objects.filter(testerbox_id__in=snapshots)
+    for box_id, product_id in memberships.values_list("testerbox_id", "product_id"):
+        boxes_by_product[product_id].append(box_id)
+    if not boxes_by_product:
+        return snapshots
+
+    products = list(
+        Product.objects.filter(pk__in=boxes_by_product, variants__quantity_ml=TESTER_ML)
+        .distinct()
+        .select_related("primary_image")
+        .prefetch_related(
+            Prefetch("variants", queryset=ProductVariant.objects.filter(quantity_ml=TESTER_ML))
+        )
+    )
+    # Category blocks are read from the database, not the registry: the catalog
+    # version is only bumped after commit, so the registry may still be stale here.
+    context = {"category_blocks": build_category_blocks({p.category_id for p in products})}
+    data = TesterBoxItemSerializer(products, many=True, context=context).data
+
+    for item in json.loads(JSONRenderer().render(data)):
+        for box_id in boxes_by_product[item["id"]]:
+            snapshots[box_id].append(item)
+    return snapshots
+
+
+def refresh_tester_boxes(box_ids, batch_size=100):
+    """Rebuild and persist `products_snapshot` for the given boxes."""
+    box_ids = list(set(box_ids))
+    updated = 0
+    for start in range(0, len(box_ids), batch_size):
+        snapshots = build_snapshots(box_ids[start:start + batch_size])
+        boxes = [TesterBox(pk=pk, products_snapshot=items) for pk, items in snapshots.items()]
+        updated += TesterBox.objects.bulk_update(boxes, ["products_snapshot"])
+    return updated
+
+
+def refresh_tester_boxes_for(condition):
+    """Rebuild every box containing a product matching `condition` (a Q object)."""
+    box_ids = (
+        TesterBox.products.through.objects
+        .filter(product__in=Product.objects.filter(condition))
+        .values_list("testerbox_id", flat=True)
+        .distinct()
+    )
+    return refresh_tester_boxes(box_ids)
@@ -1,3 +1,409 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from analytics.models import InventoryTransfer
+
+from .cache import catalog_cache
+from .models import (
+    Category, Collection, Product, ProductImage, ProductSearchToken, ProductVariant, TesterBox,
+)
+from .registry import category_blocks
+from .search import search_products
+from .serializers import ProductWriteSerializer
+
+LOCAL_STORAGE = {**settings.STORAGES, "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"}}
+
+
+@override_settings(STORAGES=LOCAL_STORAGE)
+class CatalogTestCase(TestCase):
+    def setUp(self):
+        # Cache entries are keyed by catalog version, which restarts with every test
+        catalog_cache().clear()
+        caches["default"].clear()  # anonymous throttle counters
+        self.category = Category.objects.create(name="Men")
+        category_blocks(refresh=True)  # the registry outlives test rollbacks
+        self.client = APIClient()
+
+    def product(self, name, *prices, stock=5, **fields):
+        """An active product with a 50ml, 100ml, ... variant per India price."""
+        fields.setdefault("category", self.category)
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name=name, description="-", **fields)
+            for index, price in enumerate(prices):
+                ProductVariant.objects.create(
+                    product=product, quantity_ml=50 * (index + 1), india_price=Decimal(price),
+                    switzerland_price=Decimal("50.00"), india_stock=stock,
+                )
+        product.refresh_from_db()
+        return product
+
+
+class ListingSummaryTests(CatalogTestCase):
+    def test_summary_follows_variant_and_image_writes(self):
+        product = self.product("Oud", "1000.00")
+        self.assertEqual(
+            (product.india_min_price, product.india_max_price, product.variant_count, product.has_india_stock),
+            (Decimal("1000.00"), Decimal("1000.00"), 2, True),  # the 5ml tester is counted, not priced
+        )
+
+        variant = ProductVariant.objects.create(
+            product=product, quantity_ml=100, india_price=Decimal("1500.00"),
+            india_discount_price=Decimal("1200.00"), switzerland_price=Decimal("80.00"),
+        )
+        back = ProductImage.objects.create(product=product, image="products/back.jpg", sort_order=1)
+        front = ProductImage.objects.create(product=product, image="products/front.jpg", sort_order=0)
+        product.refresh_from_db()
+        self.assertEqual((product.india_max_price, product.variant_count), (Decimal("1200.00"), 3))
+        self.assertEqual(product.primary_image_id, front.pk)
+
+        front.delete()
+        variant.delete()
+        ProductVariant.objects.filter(product=product, quantity_ml=50).get().delete()
+        product.refresh_from_db()
+        self.assertEqual(product.primary_image_id, back.pk)
+        self.assertEqual((product.india_max_price, product.has_india_stock), (Decimal("0.00"), False))
+
+    def test_edits_of_a_stale_instance_keep_the_summary(self):
+        product = self.product("Oud", "1000.00")
+        ProductVariant.objects.create(
+            product=product, quantity_ml=100, india_price=Decimal("1500.00"), switzerland_price=Decimal("80.00"),
+        )
+        serializer = ProductWriteSerializer(product, data={"name": "Oud Royale"}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.india_max_price), ("Oud Royale", Decimal("1500.00")))
+
+
+class SearchIndexTests(CatalogTestCase):
+    def test_search_index_follows_text_and_collection_writes(self):
+        product = self.product("Oud Royale", "1000.00")
+        self.assertEqual(list(search_products("roya")), [product])
+
+        product.name = "Amber Night"
+        product.save()
+        self.assertFalse(search_products("royale").exists())
+        self.assertEqual(list(search_products("amber night")), [product])
+
+        product.collections.add(Collection.objects.create(name="Summer Picks"))
+        self.assertEqual(list(search_products("summer")), [product])
+        self.assertTrue(ProductSearchToken.objects.filter(product=product, token="picks").exists())
+
+    def test_query_without_index_terms_falls_back_to_substring_match(self):
+        sea = self.product("By The Sea", "1000.00")
+        oud = self.product("عود ملكي", "1000.00")
+        self.assertEqual(list(search_products("by the")), [sea])
+        self.assertEqual(list(search_products("عود")), [oud])
+        self.assertEqual(self.client.get("/api/search/?q=by%20the").json()["count"], 1)
+
+
+class CatalogCacheTests(CatalogTestCase):
+    def test_list_is_served_from_cache_until_the_version_moves(self):
+        product = self.product("Oud", "1000.00")
+        first = self.client.get("/api/products/")
+        self.assertEqual(first["X-Catalog-Cache"], "MISS")
+        second = self.client.get("/api/products/")
+        self.assertEqual(second["X-Catalog-Cache"], "HIT")
+        self.assertEqual(second.content, first.content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = "Oud Royale"
+            product.save()
+        response = self.client.get("/api/products/")
+        self.assertEqual(response["X-Catalog-Cache"], "MISS")
+        self.assertEqual(response.json()["results"][0]["name"], "Oud Royale")
+
+    @override_settings(ALLOWED_HOSTS=["testserver", "shop.example.com"])
+    def test_pages_are_cached_per_host_and_scheme(self):
+        for _ in range(3):
+            self.product("Oud", "1000.00")
+        for host, secure in (("testserver", False), ("shop.example.com", False), ("shop.example.com", True)):
+            response = self.client.get("/api/products/?page_size=1", HTTP_HOST=host, secure=secure)
+            self.assertEqual(response["X-Catalog-Cache"], "MISS")
+            scheme = "https" if secure else "http"
+            self.assertTrue(response.json()["next"].startswith(f"{scheme}://{host}/"))
+
+
+class ConditionalGetTests(CatalogTestCase):
+    def test_detail_answers_304_until_its_content_changes(self):
+        product = self.product("Oud", "1000.00")
+        url = f"/api/products/{product.slug}/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        variant = product.variants.get(quantity_ml=50)
+        variant.india_price = Decimal("900.00")
+        variant.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+
+class CursorPaginationTests(CatalogTestCase):
+    def test_cursor_pages_cover_every_product_once(self):
+        products = [self.product(f"Oud {index}", "1000.00") for index in range(5)]
+        # Ties on created_at are broken by id
+        Product.objects.filter(pk__in=[p.pk for p in products[1:4]]).update(created_at=products[1].created_at)
+        expected = list(Product.objects.order_by("-created_at", "-id").values_list("pk", flat=True))
+
+        seen, url = [], "/api/products/?paginate=cursor&page_size=2"
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page["results"]), 2)
+            seen += [row["id"] for row in page["results"]]
+            url = page["next"]
+        self.assertEqual(seen, expected)
+
+        self.assertEqual(self.client.get("/api/products/?paginate=cursor&cursor=nope").status_code, 404)
+        response = self.client.get("/api/products/?paginate=cursor&ordering=name")
+        self.assertEqual((response.status_code, list(response.json())), (400, ["ordering"]))
+
+
+class PriceFilterTests(CatalogTestCase):
+    def names(self, query):
+        response = self.client.get(f"/api/products/{query}")
+        self.assertEqual(response.status_code, 200)
+        return sorted(row["name"] for row in response.json()["results"])
+
+    def test_price_range_applies_to_the_starting_price(self):
+        self.product("Low", "500.00", "1000.00")
+        self.product("High", "1500.00", "2000.00")
+        self.product("Wide", "500.00", "2000.00")
+        self.product("Single", "800.00")
+
+        # Wide has no variant inside the range, only on both sides of it
+        self.assertEqual(self.names("?min_price=900&max_price=1600"), ["High"])
+        self.assertEqual(self.names("?max_price=700"), ["Low", "Wide"])
+        self.assertEqual(self.names("?min_price=800&max_price=800"), ["Single"])
+        self.assertEqual(self.names("?min_price=60&region=switzerland"), [])
+        self.assertEqual(self.client.get("/api/products/?min_price=cheap").status_code, 400)
+
+
+class CategoryRegistryTests(CatalogTestCase):
+    def counts(self, url):
+        return {row["name"]: row["product_count"] for row in self.client.get(url).json()}
+
+    def test_counts_are_annotated_and_leave_out_inactive_products(self):
+        summer = Collection.objects.create(name="Summer Picks")
+        Collection.objects.create(name="Winter Picks")
+        for name, active in (("Oud", True), ("Amber", True), ("Hidden", False)):
+            self.product(name, "1000.00", is_active=active).collections.add(summer)
+
+        with self.assertNumQueries(2):  # catalog state + annotated list
+            self.assertEqual(self.counts("/api/categories/"), {"Men": 2})
+        with self.assertNumQueries(2):
+            self.assertEqual(self.counts("/api/collections/"), {"Summer Picks": 2, "Winter Picks": 0})
+
+        oud = Product.objects.get(name="Oud")
+        etag = self.client.get(f"/api/products/{oud.slug}/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            hidden = Product.objects.get(name="Hidden")
+            hidden.is_active = True
+            hidden.save()
+        self.assertEqual(self.counts("/api/categories/"), {"Men": 3})
+        # Oud's nested category and collection blocks changed with the count
+        detail = self.client.get(f"/api/products/{oud.slug}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(detail.status_code, 200)
+        self.assertEqual(detail.json()["category"]["product_count"], 3)
+        self.assertEqual(detail.json()["collections"][0]["product_count"], 3)
+
+    def test_nested_blocks_follow_category_writes(self):
+        self.product("Oud", "1000.00")
+        self.product("Amber", "1000.00")
+        # catalog state, count, products, variants, then the registry's version
+        # check and rebuild: no per-row category query
+        with self.assertNumQueries(6):
+            rows = self.client.get("/api/products/").json()["results"]
+        self.assertEqual({row["category"]["name"] for row in rows}, {"Men"})
+        self.assertEqual(rows[0]["category"]["product_count"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Gentlemen"
+            self.category.save()
+        rows = self.client.get("/api/products/").json()["results"]
+        self.assertEqual({row["category"]["name"] for row in rows}, {"Gentlemen"})
+
+
+class TesterBoxTests(CatalogTestCase):
+    def test_list_reads_materialized_boxes_in_two_queries(self):
+        for index in range(3):
+            box = TesterBox.objects.create(name=f"Box {index}")
+            box.products.add(*(self.product(f"Oud {index}.{n}", "1000.00") for n in range(index + 1)))
+
+        with self.assertNumQueries(2):  # catalog state + boxes
+            boxes = self.client.get("/api/products/tester-boxes/").json()
+        self.assertEqual([len(box["products"]) for box in boxes], [1, 2, 3])
+        item = boxes[0]["products"][0]
+        self.assertEqual(([v["quantity_ml"] for v in item["variants"]], item["category"]["slug"]), ([5], "men"))
+
+    def test_snapshot_follows_variant_product_and_membership_writes(self):
+        oud = self.product("Oud", "1000.00")
+        amber = self.product("Amber", "1000.00")
+        box = TesterBox.objects.create(name="Discovery")
+        box.products.add(oud)
+
+        def snapshot():
+            box.refresh_from_db()
+            return box.products_snapshot
+
+        tester = oud.variants.get(quantity_ml=5)
+        tester.india_stock = 4
+        tester.save()
+        self.assertEqual(snapshot()[0]["variants"][0]["india_stock"], 4)
+
+        oud.name = "Oud Royale"
+        oud.save()
+        image = ProductImage.objects.create(product=oud, image="products/oud.jpg")
+        self.assertEqual(snapshot()[0]["name"], "Oud Royale")
+        self.assertEqual(snapshot()[0]["primary_image"]["id"], image.pk)
+
+        amber.tester_boxes.add(box)
+        self.assertEqual(sorted(item["name"] for item in snapshot()), ["Amber", "Oud Royale"])
+        box.products.remove(oud)
+        self.assertEqual([item["name"] for item in snapshot()], ["Amber"])
+
+        self.category.name = "Gentlemen"
+        self.category.save()
+        self.assertEqual(snapshot()[0]["category"]["name"], "Gentlemen")
+
+
+class HomeFeedTests(CatalogTestCase):
+    def test_rails_come_from_one_product_query_and_are_cached(self):
+        women = Category.objects.create(name="Women")
+        old = self.product("Old Oud", "1000.00", avg_rating=Decimal("4.5"))
+        Product.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=60))
+        self.product("New Oud", "1000.00", avg_rating=Decimal("3.0"))
+        self.product("Rose", "900.00", category=women)
+        self.product("Musk Roll-On", "300.00", is_roll_on=True)
+        self.product("Hidden", "900.00", is_active=False)
+        Collection.objects.create(name="Summer Picks")
+
+        # catalog state, products, category registry (new catalog version), collections
+        with self.assertNumQueries(4):
+            first = self.client.get("/api/home/")
+        self.assertEqual(first["X-Catalog-Cache"], "MISS")
+        feed = first.json()
+        rails = {rail: [item["name"] for item in feed[rail]] for rail in feed}
+        self.assertEqual(rails, {
+            "new_arrivals": ["Rose", "New Oud"],
+            "top_mens": ["Old Oud", "New Oud"],
+            "top_womens": ["Rose"],
+            "top_unisex": [],
+            "top_roll_ons": ["Musk Roll-On"],
+            "collections": ["Summer Picks"],
+        })
+        self.assertEqual(feed["top_womens"][0]["category"]["slug"], "women")
+
+        with self.assertNumQueries(1):
+            second = self.client.get("/api/home/")
+        self.assertEqual((second["X-Catalog-Cache"], second.content), ("HIT", first.content))
+        self.assertEqual(self.client.get("/api/home/", HTTP_IF_NONE_MATCH=second["ETag"]).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(name="Rose").get().delete()
+        third = self.client.get("/api/home/")
+        self.assertEqual(third["X-Catalog-Cache"], "MISS")
+        self.assertEqual(third.json()["top_womens"], [])
+
+
+@override_settings(STORAGES=LOCAL_STORAGE)
+class CatalogImportTests(TestCase):
+    # Same dumpdata shape as real_products.json
+    RECORDS = [
+        {"model": "products.category", "pk": 7, "fields": {"name": "Women", "slug": "women"}},
+        {"model": "products.collection", "pk": 3, "fields": {"name": "Swiss Products", "slug": "swiss-products"}},
+        {"model": "products.product", "pk": 21, "fields": {
+            "name": "Rose Oud", "slug": "rose-oud", "description": "Rose and oud.", "category": 7,
+            "collections": [3], "created_at": "2025-01-05T10:00:00Z",
+        }},
+        {"model": "products.product", "pk": 22, "fields": {
+            "name": "Vanilla Leather", "slug": "vanilla-leather", "description": "Vanilla.", "category": 7, "collections": [],
+        }},
+        {"model": "products.productvariant", "pk": 40, "fields": {
+            "product": 21, "quantity_ml": 50, "india_price": "1200.00", "switzerland_price": "60.00",
+            "india_stock": 8, "switzerland_stock": 2,
+        }},
+        {"model": "products.productvariant", "pk": 41, "fields": {
+            "product": 22, "quantity_ml": 100, "india_price": "1800.00", "switzerland_price": "90.00",
+            "india_stock": 0, "switzerland_stock": 4,
+        }},
+        {"model": "products.productimage", "pk": 60, "fields": {"product": 21, "image": "products/rose.jpg"}},
+        {"model": "products.testerbox", "pk": 2, "fields": {"name": "Discovery", "products": [21, 22]}},
+    ]
+
+    def setUp(self):
+        self.path = self.write(self.RECORDS)
+
+    def write(self, records):
+        handle, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(handle, "w") as fh:
+            json.dump(records, fh)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def snapshot(self):
+        return {
+            model.__name__: model.objects.count()
+            for model in (Category, Collection, Product, ProductVariant, ProductImage, TesterBox,
+                          ProductSearchToken, InventoryTransfer)
+        } | {
+            "variants": list(ProductVariant.objects.order_by("product__slug", "quantity_ml").values_list(
+                "product__slug", "quantity_ml", "india_stock", "switzerland_stock",
+            )),
+            "summaries": list(Product.objects.order_by("slug").values_list(
+                "slug", "india_min_price", "has_india_stock", "variant_count", "primary_image__image",
+            )),
+        }
+
+    def test_importing_twice_changes_nothing(self):
+        call_command("import_catalog", self.path, stdout=io.StringIO())
+        first = self.snapshot()
+        self.assertEqual((first["Product"], first["ProductVariant"]), (2, 4))  # with a 5ml tester each
+        self.assertEqual(
+            first["summaries"],
+            [("rose-oud", Decimal("1200.00"), True, 2, "products/rose.jpg"),
+             ("vanilla-leather", Decimal("1800.00"), False, 2, None)],
+        )
+
+        call_command("import_catalog", self.path, stdout=io.StringIO())
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(list(TesterBox.objects.get().products.order_by("slug").values_list("slug", flat=True)),
+                         ["rose-oud", "vanilla-leather"])
+
+    def test_partial_records_update_only_their_fields(self):
+        call_command("import_catalog", self.path, stdout=io.StringIO())
+        call_command("import_catalog", self.write([
+            {"model": "products.collection", "pk": 3, "fields": {"slug": "swiss-products", "is_active": False}},
+            {"model": "products.product", "pk": 21, "fields": {"slug": "rose-oud", "inspired_by": "Oud Wood"}},
+        ]), stdout=io.StringIO())
+
+        rose = Product.objects.get(slug="rose-oud")
+        self.assertEqual(
+            (rose.name, rose.description, rose.inspired_by, rose.category.slug),
+            ("Rose Oud", "Rose and oud.", "Oud Wood", "women"),
+        )
+        collection = Collection.objects.get(slug="swiss-products")
+        self.assertEqual((collection.name, collection.is_active), ("Swiss Products", False))
+
+    def test_records_without_a_slug_match_by_name(self):
+        records = [
+            {"model": "products.category", "pk": 7, "fields": {"name": "Women"}},
+            {"model": "products.product", "pk": 30, "fields": {"name": "Amber Musk", "description": "v1", "category": 7}},
+        ]
+        call_command("import_catalog", self.write(records), stdout=io.StringIO())
+        records[1]["fields"]["description"] = "v2"
+        call_command("import_catalog", self.write(records), stdout=io.StringIO())
+
+        self.assertEqual(list(Product.objects.values_list("slug", "description")), [("amber-musk", "v2")])
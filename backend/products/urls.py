@@ -11,6 +11,7 @@ router.register(r"admin/tester-boxes", views.AdminTesterBoxViewSet, basename="ad
 
 urlpatterns = [
     # Public
+    path("home/", views.HomeFeedView.as_view(), name="home-feed"),
     path("products/", views.ProductListView.as_view(), name="product-list"),
     path("products/new-arrivals/", views.NewArrivalsListView.as_view(), name="new-arrivals"),
     path("products/migrate-images/", views.MigrateImagesView.as_view(), name="migrate-images"),
@@ -25,6 +26,8 @@ urlpatterns = [
     path("roll-ons/", views.RollOnListView.as_view(), name="roll-on-list"),
     path("roll-ons/top/", views.TopTenRollOnsView.as_view(), name="roll-on-top"),
     path("roll-ons/<slug:slug>/", views.RollOnDetailView.as_view(), name="roll-on-detail"),
+    # Admin catalog cache stats
+    path("admin/catalog-cache/", views.AdminCatalogCacheView.as_view(), name="admin-catalog-cache"),
     # Admin image upload
     path(
         "admin/products/<int:product_id>/images/",
@@ -4,14 +4,32 @@ Product views: public listing/detail + admin CRUD.
 
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, generics, parsers, status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Prefetch
+from django.utils.http import quote_etag
+from decimal import Decimal, InvalidOperation
 
+from parfum.pagination import CreatedAtCursorPagination
 from parfum.permissions import IsAdmin
 
+from .cache import (
+    CatalogCacheMixin,
+    ProductConditionalRetrieveMixin,
+    bump_catalog_version,
+    cached_json_response,
+    get_cache_stats,
+    get_catalog_state,
+    not_modified_response,
+    reset_cache_stats,
+    set_validators,
+)
+from .home import render_home_feed
 from .models import Category, Collection, Product, ProductImage, ProductVariant, TesterBox
+from .registry import collections_with_count, with_product_count
+from .search import search_products
 from .serializers import (
     CategorySerializer,
     CollectionSerializer,
@@ -35,11 +53,37 @@ from .serializers import (
 from datetime import timedelta
 from django.utils import timezone
 
-class ProductListView(generics.ListAPIView):
+PRICE_REGIONS = ("india", "switzerland")
+
+
+def filter_price_range(queryset, params):
+    """
+    Apply ?min_price= / ?max_price= to the product's starting price, the
+    denormalized lowest effective price of its non-5ml variants. Both
+    bounds test the same column, so one variant always satisfies both.
+    ?region=switzerland selects the Swiss column; India is the default.
+    """
+    region = params.get("region", "india")
+    if region not in PRICE_REGIONS:
+        raise ValidationError({"region": f"Must be one of: {', '.join(PRICE_REGIONS)}."})
+
+    bounds = {}
+    for param, lookup in (("min_price", f"{region}_min_price__gte"), ("max_price", f"{region}_min_price__lte")):
+        value = params.get(param)
+        if not value:
+            continue
+        try:
+            bounds[lookup] = Decimal(value)
+        except InvalidOperation:
+            raise ValidationError({param: "Must be a number."})
+    return queryset.filter(**bounds) if bounds else queryset
+
+class ProductListView(CatalogCacheMixin, generics.ListAPIView):
     """GET /api/products/ — Browse active products with filtering."""
 
     serializer_class = ProductListSerializer
     permission_classes = [AllowAny]
+    pagination_class = CreatedAtCursorPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ["category__slug", "is_active"]
     search_fields = ["name", "inspired_by"]
@@ -49,8 +93,8 @@ class ProductListView(generics.ListAPIView):
     def get_queryset(self):
         queryset = (
             Product.objects.filter(is_active=True, is_roll_on=False)
-            .select_related("category")
-            .prefetch_related("images", "variants")
+            .select_related("category", "primary_image")
+            .prefetch_related("variants")
         )
 
         # Filter by collection slug
@@ -58,29 +102,10 @@ class ProductListView(generics.ListAPIView):
         if collection:
             queryset = queryset.filter(collections__slug=collection)
 
-        # Price range filter
-        min_price = self.request.query_params.get("min_price")
-        max_price = self.request.query_params.get("max_price")
-        if min_price or max_price:
-            from django.db.models import Q
-            
-            if min_price:
-                queryset = queryset.filter(
-                    Q(variants__india_discount_price__isnull=False, variants__india_discount_price__gte=min_price) |
-                    Q(variants__india_discount_price__isnull=True, variants__india_price__gte=min_price)
-                )
-            if max_price:
-                queryset = queryset.filter(
-                    Q(variants__india_discount_price__isnull=False, variants__india_discount_price__lte=max_price) |
-                    Q(variants__india_discount_price__isnull=True, variants__india_price__lte=max_price)
-                )
-            
-            queryset = queryset.distinct()
-
-        return queryset
+        return filter_price_range(queryset, self.request.query_params)
 
 
-class NewArrivalsListView(generics.ListAPIView):
+class NewArrivalsListView(CatalogCacheMixin, generics.ListAPIView):
     """GET /api/products/new-arrivals/ — Products added in the last 30 days."""
 
     serializer_class = ProductThumbnailSerializer
@@ -93,12 +118,10 @@ class NewArrivalsListView(generics.ListAPIView):
             is_active=True,
             is_roll_on=False,
             created_at__gte=thirty_days_ago
-        ).select_related("category").prefetch_related(
-            "images", "variants"
-        ).order_by("-created_at")
+        ).select_related("category", "primary_image").order_by("-created_at")
 
 
-class TopTenMensView(generics.ListAPIView):
+class TopTenMensView(CatalogCacheMixin, generics.ListAPIView):
     """GET /api/products/top-mens/ — Top 10 Men's products based on reviews."""
     serializer_class = ProductThumbnailSerializer
     permission_classes = [AllowAny]
@@ -109,12 +132,10 @@ class TopTenMensView(generics.ListAPIView):
             is_active=True,
             is_roll_on=False,
             category__slug="men"
-        ).select_related("category").prefetch_related(
-            "images", "variants"
-        ).order_by("-avg_rating", "-created_at")[:10]
+        ).select_related("category", "primary_image").order_by("-avg_rating", "-created_at")[:10]
 
 
-class TopTenWomensView(generics.ListAPIView):
+class TopTenWomensView(CatalogCacheMixin, generics.ListAPIView):
     """GET /api/products/top-womens/ — Top 10 Women's products based on reviews."""
     serializer_class = ProductThumbnailSerializer
     permission_classes = [AllowAny]
@@ -125,12 +146,10 @@ class TopTenWomensView(generics.ListAPIView):
             is_active=True,
             is_roll_on=False,
             category__slug="women"
-        ).select_related("category").prefetch_related(
-            "images", "variants"
-        ).order_by("-avg_rating", "-created_at")[:10]
+        ).select_related("category", "primary_image").order_by("-avg_rating", "-created_at")[:10]
 
 
-class TopTenUnisexView(generics.ListAPIView):
+class TopTenUnisexView(CatalogCacheMixin, generics.ListAPIView):
     """GET /api/products/top-unisex/ — Top 10 Unisex products based on reviews."""
     serializer_class = ProductThumbnailSerializer
     permission_classes = [AllowAny]
@@ -141,12 +160,10 @@ class TopTenUnisexView(generics.ListAPIView):
             is_active=True,
             is_roll_on=False,
             category__slug="unisex"
-        ).select_related("category").prefetch_related(
-            "images", "variants"
-        ).order_by("-avg_rating", "-created_at")[:10]
+        ).select_related("category", "primary_image").order_by("-avg_rating", "-created_at")[:10]
 
 
-class TopTenRollOnsView(generics.ListAPIView):
+class TopTenRollOnsView(CatalogCacheMixin, generics.ListAPIView):
     """GET /api/roll-ons/top/ — Top 10 Roll-on products based on reviews."""
     serializer_class = ProductThumbnailSerializer
     permission_classes = [AllowAny]
@@ -156,12 +173,29 @@ class TopTenRollOnsView(generics.ListAPIView):
         return Product.objects.filter(
             is_active=True,
             is_roll_on=True
-        ).select_related("category").prefetch_related(
-            "images", "variants"
-        ).order_by("-avg_rating", "-created_at")[:10]
+        ).select_related("category", "primary_image").order_by("-avg_rating", "-created_at")[:10]
+
+
+class HomeFeedView(APIView):
+    """
+    GET /api/home/ — Every storefront home rail in one response:
+    new_arrivals, top_mens, top_womens, top_unisex, top_roll_ons, collections.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        version, modified = get_catalog_state()
+        etag = quote_etag(f"home-{version}")
+        not_modified = not_modified_response(request, etag, modified)
+        if not_modified is not None:
+            return not_modified
 
+        content, state = render_home_feed(version)
+        return set_validators(cached_json_response(content, state), etag, modified)
 
-class ProductDetailView(generics.RetrieveAPIView):
+
+class ProductDetailView(ProductConditionalRetrieveMixin, generics.RetrieveAPIView):
     """GET /api/products/{slug}/ — Full product detail."""
 
     serializer_class = ProductDetailSerializer
@@ -170,29 +204,29 @@ class ProductDetailView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         return Product.objects.select_related("category").prefetch_related(
-            "collections", "images", "variants", "reviews"
+            collections_with_count(), "images", "variants", "reviews"
         )
 
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(CatalogCacheMixin, generics.ListAPIView):
     """GET /api/categories/ — All categories."""
 
-    queryset = Category.objects.all()
+    queryset = with_product_count(Category.objects.all())
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
     pagination_class = None
 
 
-class CollectionListView(generics.ListAPIView):
+class CollectionListView(CatalogCacheMixin, generics.ListAPIView):
     """GET /api/collections/ — Active collections."""
 
-    queryset = Collection.objects.filter(is_active=True)
+    queryset = with_product_count(Collection.objects.filter(is_active=True))
     serializer_class = CollectionSerializer
     permission_classes = [AllowAny]
     pagination_class = None
 
 
-class TesterBoxListView(generics.ListAPIView):
+class TesterBoxListView(CatalogCacheMixin, generics.ListAPIView):
     """GET /api/products/tester-boxes/ — Fetch all active Tester Boxes and their 5ml variants."""
 
     serializer_class = TesterBoxSerializer
@@ -200,26 +234,43 @@ class TesterBoxListView(generics.ListAPIView):
     pagination_class = None
 
     def get_queryset(self):
-        return TesterBox.objects.filter(is_active=True).prefetch_related(
-            Prefetch("products", queryset=Product.objects.filter(variants__quantity_ml=5).distinct(), to_attr="prefetched_products_5ml"),
-            "products__category", "products__images", "products__variants"
-        )
+        # Member products are materialized on the box (see products.tester_boxes)
+        return TesterBox.objects.filter(is_active=True)
+
+
+class SearchResultsPagination(PageNumberPagination):
+    """Page-number pagination that echoes the search parameters back."""
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_paginated_response(self, data):
+        params = self.request.query_params
+        return Response({
+            "query": params.get("q", "").strip(),
+            "min_price": params.get("min_price"),
+            "max_price": params.get("max_price"),
+            "count": self.page.paginator.count,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
 
 
 class ProductSearchView(generics.ListAPIView):
     """
-    GET /api/search/?q=<query>
-    Search active products by name or inspired_by.
+    GET /api/search/?q=<query>&page=<n>
+    Ranked search over name, inspired_by, description, category and
+    collections via the ProductSearchToken index (see products.search).
     Returns full product detail (variants, images, category, collections).
     """
 
     serializer_class = ProductDetailSerializer
     permission_classes = [AllowAny]
-    pagination_class = None
+    pagination_class = SearchResultsPagination
 
     def get_queryset(self):
-        from django.db.models import Q
-
         query = self.request.query_params.get("q", "").strip()
         min_price = self.request.query_params.get("min_price")
         max_price = self.request.query_params.get("max_price")
@@ -229,45 +280,20 @@ class ProductSearchView(generics.ListAPIView):
 
         queryset = Product.objects.filter(is_active=True)
 
-        # Text search
-        if query:
-            queryset = queryset.filter(
-                Q(name__icontains=query) | Q(inspired_by__icontains=query)
-            )
+        queryset = filter_price_range(queryset, self.request.query_params)
 
-        # Price range filter
-        if min_price or max_price:
-            if min_price:
-                queryset = queryset.filter(
-                    Q(variants__india_discount_price__isnull=False, variants__india_discount_price__gte=min_price) |
-                    Q(variants__india_discount_price__isnull=True, variants__india_price__gte=min_price)
-                )
-            if max_price:
-                queryset = queryset.filter(
-                    Q(variants__india_discount_price__isnull=False, variants__india_discount_price__lte=max_price) |
-                    Q(variants__india_discount_price__isnull=True, variants__india_price__lte=max_price)
-                )
+        # Ranked text search
+        if query:
+            queryset = search_products(query, queryset)
 
         return (
             queryset
             .select_related("category")
-            .prefetch_related("collections", "images", "variants")
-            .distinct()
+            .prefetch_related(collections_with_count(), "images", "variants")
         )
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({
-            "query": request.query_params.get("q", "").strip(),
-            "min_price": request.query_params.get("min_price"),
-            "max_price": request.query_params.get("max_price"),
-            "count": queryset.count(),
-            "results": serializer.data,
-        })
-
 
-class RollOnListView(generics.ListAPIView):
+class RollOnListView(CatalogCacheMixin, generics.ListAPIView):
     """
     GET /api/roll-ons/
     Public listing of all active roll-on attars.
@@ -285,12 +311,12 @@ class RollOnListView(generics.ListAPIView):
     def get_queryset(self):
         return (
             Product.objects.filter(is_active=True, is_roll_on=True)
-            .select_related("category")
-            .prefetch_related("images", "variants")
+            .select_related("category", "primary_image")
+            .prefetch_related("variants")
         )
 
 
-class RollOnDetailView(generics.RetrieveAPIView):
+class RollOnDetailView(ProductConditionalRetrieveMixin, generics.RetrieveAPIView):
     """
     GET /api/roll-ons/{slug}/
     Full detail for a single roll-on product.
@@ -303,7 +329,7 @@ class RollOnDetailView(generics.RetrieveAPIView):
     def get_queryset(self):
         return Product.objects.filter(is_roll_on=True).select_related(
             "category"
-        ).prefetch_related("collections", "images", "variants")
+        ).prefetch_related(collections_with_count(), "images", "variants")
 
 
 # ──────────────────────────────────────────────────
@@ -321,8 +347,8 @@ class AdminProductViewSet(viewsets.ModelViewSet):
     ordering_fields = ["created_at", "name"]
 
     def get_queryset(self):
-        return Product.objects.select_related("category").prefetch_related(
-            "collections", "images", "variants"
+        return Product.objects.select_related("category", "primary_image").prefetch_related(
+            collections_with_count(), "images", "variants"
         )
 
     def get_serializer_class(self):
@@ -339,7 +365,6 @@ class AdminProductViewSet(viewsets.ModelViewSet):
             product.cart_items.all().delete()
             product.wishlisted_by.all().delete()
             product.reviews.all().delete()
-            product.inventory_transfers.all().delete()
             product.images.all().delete()
             product.variants.all().delete()
             product.delete()
@@ -354,7 +379,7 @@ class AdminProductViewSet(viewsets.ModelViewSet):
 class AdminCategoryViewSet(viewsets.ModelViewSet):
     """CRUD /api/admin/categories/ — Admin category management."""
 
-    queryset = Category.objects.all()
+    queryset = with_product_count(Category.objects.all())
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated, IsAdmin]
 
@@ -362,7 +387,7 @@ class AdminCategoryViewSet(viewsets.ModelViewSet):
 class AdminCollectionViewSet(viewsets.ModelViewSet):
     """CRUD /api/admin/collections/ — Admin collection management."""
 
-    queryset = Collection.objects.all()
+    queryset = with_product_count(Collection.objects.all())
     serializer_class = CollectionSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
 
@@ -371,7 +396,7 @@ class AdminTesterBoxViewSet(viewsets.ModelViewSet):
     """CRUD /api/admin/tester-boxes/ — Admin tester box management."""
 
     permission_classes = [IsAuthenticated, IsAdmin]
-    queryset = TesterBox.objects.prefetch_related("products")
+    queryset = TesterBox.objects.all()
 
     def get_serializer_class(self):
         if self.action in ["create", "update", "partial_update"]:
@@ -379,6 +404,23 @@ class AdminTesterBoxViewSet(viewsets.ModelViewSet):
         return TesterBoxSerializer
 
 
+class AdminCatalogCacheView(APIView):
+    """
+    GET    /api/admin/catalog-cache/ — Catalog cache backend, version and hit/miss counters.
+    DELETE /api/admin/catalog-cache/ — Invalidate all cached catalog responses and reset counters.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return Response(get_cache_stats())
+
+    def delete(self, request):
+        bump_catalog_version()
+        reset_cache_stats()
+        return Response(get_cache_stats())
+
+
 class AdminVariantView(APIView):
     """
     POST /api/admin/products/{product_id}/variants/ — Add variant.
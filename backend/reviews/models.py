@@ -31,6 +31,9 @@ class Review(models.Model):
     class Meta:
         unique_together = ("user", "product")
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"]),
+        ]
 
     def __str__(self):
         return f"{self.user.email} rated {self.product.name} — {self.rating}/5"
@@ -8,6 +8,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from parfum.pagination import CreatedAtCursorPagination
 from parfum.permissions import IsAdmin
 from products.models import Product
 
@@ -61,6 +62,7 @@ class AdminReviewListView(generics.ListAPIView):
 
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         queryset = Review.objects.select_related("user", "product")